@@ -0,0 +1,75 @@
+'''
+Measure how long common imports of nwss take in a fresh interpreter.
+
+    python benchmarks/import_time.py [--budget-ms 50] [--repeat 10]
+
+Exits with status 1 if reading nwss.CDC_VERSION takes longer than the budget.
+'''
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+# Measure the checkout the script is in, installed or not, from any directory
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+STATEMENTS = {
+    'import nwss': 'import nwss',
+    'nwss.CDC_VERSION': 'import nwss; nwss.CDC_VERSION',
+    'nwss.WaterSampleSchema': 'import nwss; nwss.WaterSampleSchema',
+    'nwss.dump_to_jsonschema': 'import nwss.dump_to_jsonschema',
+    'build_schema()': 'import nwss.dump_to_jsonschema as d; d.build_schema()',
+}
+
+TIMER = '''
+import sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+{statement}
+print(time.perf_counter() - start)
+'''
+
+
+def time_statement(statement, repeat):
+    '''
+    Return the median time in milliseconds to run ``statement`` in a new
+    interpreter.
+    '''
+    times = []
+
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, '-c', TIMER.format(root=ROOT, statement=statement)],
+            check=True,
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+        ).stdout
+
+        times.append(float(output) * 1000)
+
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--budget-ms', type=float, default=50)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    results = {
+        name: round(time_statement(statement, args.repeat), 2)
+        for name, statement in STATEMENTS.items()
+    }
+
+    json.dump(results, sys.stdout, indent=4)
+    print()
+
+    if results['nwss.CDC_VERSION'] > args.budget_ms:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
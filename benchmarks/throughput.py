@@ -0,0 +1,222 @@
+'''
+Measure validation throughput and peak memory.
+
+    python benchmarks/throughput.py [--sizes 1000,100000,1000000]
+                                    [--benchmarks schema_load,columnar,...]
+                                    [--output results.json]
+
+Each benchmark runs against generated datasets of every size, once with
+all-valid rows and once with errors in every other row. Results are written
+as JSON so runs can be compared between releases. The larger sizes need
+several GB of memory for the paths that take the whole dataset as a list
+of dicts.
+'''
+import argparse
+import csv
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Measure the checkout the script is in, installed or not
+sys.path.insert(0, ROOT)
+
+from marshmallow import ValidationError  # noqa: E402
+import jsonschema  # noqa: E402
+
+import nwss  # noqa: E402
+from nwss import value_sets  # noqa: E402
+from nwss.batch import ColumnarValidator, rows_to_columns  # noqa: E402
+from nwss.dump_to_jsonschema import load_schema  # noqa: E402
+from nwss.schemas import WaterSampleSchema  # noqa: E402
+from nwss.validators import CaseInsensitiveOneOf  # noqa: E402
+
+
+FIXTURES = os.path.join(ROOT, 'tests', 'fixtures')
+
+# A mistake to make in each error-heavy row, cycling through the fields
+CSV_ERRORS = [
+    {'zipcode': '123'},
+    {'reporting_jurisdiction': 'XX'},
+    {'capacity_mgd': '-1'},
+    {'sample_id': 'not a valid sample id'},
+    {'sample_location': 'upstream', 'sample_location_specify': ''},
+]
+
+JSON_ERRORS = [
+    {'zipcode': '123'},
+    {'reporting_jurisdiction': 'XX'},
+    {'capacity_mgd': -1},
+    {'sample_id': 'not a valid sample id'},
+    {'sample_location': 'upstream', 'sample_location_specify': None},
+]
+
+
+def generate(base, size, errors, mistakes):
+    '''
+    Return ``size`` rows cycled from ``base``, each with a unique sample_id.
+    With ``errors``, every other row has one of ``mistakes``.
+    '''
+    rows = []
+
+    for i in range(size):
+        row = dict(base[i % len(base)])
+        row['sample_id'] = f'sample-{i}'
+
+        if errors and i % 2:
+            row.update(mistakes[i // 2 % len(mistakes)])
+
+        rows.append(row)
+
+    return rows
+
+
+def csv_rows(size, errors):
+    with open(os.path.join(FIXTURES, 'valid_data.csv'), newline='') as f:
+        base = list(csv.DictReader(f))
+
+    return generate(base, size, errors, CSV_ERRORS)
+
+
+def json_rows(size, errors):
+    with open(os.path.join(FIXTURES, 'valid.json')) as f:
+        base = json.load(f)
+
+    return generate(base, size, errors, JSON_ERRORS)
+
+
+def schema_load(size, errors):
+    rows = csv_rows(size, errors)
+    schema = WaterSampleSchema(many=True)
+
+    def run():
+        try:
+            schema.load(rows)
+        except ValidationError:
+            pass
+
+    return run
+
+
+def columnar(size, errors):
+    rows = csv_rows(size, errors)
+    validator = ColumnarValidator()
+
+    def run():
+        validator.validate(rows_to_columns(rows))
+
+    return run
+
+
+def json_schema(size, errors):
+    rows = json_rows(size, errors)
+    validator = jsonschema.Draft7Validator(load_schema())
+
+    def run():
+        for error in validator.iter_errors(rows):
+            pass
+
+    return run
+
+
+def case_insensitive_one_of(size, errors):
+    allowed = value_sets.reporting_jurisdiction
+    values = [allowed[i % len(allowed)].lower() for i in range(size)]
+
+    if errors:
+        values[1::2] = ['XX'] * (size // 2)
+
+    validator = CaseInsensitiveOneOf(allowed)
+
+    def run():
+        for value in values:
+            try:
+                validator(value)
+            except ValidationError:
+                pass
+
+    return run
+
+
+BENCHMARKS = {
+    'schema_load': schema_load,
+    'columnar': columnar,
+    'json_schema': json_schema,
+    'case_insensitive_one_of': case_insensitive_one_of,
+}
+
+
+def measure(setup, size, errors, memory):
+    '''
+    Return the seconds taken by one run, and its peak traced memory in MB
+    (measured in a second run, since tracing slows Python down).
+    '''
+    run = setup(size, errors)
+
+    start = time.perf_counter()
+    run()
+    seconds = time.perf_counter() - start
+
+    peak = None
+
+    if memory:
+        tracemalloc.start()
+        run()
+        peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+
+    return seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='1000,100000,1000000')
+    parser.add_argument('--benchmarks', default=','.join(BENCHMARKS))
+    parser.add_argument('--no-memory', action='store_true',
+                        help='Skip the peak memory measurement')
+    parser.add_argument('--output', help='Write results here instead of stdout')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    results = []
+
+    for name in args.benchmarks.split(','):
+        for size in sizes:
+            for errors in (False, True):
+                seconds, peak = measure(
+                    BENCHMARKS[name], size, errors, not args.no_memory
+                )
+
+                result = {
+                    'benchmark': name,
+                    'rows': size,
+                    'case': 'error_heavy' if errors else 'valid',
+                    'seconds': round(seconds, 4),
+                    'rows_per_second': round(size / seconds),
+                    'peak_memory_mb': None if peak is None else round(peak, 1),
+                }
+
+                print(json.dumps(result), file=sys.stderr)
+                results.append(result)
+
+    report = {
+        'nwss_version': nwss.__version__,
+        'cdc_version': nwss.CDC_VERSION,
+        'python': platform.python_version(),
+        'results': results,
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
+    else:
+        json.dump(report, sys.stdout, indent=4)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,21 @@
-from nwss.schemas import WaterSampleSchema
+import sys
 
 
+# Version of this package
+__version__ = '1.0.1'
+
 # Version of the CDC data dictionary this schema reflects
 CDC_VERSION = '2.0.4'
+
+
+if sys.version_info < (3, 7):
+    # Module-level __getattr__ needs Python 3.7
+    from nwss.schemas import WaterSampleSchema  # noqa: F401
+else:
+    def __getattr__(name):
+        # Defer importing marshmallow until the schema is first used
+        if name == 'WaterSampleSchema':
+            from nwss.schemas import WaterSampleSchema
+            return WaterSampleSchema
+
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
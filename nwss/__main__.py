@@ -0,0 +1,6 @@
+import sys
+
+from nwss.cli import main
+
+
+sys.exit(main())
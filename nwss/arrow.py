@@ -0,0 +1,216 @@
+'''
+Validate Apache Arrow tables, record batches and Parquet files.
+
+Each column is dictionary-encoded, so the schema field deserializes each
+distinct value once and the result is expanded back to a full column with
+Arrow's ``take``. Validated data comes back as Arrow arrays typed after the
+schema fields, with categorical fields as dictionary arrays. Rows are never
+turned into Python dicts; only the columns that cross-field rules read are
+converted to Python lists.
+
+Requires ``pyarrow`` (``pip install nwss[arrow]``).
+'''
+from time import perf_counter
+
+from marshmallow import fields, missing, EXCLUDE, INCLUDE
+
+from nwss import fields as nwss_fields
+from nwss.batch import ColumnarValidator, LazyColumns
+from nwss.errors import RowErrors
+from nwss.profiling import FIELD
+from nwss.utils import ValidationContext
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:
+    raise ImportError('nwss.arrow requires pyarrow. Install it with: '
+                      'pip install nwss[arrow]')
+
+
+def arrow_type(field):
+    '''
+    Return the Arrow type for values deserialized by ``field``, or None to
+    let Arrow infer it.
+    '''
+    if isinstance(field, nwss_fields.CategoricalString):
+        return pa.dictionary(pa.int32(), pa.string())
+    if isinstance(field, nwss_fields.ListString):
+        return pa.list_(pa.string())
+    if isinstance(field, fields.String):
+        return pa.string()
+    if isinstance(field, fields.Integer):
+        return pa.int64()
+    if isinstance(field, fields.Float):
+        return pa.float64()
+    if isinstance(field, fields.Boolean):
+        return pa.bool_()
+    # Date and Time subclass DateTime
+    if isinstance(field, fields.Date):
+        return pa.date32()
+    if isinstance(field, fields.Time):
+        return pa.time64('us')
+    if isinstance(field, fields.DateTime):
+        return pa.timestamp('us')
+
+    return None
+
+
+class ArrowValidator(ColumnarValidator):
+    '''
+    Validate a ``pyarrow.Table`` or ``pyarrow.RecordBatch`` column by column.
+
+    ``validate`` returns ``(data, errors)`` as ``ColumnarValidator`` does,
+    with ``data`` of the same kind as the input. Cells that failed
+    validation are null.
+    '''
+
+    def validate(self, table, context=None, errors=None, start=0):
+        arrays, errors = super().validate(table, context, errors, start)
+
+        if isinstance(table, pa.RecordBatch):
+            data = pa.RecordBatch.from_arrays(list(arrays.values()), list(arrays))
+        else:
+            data = pa.Table.from_arrays(list(arrays.values()), list(arrays))
+
+        return data, errors
+
+    def _count_rows(self, table):
+        return table.num_rows
+
+    def _validate(self, table, n_rows, errors, context):
+        data = {}
+        names = table.schema.names
+
+        for name, field in self.fields.items():
+            start = perf_counter()
+
+            if name in names:
+                values = self._validate_array(name, field, table.column(name), errors)
+            else:
+                values = self._validate_missing(name, field, n_rows, errors)
+
+                if values is not missing:
+                    values = pa.array(values, type=arrow_type(field))
+
+            if context.profile is not None:
+                context.profile.record(FIELD, name, perf_counter() - start, n_rows)
+
+            if values is not missing:
+                data[name] = values
+
+        unknown = [name for name in names if name not in self.fields]
+
+        if unknown and self.schema.unknown == INCLUDE:
+            data.update({name: _combine(table.column(name)) for name in unknown})
+        elif unknown and self.schema.unknown != EXCLUDE:
+            message = self.schema.error_messages['unknown']
+
+            for index in range(n_rows):
+                for name in unknown:
+                    errors.add(index, name, [message])
+
+        self._validate_rows(LazyColumns(data, pa.Array.to_pylist), n_rows, errors,
+                            context)
+
+        return data
+
+    def _validate_array(self, name, field, array, errors):
+        array = _prepare(field, _combine(array))
+
+        encoded = pc.dictionary_encode(array, null_encoding='encode')
+        indices = encoded.indices
+
+        values = []
+        invalid = {}
+
+        for position, raw in enumerate(encoded.dictionary.to_pylist()):
+            value, messages = self._deserialize(name, field, raw)
+            values.append(value)
+
+            if messages is not None:
+                invalid[position] = messages
+
+        if invalid:
+            failed = pc.is_in(indices, value_set=pa.array(list(invalid), indices.type))
+            rows = pc.indices_nonzero(failed)
+
+            for row, position in zip(rows.to_pylist(),
+                                     pc.take(indices, rows).to_pylist()):
+                errors.add(row, name, invalid[position])
+
+        if isinstance(field, nwss_fields.CategoricalString):
+            return _dictionary_array(values, indices)
+
+        return pc.take(pa.array(values, type=arrow_type(field)), indices)
+
+
+def _combine(array):
+    if isinstance(array, pa.ChunkedArray):
+        if array.num_chunks == 0:
+            return pa.array([], type=array.type)
+
+        return array.combine_chunks()
+
+    return array
+
+
+def _prepare(field, array):
+    '''
+    Cast temporal columns to the strings the schema's fields deserialize.
+    '''
+    if pa.types.is_timestamp(array.type) and isinstance(field, fields.Date):
+        array = pc.cast(array, pa.date32())
+
+    if pa.types.is_temporal(array.type):
+        array = pc.cast(array, pa.string())
+
+    return array
+
+
+def _dictionary_array(values, indices):
+    '''
+    Return a dictionary array of the distinct non-null ``values``, indexed
+    as ``values`` is by ``indices``.
+    '''
+    dictionary = list(dict.fromkeys(value for value in values if value is not None))
+    codes = {value: code for code, value in enumerate(dictionary)}
+
+    remap = pa.array([codes.get(value) for value in values], pa.int32())
+
+    return pa.DictionaryArray.from_arrays(
+        pc.take(remap, indices), pa.array(dictionary, pa.string())
+    )
+
+
+def validate_table(table, context=None, errors=None):
+    '''
+    Validate a ``pyarrow.Table`` or ``pyarrow.RecordBatch``. See
+    ``ArrowValidator``.
+    '''
+    return ArrowValidator().validate(table, context, errors)
+
+
+def validate_parquet(path, batch_size=65536, context=None, errors=None):
+    '''
+    Validate a Parquet file one record batch at a time, returning the
+    validated data as a ``pyarrow.Table`` and the errors keyed by row
+    number across the file.
+    '''
+    validator = ArrowValidator()
+    context = context or ValidationContext()
+    errors = RowErrors() if errors is None else errors
+
+    batches = []
+    n_rows = 0
+
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+        data, _ = validator.validate(batch, context, errors, start=n_rows)
+        batches.append(data)
+        n_rows += batch.num_rows
+
+    if not batches:
+        return validator.validate(pq.read_table(path), context, errors)
+
+    return pa.Table.from_batches(batches), errors
@@ -0,0 +1,392 @@
+'''
+Columnar validation of WaterSampleSchema batches.
+
+Rather than walking every row dict through marshmallow field by field,
+``ColumnarValidator`` takes a whole batch as a mapping of column name to a
+sequence of raw values (lists, tuples or NumPy arrays) and validates one
+column at a time. Each distinct value in a column is deserialized once by
+the matching ``WaterSampleSchema`` field, so the Range, Length, Regexp and
+categorical checks run once per distinct value rather than once per cell.
+'''
+from collections.abc import Mapping
+from operator import itemgetter
+from time import perf_counter
+
+from marshmallow import ValidationError, missing, EXCLUDE, INCLUDE
+from marshmallow.error_store import SCHEMA
+from marshmallow.decorators import VALIDATES, VALIDATES_SCHEMA
+
+from nwss import rules
+from nwss.errors import RowErrors
+from nwss.identifiers import identifier_checks
+from nwss.profiling import FIELD
+from nwss.schemas import WaterSampleSchema
+from nwss.utils import ValidationContext, current_context, normalize_value
+
+
+def _hook_kwargs(method, tag):
+    '''
+    Return the keyword arguments ``method`` was registered with for the
+    marshmallow hook ``tag``, or None if it is not a (single-item) hook.
+    '''
+    config = getattr(method, '__marshmallow_hook__', None) or {}
+
+    for key, value in config.items():
+        if key == tag:
+            # marshmallow >= 3.13 stores {tag: [(many, kwargs), ...]}
+            for many, kwargs in value:
+                if not many:
+                    return kwargs
+        elif key == (tag, False):
+            # Older releases store {(tag, many): kwargs}
+            return value
+
+    return None
+
+
+def _hooks(schema, tag):
+    '''
+    Yield (bound method, hook kwargs) for each ``tag`` hook on ``schema``, in
+    the order marshmallow invokes them.
+    '''
+    for attr_name in dir(type(schema)):
+        kwargs = _hook_kwargs(getattr(type(schema), attr_name, None), tag)
+        if kwargs is not None:
+            yield getattr(schema, attr_name), kwargs
+
+
+class _BatchErrors():
+    '''
+    Passes one batch's errors on to ``errors``, numbering rows from
+    ``start``, and notes which rows have field errors.
+    '''
+
+    def __init__(self, errors, start, n_rows):
+        self.errors = errors
+        self.start = start
+        self.failed = bytearray(n_rows)
+
+    def add(self, index, field, messages):
+        self.failed[index] = 1
+        self.errors.add(self.start + index, field, messages)
+
+    def add_row_error(self, index, field, messages):
+        self.errors.add(self.start + index, field, messages)
+
+
+# Column value types that never compare equal to one another
+_DISTINCT_TYPES = {str, type(None), type(missing)}
+
+
+class ColumnarValidator():
+    '''
+    Validate a batch of samples column by column.
+
+    ``validate`` returns ``(data, errors)``. ``data`` maps field names to
+    lists of deserialized values, with None in cells that failed validation.
+    By default ``errors`` is a ``RowErrors`` dict with the same
+    ``{row: {field: [messages]}}`` shape as ``WaterSampleSchema(many=True)``
+    error messages, with cross-field failures stored under ``'_schema'``.
+    Pass a ``GroupedErrors`` to group them by field and error code instead.
+
+    Cross-field rules are skipped for any row with field errors, so each row
+    gets the same errors it would from ``WaterSampleSchema().load(row)``
+    regardless of which other rows share its batch.
+    '''
+
+    def __init__(self, schema=None):
+        self.schema = schema or WaterSampleSchema()
+
+        self.fields = {
+            field.data_key or name: field
+            for name, field in self.schema.load_fields.items()
+        }
+
+        self.field_validators = {}
+
+        for validator, kwargs in _hooks(self.schema, VALIDATES):
+            self.field_validators.setdefault(kwargs['field_name'], []).append(validator)
+
+        # Identifier values that pass these checks skip marshmallow
+        self.identifier_checks = {
+            name: check for name, check in identifier_checks(self.schema).items()
+            if name not in self.field_validators
+        }
+
+        self.rules = getattr(self.schema, 'cross_field_rules', [])
+
+        self.schema_validators = [
+            validator for validator, kwargs in _hooks(self.schema, VALIDATES_SCHEMA)
+            # Cross-field rules are checked a column at a time instead
+            if validator.__name__ != 'validate_rules'
+        ]
+
+    @property
+    def trim(self):
+        '''
+        Whether text is trimmed before validation, as the schema's
+        ``trim_whitespace`` says.
+        '''
+        return getattr(self.schema, 'trim_whitespace', False)
+
+    def validate(self, columns, context=None, errors=None, start=0):
+        '''
+        Validate a batch of columns. Dates are checked against ``context``,
+        or a ValidationContext captured once for the whole batch.
+
+        Errors are added to ``errors``, numbering rows from ``start``, so
+        consecutive batches can share one error container.
+        '''
+        context = context or ValidationContext()
+        n_rows = self._count_rows(columns)
+        errors = RowErrors() if errors is None else errors
+
+        # Field validators such as validate_sample_collect_date read the
+        # context as schema.validation_context
+        token = current_context.set(context)
+
+        try:
+            data = self._validate(columns, n_rows, _BatchErrors(errors, start, n_rows),
+                                  context)
+        finally:
+            current_context.reset(token)
+
+        return data, errors
+
+    def _validate(self, columns, n_rows, errors, context):
+        data = {}
+
+        for name, field in self.fields.items():
+            start = perf_counter()
+
+            if name in columns:
+                values = self._validate_column(name, field, columns[name], errors)
+            else:
+                values = self._validate_missing(name, field, n_rows, errors)
+
+            if context.profile is not None:
+                context.profile.record(FIELD, name, perf_counter() - start, n_rows)
+
+            if values is not missing:
+                data[name] = values
+
+        unknown = [name for name in columns if name not in self.fields]
+
+        if unknown and self.schema.unknown == INCLUDE:
+            data.update({name: list(columns[name]) for name in unknown})
+        elif unknown and self.schema.unknown != EXCLUDE:
+            message = self.schema.error_messages['unknown']
+
+            for name in unknown:
+                for index, value in enumerate(columns[name]):
+                    if value is not missing:
+                        errors.add(index, name, [message])
+
+        self._validate_rows(data, n_rows, errors, context)
+
+        return data
+
+    def _count_rows(self, columns):
+        lengths = {len(values) for values in columns.values()}
+
+        if len(lengths) > 1:
+            raise ValueError('All columns must have the same number of rows.')
+
+        return lengths.pop() if lengths else 0
+
+    def _deserialize(self, name, field, value):
+        '''
+        Deserialize a single raw value, returning (value, messages).
+        '''
+        # Mirror WaterSampleSchema.cast_to_none
+        value = normalize_value(value, self.trim)
+
+        check = self.identifier_checks.get(name)
+
+        if check is not None and check(value):
+            return value, None
+
+        try:
+            value = field.deserialize(value, name, None)
+        except ValidationError as error:
+            return None, error.messages
+
+        for validator in self.field_validators.get(name, ()):
+            try:
+                validator(value)
+            except ValidationError as error:
+                return None, error.messages
+
+        return value, None
+
+    def _validate_column(self, name, field, values, errors):
+        check = self.identifier_checks.get(name)
+
+        if check is not None and not self.trim:
+            try:
+                distinct = dict.fromkeys(values)
+            except TypeError:
+                distinct = ()
+
+            # Identifier columns are usually valid throughout, and valid
+            # identifiers deserialize to themselves
+            if distinct and all(map(check, distinct)):
+                return list(values)
+
+        # 1 == 1.0 == True, so values can only be deduplicated directly when
+        # the column holds a single type, or types that never compare equal
+        types = set(map(type, values))
+
+        if len(types) > 1 and not types <= _DISTINCT_TYPES:
+            return self._validate_cells(name, field, values, errors)
+
+        try:
+            distinct = dict.fromkeys(values)
+        except TypeError:
+            return self._validate_cells(name, field, values, errors)
+
+        invalid = {}
+
+        for raw in distinct:
+            distinct[raw], messages = self._deserialize(name, field, raw)
+
+            if messages is not None:
+                invalid[raw] = messages
+
+        try:
+            result = list(map(distinct.__getitem__, values))
+        except KeyError:
+            # Values such as NaN that aren't equal to themselves
+            return self._validate_cells(name, field, values, errors)
+
+        if invalid:
+            for index, raw in enumerate(values):
+                if raw in invalid:
+                    errors.add(index, name, invalid[raw])
+
+        return result
+
+    def _validate_cells(self, name, field, values, errors):
+        cache = {}
+        result = []
+
+        for index, raw in enumerate(values):
+            key = (type(raw), raw)
+
+            try:
+                value, messages = cache[key]
+            except KeyError:
+                value, messages = cache[key] = self._deserialize(name, field, raw)
+            except TypeError:
+                # Unhashable values are validated every time
+                value, messages = self._deserialize(name, field, raw)
+
+            if messages is not None:
+                errors.add(index, name, messages)
+
+            result.append(value)
+
+        return result
+
+    def _validate_missing(self, name, field, n_rows, errors):
+        try:
+            value = field.deserialize(missing, name, None)
+        except ValidationError as error:
+            for index in range(n_rows):
+                errors.add(index, name, error.messages)
+            return [None] * n_rows
+
+        if value is missing:
+            return missing
+
+        return [value] * n_rows
+
+    def _validate_rows(self, data, n_rows, errors, context):
+        rule_errors = rules.check_columns(data, n_rows, self.rules, context)
+
+        for index, messages in rule_errors.items():
+            if not errors.failed[index]:
+                errors.add_row_error(index, SCHEMA, messages)
+
+        if not self.schema_validators:
+            return
+
+        names = list(data)
+
+        for index, values in enumerate(zip(*data.values())):
+            if errors.failed[index]:
+                continue
+
+            row = dict(zip(names, values))
+
+            for validator in self.schema_validators:
+                try:
+                    validator(row, partial=None, many=False)
+                except ValidationError as error:
+                    errors.add_row_error(index, error.field_name, error.messages)
+
+
+class LazyColumns(Mapping):
+    '''
+    Read-only mapping of column name to Python list, converting each column
+    with ``to_list`` the first time it is read. Lets cross-field rules run
+    over Arrow or pandas columns without converting the columns they don't
+    read.
+    '''
+
+    def __init__(self, columns, to_list):
+        self.columns = columns
+        self.to_list = to_list
+        self.lists = {}
+
+    def __getitem__(self, name):
+        try:
+            return self.lists[name]
+        except KeyError:
+            values = self.lists[name] = self.to_list(self.columns[name])
+            return values
+
+    def __iter__(self):
+        return iter(self.columns)
+
+    def __len__(self):
+        return len(self.columns)
+
+
+def validate_columns(columns, schema=None):
+    '''
+    Validate a mapping of column name to values. See ``ColumnarValidator``.
+    '''
+    return ColumnarValidator(schema).validate(columns)
+
+
+def rows_to_columns(rows):
+    '''
+    Transpose an iterable of row mappings into a dict of column sequences,
+    as accepted by ``ColumnarValidator.validate``. Keys absent from a row are
+    filled with ``marshmallow.missing``.
+    '''
+    rows = list(rows)
+    names = dict.fromkeys(rows[0] if rows else ())
+
+    for row in rows:
+        if row.keys() != names.keys():
+            names.update(dict.fromkeys(row))
+
+    names = list(names)
+
+    if all(len(row) == len(names) for row in rows):
+        getter = itemgetter(*names)
+
+        try:
+            values = [getter(row) for row in rows]
+        except KeyError:
+            pass
+        else:
+            if len(names) == 1:
+                return {names[0]: values}
+            return dict(zip(names, zip(*values))) if values else {}
+
+    return {
+        name: [row.get(name, missing) for row in rows] for name in names
+    }
@@ -0,0 +1,211 @@
+'''
+Resumable validation of large CSV files.
+
+    nwss validate dump.csv --checkpoint dump.checkpoint --format json -o report.json
+
+While the file is validated, a small sidecar file is saved every
+``interval`` seconds, between chunks. It records:
+
+- the byte offset and line where the next row starts
+- how many rows have been checked, and how many had errors
+- the date the rows are being checked against
+- the report's partial state: the grouped errors for a summary, or how much
+  of the report file has been written for JSON and CSV reports
+
+If the run is killed, running it again with the same checkpoint continues
+from there. The report is the same as one from an uninterrupted run. The
+checkpoint is removed once the run finishes. A checkpoint is ignored if it
+was written for a different version of the input file or different
+options, and the run starts over.
+
+The checkpoint is written as JSON, so loading one never runs code from it.
+'''
+import datetime
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+from nwss.cli import CHUNK_SIZE, ReportOutput, make_report, validate_rows
+from nwss.csvindex import IndexedCSV
+from nwss.utils import ValidationContext
+
+
+VERSION = 2
+
+
+class Checkpoint():
+    '''
+    The checkpoint file at ``path`` for validating ``input_path``. ``options``
+    are the settings that change the report, which a resumed run must
+    share.
+    '''
+
+    def __init__(self, path, input_path, **options):
+        self.path = path
+        self.input_path = input_path
+        self.options = options
+
+    def _signature(self):
+        stat = os.stat(self.input_path)
+
+        return {
+            'version': VERSION,
+            'input': os.path.abspath(self.input_path),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'options': self.options,
+        }
+
+    def load(self):
+        '''
+        Return the saved state, or None if there is no usable checkpoint.
+        '''
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                checkpoint = json.load(f)
+
+            signature, state = checkpoint['signature'], checkpoint['state']
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Written by another version, or unreadable
+            return None
+
+        if signature != self._signature():
+            return None
+
+        return state
+
+    def save(self, state):
+        '''
+        Replace the checkpoint with ``state``, atomically. ``state`` must be
+        plain data that can be written as JSON.
+        '''
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(
+            dir=directory, prefix='.' + os.path.basename(self.path), suffix='.tmp'
+        )
+
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'signature': self._signature(), 'state': state}, f)
+                f.flush()
+                os.fsync(f.fileno())
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        os.replace(tmp_path, self.path)
+
+    def remove(self):
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def _parse_date(text):
+    # date.fromisoformat is new in Python 3.7
+    return datetime.datetime.strptime(text, '%Y-%m-%d').date()
+
+
+def _open_output(output_path, state):
+    '''
+    Open the report file in binary, cut back to where the checkpoint left
+    it when resuming. Returns None if the file doesn't match the checkpoint.
+    '''
+    if state is None:
+        return open(output_path, 'wb')
+
+    try:
+        f = open(output_path, 'r+b')
+    except FileNotFoundError:
+        return None
+
+    if f.seek(0, io.SEEK_END) < state['output']:
+        f.close()
+        return None
+
+    f.truncate(state['output'])
+
+    return f
+
+
+def validate_resumable(path, checkpoint_path, output_path=None, format='summary',
+                       max_errors=None, validator=None, interval=30.0,
+                       chunk_size=CHUNK_SIZE):
+    '''
+    Validate the CSV file at ``path`` like ``nwss.cli.validate_path``,
+    checkpointing to ``checkpoint_path`` every ``interval`` seconds and
+    resuming from it if it exists. The report is written to ``output_path``,
+    which JSON and CSV reports need so they can be resumed; summaries can be
+    written to stdout. Returns (rows checked, rows with errors, stopped
+    early).
+    '''
+    if output_path is None and format != 'summary':
+        raise ValueError(f'A {format} report needs an output file to be resumable')
+
+    checkpoint = Checkpoint(checkpoint_path, path, format=format, max_errors=max_errors)
+    state = checkpoint.load()
+
+    if output_path is None:
+        binary = None
+    else:
+        binary = _open_output(output_path, state)
+
+        if binary is None:
+            # The report file doesn't match the checkpoint
+            state = None
+            binary = open(output_path, 'wb')
+
+    output = sys.stdout if binary is None else \
+        io.TextIOWrapper(binary, encoding='utf-8', newline='')
+
+    report = make_report(format, ReportOutput(output), path)
+    context = ValidationContext(today=_parse_date(state['today']) if state else None)
+
+    if state:
+        report.restore(state['report'])
+
+    try:
+        with IndexedCSV(path, state['position'] if state else None) as f:
+            saved = time.monotonic()
+
+            def progress(n_rows, n_invalid):
+                nonlocal saved
+
+                if time.monotonic() - saved < interval:
+                    return
+
+                if binary is not None:
+                    # The report must hold everything the checkpoint says it does
+                    output.flush()
+                    os.fsync(binary.fileno())
+
+                checkpoint.save({
+                    'position': f.position(n_rows),
+                    'counts': [n_rows, n_invalid],
+                    'output': binary.tell() if binary is not None else None,
+                    'today': context.today.isoformat(),
+                    'report': report.state(),
+                })
+                saved = time.monotonic()
+
+            result = validate_rows(
+                f.rows(), report, f.line, max_errors,
+                chunk_size=chunk_size,
+                validator=validator,
+                context=context,
+                start=state['counts'] if state else (0, 0),
+                progress=progress,
+            )
+    finally:
+        if binary is not None:
+            output.close()
+
+    checkpoint.remove()
+
+    return result
@@ -0,0 +1,695 @@
+'''
+Command line interface.
+
+    nwss validate samples.csv --format summary
+
+CSV and JSON lines input is read as a stream and validated a chunk at a
+time, and errors are written out as they are found, so memory use stays
+flat however large the file. A JSON array, an XLSX sheet's shared strings
+and, for summaries, the grouped errors are held in memory. CSV files can be
+split across processes with ``--workers``, which keeps the file's errors
+(up to ``--max-errors`` rows of them) in memory until every worker is done.
+
+Exit codes: 0 if the file is valid, 1 if it has errors, 2 for bad arguments,
+3 if the file can't be read, 4 if the report can't be written and 5 for
+an unexpected error.
+'''
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import signal
+import sys
+import traceback
+import zipfile
+from collections import deque
+from itertools import chain, islice
+from xml.etree.ElementTree import ParseError
+
+from nwss.errors import ErrorRecords, GroupedErrors, RowErrors
+
+
+EXIT_VALID = 0
+EXIT_INVALID = 1
+EXIT_USAGE = 2
+EXIT_INPUT = 3
+EXIT_OUTPUT = 4
+EXIT_ERROR = 5
+
+INPUT_FORMATS = ('csv', 'json', 'jsonl', 'xlsx')
+OUTPUT_FORMATS = ('json', 'csv', 'summary')
+
+CHUNK_SIZE = 10000
+
+
+class InputError(Exception):
+    '''
+    Raised when an input file can't be read.
+    '''
+
+
+class OutputError(Exception):
+    '''
+    Raised when a report can't be written.
+    '''
+
+
+class ReportOutput():
+    '''
+    Wraps the text stream a report is written to, so that failing to write
+    it raises OutputError rather than an OSError that could be mistaken for
+    one from reading the input.
+    '''
+
+    def __init__(self, output):
+        self.output = output
+
+    def write(self, text):
+        try:
+            return self.output.write(text)
+        except OSError as error:
+            raise OutputError(str(error)) from error
+
+    def flush(self):
+        try:
+            self.output.flush()
+        except OSError as error:
+            raise OutputError(str(error)) from error
+
+
+def guess_format(path, default='csv'):
+    '''
+    Guess the format of ``path`` from its extension.
+    '''
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+
+    if extension in ('jsonl', 'ndjson'):
+        return 'jsonl'
+    if extension in ('xlsx', 'xlsm'):
+        return 'xlsx'
+    if extension in INPUT_FORMATS:
+        return extension
+
+    return default
+
+
+class RecentLines():
+    '''
+    The file lines of the last ``size`` rows read. ``validate_rows`` only
+    looks up the rows of the chunk it has just validated, so older lines
+    needn't be kept. Call with a row number for its line, or None.
+    '''
+
+    def __init__(self, size=CHUNK_SIZE):
+        self.lines = deque(maxlen=size)
+        self.count = 0
+
+    def append(self, line):
+        self.lines.append(line)
+        self.count += 1
+
+    def __call__(self, row):
+        index = row - self.count + len(self.lines)
+        return self.lines[index] if 0 <= index < len(self.lines) else None
+
+
+def _newlines(value):
+    # Line breaks inside a quoted field, as a file opened with newline=''
+    # splits lines
+    if isinstance(value, str):
+        return value.count('\n') + value.count('\r') - value.count('\r\n')
+    if isinstance(value, list):
+        return sum(map(_newlines, value))
+    return 0
+
+
+def _csv_rows(f, lines):
+    reader = csv.DictReader(f)
+    end = 1
+
+    for row in reader:
+        start, end = end + 1, reader.line_num
+
+        if end != start:
+            # The row spans lines, or follows blank lines
+            start = end - sum(map(_newlines, row.values()))
+
+        lines.append(start)
+        yield row
+
+
+def _jsonl_rows(f, lines, number=0):
+    for number, text in enumerate(f, start=number + 1):
+        if not text.strip():
+            continue
+
+        try:
+            row = json.loads(text)
+        except ValueError as error:
+            raise InputError(f'line {number}: {error}')
+
+        if not isinstance(row, dict):
+            raise InputError(f'line {number}: expected a JSON object')
+
+        lines.append(number)
+        yield row
+
+
+def _json_rows(f, lines):
+    '''
+    Rows of a JSON array, or of JSON lines if the text doesn't start with
+    '['. An array is read whole.
+    '''
+    number = 0
+
+    for text in f:
+        number += 1
+
+        if text.strip():
+            break
+    else:
+        return
+
+    if not text.lstrip().startswith('['):
+        yield from _jsonl_rows(chain([text], f), lines, number - 1)
+        return
+
+    try:
+        rows = json.loads(text + f.read())
+    except ValueError as error:
+        raise InputError(str(error))
+
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        raise InputError('expected a JSON array of objects')
+
+    for row in rows:
+        lines.append(None)
+        yield row
+
+
+@contextlib.contextmanager
+def open_rows(path, format=None, sheet=None):
+    '''
+    Open ``path`` ('-' for stdin) and yield ``(rows, line)``: an iterator of
+    row dicts, and a function returning the file line a row starts on, or
+    None if it isn't known.
+    '''
+    format = format or guess_format(path)
+
+    if format == 'xlsx':
+        if path == '-':
+            path = io.BytesIO(sys.stdin.buffer.read())
+
+        from nwss.xlsx import read_xlsx
+
+        rows = read_xlsx(path, sheet)
+
+        try:
+            yield rows, lambda row: None
+        finally:
+            rows.close()
+
+    else:
+        lines = RecentLines()
+        read = {'csv': _csv_rows, 'json': _json_rows, 'jsonl': _jsonl_rows}[format]
+
+        if path == '-':
+            f = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8-sig', newline='')
+        else:
+            f = open(path, encoding='utf-8-sig', newline='')
+
+        try:
+            yield read(f, lines), lines
+        finally:
+            if path == '-':
+                # Leave stdin open
+                f.detach()
+            else:
+                f.close()
+
+
+class JSONReport():
+    '''
+    Writes errors as one JSON document, one row at a time.
+    '''
+
+    def __init__(self, output):
+        self.output = output
+        self.separator = '\n'
+
+    def start(self):
+        self.output.write('{"errors": [')
+
+    def add(self, row, line, messages):
+        self.output.write(self.separator)
+        self.output.write(json.dumps({'row': row, 'line': line, 'errors': messages}))
+        self.separator = ',\n'
+
+    def finish(self, n_rows, n_invalid, truncated):
+        counts = json.dumps(
+            {'rows': n_rows, 'invalid_rows': n_invalid, 'truncated': truncated}
+        )
+        self.output.write(f'\n], {counts[1:]}\n')
+
+    def state(self):
+        return {'separator': self.separator}
+
+    def restore(self, state):
+        self.separator = state['separator']
+
+
+class CSVReport():
+    '''
+    Writes a row per error message: row, line, field, error code and message.
+    '''
+
+    def __init__(self, output):
+        self.writer = csv.writer(output)
+        self.records = ErrorRecords()
+
+    def start(self):
+        self.writer.writerow(['row', 'line', 'field', 'code', 'message'])
+
+    def add(self, row, line, messages):
+        for field, field_messages in messages.items():
+            self.records.add(row, field, field_messages)
+
+        self.writer.writerows(
+            (row, line, field, code, message)
+            for row, field, code, message in self.records
+        )
+        self.records.clear()
+
+    def finish(self, n_rows, n_invalid, truncated):
+        pass
+
+    def state(self):
+        return {}
+
+    def restore(self, state):
+        pass
+
+
+class SummaryReport():
+    '''
+    Writes a count of errors per field and error code, with example rows.
+    '''
+
+    def __init__(self, output, path=None):
+        self.output = output
+        self.path = path
+        self.errors = GroupedErrors()
+
+    def start(self):
+        pass
+
+    def add(self, row, line, messages):
+        self.errors.add_messages(row, messages)
+
+    def state(self):
+        return {'errors': self.errors.to_dict()}
+
+    def restore(self, state):
+        self.errors = GroupedErrors.from_dict(state['errors'], codes=self.errors.code)
+
+    def finish(self, n_rows, n_invalid, truncated):
+        name = f'{self.path}: ' if self.path else ''
+        stopped = ' (stopped early)' if truncated else ''
+
+        self.output.write(f'{name}{n_rows} rows, {n_invalid} with errors{stopped}\n')
+
+        for group in self.errors.report():
+            examples = ', '.join(map(str, group['examples']))
+
+            self.output.write(
+                f'{group["count"]:>8}  {group["field"]}  {group["code"]}  '
+                f'{group["message"]}  (rows {examples})\n'
+            )
+
+
+def make_report(format, output, path=None):
+    if format == 'json':
+        return JSONReport(output)
+    if format == 'csv':
+        return CSVReport(output)
+
+    return SummaryReport(output, path)
+
+
+def validate_rows(rows, report, line=None, max_errors=None, chunk_size=CHUNK_SIZE,
+                  validator=None, context=None, start=(0, 0), progress=None):
+    '''
+    Validate an iterable of row dicts a chunk at a time, adding each row's
+    errors to ``report`` as the chunk is done. Stops after ``max_errors``
+    rows with errors. Returns (rows checked, rows with errors, stopped early).
+
+    To carry on from an earlier run, pass the rows checked and rows with
+    errors so far as ``start``, with the rest of the rows and a report in
+    the state it was left in. ``progress`` is called with the same two
+    counts after each chunk.
+    '''
+    from nwss.batch import ColumnarValidator, rows_to_columns
+    from nwss.utils import ValidationContext
+
+    validator = validator or ColumnarValidator()
+    context = context or ValidationContext()
+    line = line or (lambda row: None)
+
+    rows = iter(rows)
+    n_rows, n_invalid = start
+
+    if not n_rows:
+        report.start()
+
+    while True:
+        chunk = list(islice(rows, chunk_size))
+
+        if not chunk:
+            break
+
+        errors = RowErrors()
+        validator.validate(rows_to_columns(chunk), context, errors, start=n_rows)
+
+        for row in sorted(errors):
+            report.add(row, line(row), errors[row])
+            n_invalid += 1
+
+            if n_invalid == max_errors:
+                stopped = row + 1 < n_rows + len(chunk) or next(rows, None) is not None
+                report.finish(row + 1, n_invalid, stopped)
+                return row + 1, n_invalid, stopped
+
+        n_rows += len(chunk)
+
+        if progress is not None:
+            progress(n_rows, n_invalid)
+
+    report.finish(n_rows, n_invalid, False)
+
+    return n_rows, n_invalid, False
+
+
+def validate_csv_parallel(path, report, workers, max_errors=None):
+    '''
+    Validate a CSV file across ``workers`` processes, then write its errors
+    to ``report``. Returns the same as ``validate_rows``.
+    '''
+    from nwss.parallel import validate_file
+
+    n_rows, errors = validate_file(path, workers=workers, max_errors=max_errors)
+
+    rows = sorted(errors)
+    truncated = False
+
+    if max_errors is not None and len(rows) == max_errors:
+        # Stop at the last failing row, as validate_rows does
+        truncated = n_rows > rows[-1] + 1
+        n_rows = rows[-1] + 1
+
+    report.start()
+
+    # Read the file again for the lines the failing rows start on
+    failing = iter(rows)
+    wanted = next(failing, None)
+    lines = RecentLines(1)
+
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        for row, _ in enumerate(_csv_rows(f, lines)):
+            if wanted is None:
+                break
+
+            if row == wanted:
+                report.add(row, lines(row), errors[row])
+                wanted = next(failing, None)
+
+    report.finish(n_rows, len(rows), truncated)
+
+    return n_rows, len(rows), truncated
+
+
+def validate_path(path, output, format='summary', input_format=None, sheet=None,
+                  workers=1, max_errors=None, validator=None):
+    '''
+    Validate the file at ``path`` and write a report in ``format`` to the
+    text stream ``output``. Returns (rows checked, rows with errors, stopped
+    early). Raises InputError if the file can't be read, and OutputError if
+    the report can't be written.
+    '''
+    report = make_report(format, ReportOutput(output), path)
+    input_format = input_format or guess_format(path)
+
+    with input_errors():
+        if workers > 1 and input_format == 'csv' and path != '-':
+            return validate_csv_parallel(path, report, workers, max_errors)
+
+        with open_rows(path, input_format, sheet) as (rows, line):
+            return validate_rows(rows, report, line, max_errors, validator=validator)
+
+
+@contextlib.contextmanager
+def input_errors():
+    '''
+    Raise the errors of reading an input file as InputError.
+    '''
+    try:
+        yield
+    except (OSError, UnicodeDecodeError, csv.Error, zipfile.BadZipFile,
+            ParseError) as error:
+        raise InputError(str(error)) from error
+    except KeyError as error:
+        # A missing XLSX sheet
+        raise InputError(error.args[0]) from error
+
+
+def _validate_resumable(args):
+    from nwss.checkpoint import validate_resumable
+
+    if args.path == '-' or (args.input_format or guess_format(args.path)) != 'csv' \
+            or args.workers > 1:
+        sys.stderr.write('nwss: --checkpoint needs a CSV file and one worker\n')
+        return EXIT_USAGE
+
+    if args.format != 'summary' and not args.output:
+        sys.stderr.write(f'nwss: --checkpoint needs --output for {args.format} reports\n')
+        return EXIT_USAGE
+
+    try:
+        with input_errors():
+            _, n_invalid, _ = validate_resumable(
+                args.path,
+                args.checkpoint,
+                output_path=args.output,
+                format=args.format,
+                max_errors=args.max_errors,
+                interval=args.checkpoint_interval,
+            )
+    except InputError as error:
+        sys.stderr.write(f'nwss: cannot read {args.path}: {error}\n')
+        return EXIT_INPUT
+    except OutputError as error:
+        return _output_failed(error, to_stdout=not args.output)
+
+    return EXIT_INVALID if n_invalid else EXIT_VALID
+
+
+def _output_failed(error, to_stdout):
+    if to_stdout and isinstance(error.__cause__, BrokenPipeError):
+        # Whatever was reading the report stopped, e.g. `| head`. Point
+        # stdout at /dev/null so flushing it at exit doesn't fail again.
+        try:
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        except (OSError, ValueError):
+            pass
+    else:
+        sys.stderr.write(f'nwss: cannot write the report: {error}\n')
+
+    return EXIT_OUTPUT
+
+
+def _close_output(output):
+    try:
+        ReportOutput(output).flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+def _validate(args):
+    if args.checkpoint:
+        return _validate_resumable(args)
+
+    try:
+        output = open(args.output, 'w', newline='', encoding='utf-8') \
+            if args.output else sys.stdout
+
+        try:
+            _, n_invalid, _ = validate_path(
+                args.path,
+                output,
+                format=args.format,
+                input_format=args.input_format,
+                sheet=args.sheet,
+                workers=args.workers,
+                max_errors=args.max_errors,
+            )
+        finally:
+            _close_output(output)
+    except InputError as error:
+        sys.stderr.write(f'nwss: cannot read {args.path}: {error}\n')
+        return EXIT_INPUT
+    except OSError as error:
+        # Opening the output file
+        return _output_failed(OutputError(str(error)), to_stdout=False)
+    except OutputError as error:
+        return _output_failed(error, to_stdout=not args.output)
+
+    return EXIT_INVALID if n_invalid else EXIT_VALID
+
+
+def _watch(args):
+    from nwss.watch import Watcher
+
+    if not os.path.isdir(args.directory):
+        sys.stderr.write(f'nwss: {args.directory} is not a directory\n')
+        return EXIT_INPUT
+
+    def log(message):
+        sys.stderr.write(f'{message}\n')
+        sys.stderr.flush()
+
+    with Watcher(args.directory, workers=args.workers, format=args.format,
+                 interval=args.interval, log=log) as watcher:
+        if args.once:
+            entries = watcher.run_once()
+
+            if any(entry.get('failed') for entry in entries):
+                return EXIT_ERROR
+            if any('error' in entry for entry in entries):
+                return EXIT_INPUT
+            if any(entry['invalid_rows'] for entry in entries):
+                return EXIT_INVALID
+
+            return EXIT_VALID
+
+        # Shut the pool down cleanly when stopped by a service manager
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(EXIT_VALID))
+
+        try:
+            watcher.run()
+        except KeyboardInterrupt:
+            pass
+
+    return EXIT_VALID
+
+
+def _serve(args):
+    from nwss.server import ValidationServer
+
+    def log(message):
+        sys.stderr.write(f'{message}\n')
+
+    try:
+        server = ValidationServer((args.host, args.port),
+                                  log=log if args.verbose else None)
+    except OSError as error:
+        sys.stderr.write(f'nwss: cannot listen on {args.host}:{args.port}: {error}\n')
+        return EXIT_INPUT
+
+    host, port = server.server_address[:2]
+    log(f'nwss: serving on http://{host}:{port}/validate')
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(EXIT_VALID))
+
+    with server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+    return EXIT_VALID
+
+
+def _positive(value):
+    number = int(value)
+
+    if number < 1:
+        raise argparse.ArgumentTypeError(f'{value} is not a positive number')
+
+    return number
+
+
+def parser():
+    parser = argparse.ArgumentParser(
+        prog='nwss', description='Validate NWSS wastewater sample data.'
+    )
+    commands = parser.add_subparsers(dest='command', metavar='command')
+    commands.required = True
+
+    validate = commands.add_parser(
+        'validate', help='validate a CSV, JSON, JSON lines or XLSX file',
+        description='Validate a CSV, JSON, JSON lines or XLSX file against the NWSS '
+                    'schema. Exits with 0 if the file is valid, 1 if it has errors, '
+                    "2 for bad arguments, 3 if the file can't be read, 4 if the "
+                    "report can't be written and 5 for an unexpected error.",
+    )
+    validate.add_argument('path', help="file to validate, or '-' for stdin")
+    validate.add_argument('--format', choices=OUTPUT_FORMATS, default='summary',
+                          help='report format (default: summary)')
+    validate.add_argument('--input-format', choices=INPUT_FORMATS,
+                          help='input format (default: from the file extension)')
+    validate.add_argument('--sheet', help='XLSX sheet to validate (default: the first)')
+    validate.add_argument('--workers', type=_positive, default=1,
+                          help='processes to validate a CSV file with (default: 1)')
+    validate.add_argument('--max-errors', type=_positive,
+                          help='stop after this many rows with errors')
+    validate.add_argument('--output', '-o', help='write the report here, not stdout')
+    validate.add_argument('--checkpoint', metavar='PATH',
+                          help='save progress here, and resume from it if it exists')
+    validate.add_argument('--checkpoint-interval', type=float, default=30.0,
+                          metavar='SECONDS',
+                          help='seconds between checkpoints (default: 30)')
+    validate.set_defaults(run=_validate)
+
+    watch = commands.add_parser(
+        'watch', help='validate files as they arrive in a directory',
+        description='Watch a directory and validate each CSV, JSON lines or XLSX '
+                    'file that arrives, writing a report next to it.',
+    )
+    watch.add_argument('directory', help='directory to watch')
+    watch.add_argument('--format', choices=OUTPUT_FORMATS, default='json',
+                       help='report format (default: json)')
+    watch.add_argument('--workers', type=_positive, default=os.cpu_count() or 1,
+                       help='processes to validate files with (default: one per CPU)')
+    watch.add_argument('--interval', type=float, default=2.0,
+                       help='seconds between checks of the directory (default: 2)')
+    watch.add_argument('--once', action='store_true',
+                       help='validate the new files there now, then exit')
+    watch.set_defaults(run=_watch)
+
+    serve = commands.add_parser(
+        'serve', help='validate submissions sent over HTTP',
+        description='Serve a local HTTP API that validates CSV and JSON bodies '
+                    'POSTed to /validate.',
+    )
+    serve.add_argument('--host', default='127.0.0.1',
+                       help='address to listen on (default: 127.0.0.1)')
+    serve.add_argument('--port', type=int, default=8000,
+                       help='port to listen on (default: 8000)')
+    serve.add_argument('--verbose', '-v', action='store_true',
+                       help='log each request to stderr')
+    serve.set_defaults(run=_serve)
+
+    return parser
+
+
+def main(argv=None):
+    args = parser().parse_args(argv)
+
+    try:
+        return args.run(args)
+    except Exception:
+        traceback.print_exc()
+        sys.stderr.write('nwss: unexpected error\n')
+        return EXIT_ERROR
@@ -0,0 +1,397 @@
+'''
+Read a CSV file through a memory map, indexing where each record starts.
+
+``rows`` notes the byte offset and physical line number where each record
+starts as the csv module reads it, so quoted fields that span several lines
+stay in one record, and keeps them in ``array('Q')`` indexes, 16 bytes per
+row. Once a row has been read for validation, its raw text and file line
+can be looked up without reading the file again:
+
+    with IndexedCSV('samples.csv') as f:
+        for index, data, errors in schema.load_iter(f.rows()):
+            if errors:
+                print(f.line(index), f.raw(index))
+
+Looking up a row that hasn't been read yet, or the length of the file,
+scans ahead for record boundaries with ``scan_block``.
+'''
+import csv
+import mmap
+from array import array
+
+
+BLOCK_SIZE = 1 << 20
+
+
+def _block_end(buffer, pos, block_size=BLOCK_SIZE):
+    '''
+    Return where the last line that ends within ``block_size`` bytes of
+    ``pos`` ends, or where the first line ends if it is longer. Lines end
+    at LF, CRLF or a lone CR, as they do for the csv module reading a file
+    opened with ``newline=''``.
+    '''
+    size = len(buffer)
+    limit = pos + block_size
+    end = max(buffer.rfind(b'\n', pos, limit), buffer.rfind(b'\r', pos, limit)) + 1
+
+    while not end and limit < size:
+        # The first line is longer than a block: look for its end
+        stop = limit + block_size
+        lf = buffer.find(b'\n', limit, stop)
+        cr = buffer.find(b'\r', limit, stop if lf < 0 else lf)
+        end = (lf if cr < 0 else cr) + 1
+        limit = stop
+
+    if not end:
+        return size
+
+    # Keep \r\n together
+    if buffer[end - 1:end] == b'\r' and buffer[end:end + 1] == b'\n':
+        end += 1
+
+    return end
+
+
+def _blocks(buffer, pos, end, block_size=BLOCK_SIZE):
+    '''
+    Yield ``(start, stop)`` for blocks of whole lines of ``buffer[pos:end]``.
+    '''
+    while pos < end:
+        stop = min(_block_end(buffer, pos, block_size), end)
+        yield pos, stop
+        pos = stop
+
+
+def _decode_lines(block):
+    '''
+    Return the lines of a block of UTF-8 bytes as text, with their line
+    endings.
+    '''
+    if b'\r' in block:
+        return [text.decode('utf-8') for text in block.splitlines(True)]
+
+    lines = block.decode('utf-8').split('\n')
+
+    # Empty if the block ends with a newline
+    last = lines.pop()
+
+    return [text + '\n' for text in lines] + ([last] if last else [])
+
+
+def read_lines(buffer, pos, end):
+    '''
+    Yield the lines of ``buffer[pos:end]`` as text, with their line endings,
+    as iterating over a file opened with ``newline=''`` would.
+    '''
+    for start, stop in _blocks(buffer, pos, end):
+        yield from _decode_lines(buffer[start:stop])
+
+
+def scan_block(buffer, pos, line=1, block_size=BLOCK_SIZE):
+    '''
+    Find the records in the block of about ``block_size`` bytes of CSV text
+    in ``buffer`` from ``pos``, which must be the start of a record, on line
+    ``line``. Returns ``(records, pos, line)``: ``(offset, line)`` for each
+    record, skipping blank lines, and where the next block starts.
+    '''
+    end = _block_end(buffer, pos, block_size)
+    block = buffer[pos:end]
+
+    if b'"' in block:
+        return _scan_quoted(buffer, pos, line, end)
+
+    # Without quotes, every line is a record
+    records = []
+
+    for text in block.splitlines(True):
+        if text.rstrip(b'\r\n'):
+            records.append((pos, line))
+
+        pos += len(text)
+        line += 1
+
+    return records, end, line
+
+
+def _scan_quoted(buffer, pos, line, end):
+    '''
+    ``scan_block`` for a block with quotes in it. A quote only starts a
+    quoted field, which may span lines, at the start of a field, so the csv
+    module decides where each record ends, as DictReader would. The last
+    record may run on past ``end``.
+    '''
+    size = len(buffer)
+    starts = []
+    stops = []
+
+    def lines(start):
+        for start, stop in _blocks(buffer, start, size):
+            for text in buffer[start:stop].splitlines(True):
+                starts.append(start)
+                start += len(text)
+                stops.append(start)
+                yield text.decode('utf-8')
+
+    # The reader takes a line only when it needs one, so the lines it has
+    # taken end with the record it returned
+    reader = csv.reader(lines(pos))
+    records = []
+    consumed = 0
+
+    while pos < end:
+        fields = next(reader, None)
+
+        if fields is None:
+            return records, size, line + len(starts)
+
+        if fields:
+            records.append((starts[consumed], line + consumed))
+
+        consumed = reader.line_num
+        pos = stops[-1]
+
+    return records, pos, line + consumed
+
+
+class IndexedCSV():
+    '''
+    A CSV file with a header row, read as dicts like ``csv.DictReader``.
+    Rows are numbered from 0 after the header, as ``load_iter`` and
+    ``WaterSampleSchema(many=True)`` number them; blank lines are skipped.
+
+    Pass ``start=(offset, row, line)``, as returned by ``position``, to read
+    from row ``row`` onwards, e.g. to resume an interrupted run. Earlier rows
+    aren't indexed then.
+    '''
+
+    def __init__(self, path, start=None):
+        self.path = path
+
+        with open(path, 'rb') as f:
+            try:
+                self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files can't be mapped
+                self.buffer = b''
+
+        self.offsets = array('Q')
+        self.lines = array('Q')
+
+        self._pos = 3 if self.buffer[:3] == b'\xef\xbb\xbf' else 0
+        self._line = 1
+        self._done = False
+
+        # Byte offset of the header row, and of the first record after it
+        self.header = None
+
+        while not self.offsets and not self._done:
+            self._scan_block()
+
+        self._header_end = self.offsets[0] if self.offsets else len(self.buffer)
+
+        # Byte offset and line rows are read from
+        self._start = self._header_end
+        self._start_line = self.lines[0] if self.lines else self._line
+
+        # Number of the first indexed row
+        self.first = 0
+
+        if start is not None and self.header is not None:
+            offset, self.first, self._line = start
+            self._start_line = self._line
+
+            self.offsets = array('Q')
+            self.lines = array('Q')
+            self._pos = self._start = offset
+            self._done = offset >= len(self.buffer)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+
+    def __len__(self):
+        self._scan_to(None)
+        return self.first + len(self.offsets)
+
+    def _add(self, offset, line):
+        if self.header is None:
+            self.header = offset
+        else:
+            self.offsets.append(offset)
+            self.lines.append(line)
+
+    def _scan_block(self):
+        '''
+        Index the records in the next block of lines.
+        '''
+        records, self._pos, self._line = scan_block(self.buffer, self._pos, self._line)
+
+        for offset, line in records:
+            self._add(offset, line)
+
+        if self._pos >= len(self.buffer):
+            self._done = True
+
+    def _scan_to(self, row):
+        '''
+        Index records until ``row`` is indexed (or all of them, if ``row``
+        is None). Returns whether ``row`` exists.
+        '''
+        first = self.first
+
+        while not self._done and (row is None or row - first >= len(self.offsets)):
+            self._scan_block()
+
+        return row is not None and row - first < len(self.offsets)
+
+    def _check(self, row):
+        if row < self.first:
+            raise IndexError(f'Row {row} is before row {self.first}, where reading began')
+        if not self._scan_to(row):
+            raise IndexError(f'Row {row} is past the end of {self.path}')
+
+    def _span(self, row):
+        self._check(row)
+        start = self.offsets[row - self.first]
+
+        if self._scan_to(row + 1):
+            return start, self.offsets[row + 1 - self.first]
+
+        return start, len(self.buffer)
+
+    def position(self, row):
+        '''
+        Return ``(offset, row, line)`` for where ``row`` starts, to pass as
+        ``start`` to read from there later. Rows past the end start at the
+        end of the file.
+        '''
+        if self._scan_to(row):
+            return self.offsets[row - self.first], row, self.lines[row - self.first]
+
+        if row != len(self):
+            raise IndexError(f'Row {row} is past the end of {self.path}')
+
+        return len(self.buffer), row, self._line
+
+    def raw(self, row):
+        '''
+        Return the text of ``row`` as it appears in the file, without its
+        line ending. Rows not yet read are indexed first.
+        '''
+        start, end = self._span(row)
+        text = self.buffer[start:end].decode('utf-8')
+
+        # Drop the line ending and any blank lines before the next record
+        return text.rstrip('\r\n')
+
+    def line(self, row):
+        '''
+        Return the 1-based line of the file that ``row`` starts on.
+        '''
+        self._check(row)
+        return self.lines[row - self.first]
+
+    def _lines(self, pos, end, spans=None):
+        '''
+        Yield the lines of ``[pos, end)`` as text, appending the byte span of
+        each to ``spans`` as it is yielded, if given.
+        '''
+        buffer = self.buffer
+        released = pos
+
+        for start, stop in _blocks(buffer, pos, end):
+            if spans is None:
+                yield from _decode_lines(buffer[start:stop])
+            else:
+                for text in buffer[start:stop].splitlines(True):
+                    spans.append((start, start + len(text)))
+                    start += len(text)
+                    yield text.decode('utf-8')
+
+            if stop - released > BLOCK_SIZE:
+                released = self._release(released, stop)
+
+    def _release(self, start, end):
+        '''
+        Let the OS drop the pages of ``[start, end)`` that have been read, so
+        streaming a large file doesn't grow the process's resident memory.
+        Pages are read back in if a row in them is looked up again. Returns
+        the offset released up to.
+        '''
+        advice = getattr(mmap, 'MADV_DONTNEED', None)
+
+        if advice is None or not hasattr(self.buffer, 'madvise'):
+            return end
+
+        start -= start % mmap.PAGESIZE
+        end -= end % mmap.PAGESIZE
+
+        if end > start:
+            self.buffer.madvise(advice, start, end - start)
+
+        return end
+
+    def rows(self):
+        '''
+        Yield a dict per row, keyed by the header, as ``csv.DictReader``
+        reads the file. Rows are indexed from the same read as they are
+        yielded, so reading them doesn't scan the file a second time.
+        '''
+        if self.header is None:
+            return
+
+        fieldnames = next(csv.reader(self._lines(self.header, self._header_end)), [])
+
+        # Byte spans of the lines the reader has taken for the next row
+        spans = []
+        reader = csv.reader(self._lines(self._start, len(self.buffer), spans))
+        row, line = self.first, self._start_line
+
+        for fields in reader:
+            offset, stop = spans[0][0], spans[-1][1]
+            n_lines = len(spans)
+            spans.clear()
+
+            if fields:
+                self._index(row, offset, line, stop, line + n_lines)
+                row += 1
+
+                # As DictReader fills in short rows and collects long ones
+                data = dict(zip(fieldnames, fields))
+
+                if len(fields) > len(fieldnames):
+                    data[None] = fields[len(fieldnames):]
+                else:
+                    for key in fieldnames[len(fields):]:
+                        data[key] = None
+
+                yield data
+
+            line += n_lines
+
+        if len(self.offsets) == row - self.first:
+            self._pos, self._line, self._done = len(self.buffer), line, True
+
+    def _index(self, row, offset, line, stop, next_line):
+        '''
+        Index ``row``, read by ``rows``, unless a look up has already
+        scanned past it.
+        '''
+        if row - self.first == len(self.offsets):
+            self.offsets.append(offset)
+            self.lines.append(line)
+            self._pos, self._line = stop, next_line
+
+    def report(self, errors):
+        '''
+        Yield ``(row, line, raw text, messages)`` for each row of ``errors``
+        keyed by row number, such as ``RowErrors``, in row order.
+        '''
+        for row in sorted(errors):
+            yield row, self.line(row), self.raw(row), errors[row]
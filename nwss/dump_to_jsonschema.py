@@ -1,250 +1,172 @@
+import hashlib
 import json
+import os
+import pkgutil
 import sys
-from marshmallow_jsonschema import JSONSchema
-from nwss.schemas import WaterSampleSchema
-
-schema = WaterSampleSchema(many=True)
-
-json_schema = JSONSchema()
-
-s = json_schema.dump(schema)
-
-custom_validators = {
-    'allOf': [
-        {
-            'if': {
-                'properties': {
-                    'hum_frac_mic_conc': {
-                        'type': ['string'],
-                        'minLength': 1
-                    },
-                },
-                'required': ['hum_frac_mic_conc']
-            },
-            'then': {
-                'properties': {
-                    'hum_frac_mic_unit': {
-                        'type': ['string'],
-                        'minLength': 1
-                    },
-                    'hum_frac_target_mic': {
-                        'type': ['string'],
-                        'minLength': 1
-                    },
-                    'hum_frac_target_mic_ref': {
-                        'type': ['string'],
-                        'minLength': 1
-                    },
-                },
-                'required': [
-                    'hum_frac_mic_unit',
-                    'hum_frac_target_mic',
-                    'hum_frac_target_mic_ref'
-                ]
-            }
-        },
-        {
-            'if': {
-                'properties': {
-                    'hum_frac_chem_conc': {
-                        'type': ['string'],
-                        'minLength': 1
-                    }
-                },
-                'required': ['hum_frac_chem_conc']
-            },
-            'then': {
-                'properties': {
-                    'hum_frac_chem_unit': {
-                        'type': ['string'],
-                        'minLength': 1
-                    },
-                    'hum_frac_target_chem': {
-                        'type': ['string'],
-                        'minLength': 1
-                    },
-                    'hum_frac_target_chem_ref': {
-                        'type': ['string'],
-                        'minLength': 1
-                    },
-                },
-                'required': [
-                    'hum_frac_chem_unit',
-                    'hum_frac_target_chem',
-                    'hum_frac_target_chem_ref'
-                ]
-            }
-        },
-        {
-            'if': {
-                'properties': {
-                    'other_norm_conc': {
-                        'type': ['string'],
-                        'minLength': 1
-                    }
-                },
-                'required': ['other_norm_conc']
-            },
-            'then': {
-                'properties': {
-                    'other_norm_name': {
-                        'type': ['string'],
-                        'minLength': 1
-                    },
-                    'other_norm_unit': {
-                        'type': ['string'],
-                        'minLength': 1
-                    },
-                    'other_norm_ref': {
-                        'type': ['string'],
-                        'minLength': 1
-                    },
-                },
-                'required': [
-                        'other_norm_name',
-                        'other_norm_unit',
-                        'other_norm_ref'
-                    ]
-            }
-        },
-        {
-            'if': {
-                'properties': {
-                    'sample_location': {'enum': ['upstream']},
-                },
-                'required': ['sample_location'],
-            },
-            'then': {
-                'properties': {
-                    'sample_location_specify': {
-                        'type': ['string'],
-                        'minLength': 1
-                    }
-                },
-                'required': ['sample_location_specify'],
-            },
-        },
-        {
-            'if': {
-                'properties': {
-                    'pretreatment': {'enum': ['yes']},
-                },
-                'required': ['pretreatment'],
-            },
-            'then': {
-                'properties': {
-                    'pretreatment_specify': {
-                        'type': ['string'],
-                        'minLength': 1
-                    }
-                },
-                'required': ['pretreatment_specify'],
-            },
-        },
-        {
-            'if': {
-                'properties': {
-                    'sample_matrix': {
-                        'enum': [
-                            'raw wastewater',
-                            'post grit removal',
-                            'primary effluent',
-                            'secondary effluent',
-                        ]
-                    },
-                },
-                'required': ['sample_matrix'],
-            },
-            'then': {
-                'properties': {
-                    'flow_rate': {'type': ['number']},
-                },
-                'required': ['flow_rate'],
-            },
-        },
-        {
-            'if': {
-                'properties': {'inhibition_detect': {'enum': ['yes']}},
-                'required': ['inhibition_detect'],
-            },
-            'then': {
-                'properties': {
-                    'inhibition_adjust': {
-                        'type': ['string'],
-                        'minLength': 1
-                    },
-                    'inhibition_method': {
-                        'type': ['string'],
-                        'minLength': 1
-                    }
-                },
-                'required': [
-                    'inhibition_adjust',
-                    'inhibition_method'
-                ],
-            }
-        },
-        {
-            'if': {
-                'properties': {
-                    'inhibition_detect': {'enum': ['not tested']}
-                }
-            },
-            'then': {
-                'properties': {'inhibition_method': {'enum': ['none']}}
+from functools import lru_cache
+
+from nwss import rules
+
+
+# Prebuilt JSON schema, written into the package at build time
+ARTIFACT = 'jsonschema.json'
+
+# Modules the JSON schema is generated from
+SOURCES = [
+    'schemas.py',
+    'value_sets.py',
+    'fields.py',
+    'validators.py',
+    'rules.py',
+    'dump_to_jsonschema.py',
+]
+
+
+@lru_cache(maxsize=None)
+def build_schema():
+    '''
+    Build the JSON schema from WaterSampleSchema. marshmallow and the schema
+    are only imported, and the JSON schema only generated, on first call.
+    '''
+    from marshmallow_jsonschema import JSONSchema
+    from nwss.schemas import WaterSampleSchema
+
+    schema = WaterSampleSchema(many=True)
+
+    json_schema = JSONSchema()
+
+    s = json_schema.dump(schema)
+
+    # Get properties so we can mutate it and
+    # ultimately add it back to the schema.
+    properties = s['definitions']['WaterSampleSchema'].pop('properties')
+
+    # Add None to fields that can be empty. These fields
+    # must have null as an enum in the JSON schema.
+    for key, property in properties.items():
+        if property.get('enum'):
+            property.update({
+                'case_insensitive_enums': True
+            })
+
+            if 'null' in property['type']:
+                property['enum'].append(None)
+
+        if property.get('format') == 'time':
+            # Add a regex to validate the time string based on the pattern.
+            hh_mm_ss_regex = '^([0-1]?[0-9]|2[0-3]):[0-5][0-9](:[0-5][0-9])?$'
+            property['pattern'] = hh_mm_ss_regex
+            # Remove the format key so the regex validates instead.
+            property.pop('format')
+
+    # Conditional validation, generated from the same rules WaterSampleSchema
+    # uses
+    s['definitions']['WaterSampleSchema'].update({
+        'properties': {**properties},
+        'allOf': rules.json_schema(),
+    })
+
+    # Reshape the schema so it accepts an array
+    # of the WaterSampleSchema objects.
+    s['definitions'].update({
+        'schema': {
+            'type': 'array',
+            'items': {
+              '$ref': '#/definitions/WaterSampleSchema'
             }
         }
-    ]
-}
-
-# Get properties so we can mutate it and
-# ultimately add it back to the schema.
-properties = s['definitions']['WaterSampleSchema'].pop('properties')
-
-# Add None to fields that can be empty. These fields
-# must have null as an enum in the JSON schema.
-for key, property in properties.items():
-    if property.get('enum'):
-        property.update({
-            'case_insensitive_enums': True
-        })
-
-        if 'null' in property['type']:
-            property['enum'].append(None)
-
-    if property.get('format') == 'time':
-        # Add a regex to validate the time string based on the pattern.
-        hh_mm_ss_regex = '^([0-1]?[0-9]|2[0-3]):[0-5][0-9](:[0-5][0-9])?$'
-        property['pattern'] = hh_mm_ss_regex
-        # Remove the format key so the regex validates instead.
-        property.pop('format')
-
-s['definitions']['WaterSampleSchema'].update({
-    'properties': {**properties},
-    **custom_validators
-})
-
-# Reshape the schema so it accepts an array
-# of the WaterSampleSchema objects.
-s['definitions'].update({
-    'schema': {
-        'type': 'array',
-        'items': {
-          '$ref': '#/definitions/WaterSampleSchema'
-        }
-    }
-})
+    })
+
+    # Change the top-level ref to use 'schema',
+    # instead of '#/definitions/WaterSampleSchema'.
+    s.update({
+        '$ref': '#/definitions/schema',
+    })
+
+    return s
+
+
+def __getattr__(name):
+    # The generated schema used to be built at import time as ``s``
+    if name == 's':
+        return load_schema()
+
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def _read_resource(name):
+    try:
+        from importlib.resources import files
+    except ImportError:
+        # Python < 3.9; importlib.resources itself is new in 3.7
+        content = pkgutil.get_data('nwss', name)
+
+        if content is None:
+            raise FileNotFoundError(name)
+
+        return content
+
+    return files('nwss').joinpath(name).read_bytes()
+
+
+def source_hash():
+    '''
+    Return a hash of the modules the JSON schema is generated from.
+    '''
+    digest = hashlib.sha256()
+
+    for name in SOURCES:
+        digest.update(_read_resource(name))
+
+    return digest.hexdigest()
+
+
+def write_artifact(path):
+    '''
+    Write the JSON schema to ``path``, along with the hash of the sources it
+    was generated from.
+    '''
+    with open(path, 'w') as f:
+        json.dump({'source_hash': source_hash(), 'schema': build_schema()}, f)
+
+
+def read_artifact(path=None):
+    '''
+    Return the prebuilt JSON schema, or None if there isn't one or it was
+    generated from different sources.
+    '''
+    try:
+        if path is None:
+            content = _read_resource(ARTIFACT)
+        else:
+            with open(path, 'rb') as f:
+                content = f.read()
+
+        artifact = json.loads(content)
+
+        if artifact['source_hash'] == source_hash():
+            return artifact['schema']
+    except (OSError, ValueError, KeyError):
+        pass
+
+    return None
+
 
-# Change the top-level ref to use 'schema',
-# instead of '#/definitions/WaterSampleSchema'.
-s.update({
-    '$ref': '#/definitions/schema',
-})
+@lru_cache(maxsize=None)
+def load_schema():
+    '''
+    Return the JSON schema, loading the prebuilt copy shipped with the
+    package when it is up to date, and generating it otherwise.
+    '''
+    return read_artifact() or build_schema()
 
 
 def dump_schema():
-    json.dump(s, sys.stdout, indent=4)
+    json.dump(load_schema(), sys.stdout, indent=4)
 
 
 if __name__ == "__main__":
-    dump_schema()
+    if sys.argv[1:2] == ['--write-artifact']:
+        write_artifact(os.path.join(os.path.dirname(__file__), ARTIFACT))
+    else:
+        dump_schema()
@@ -0,0 +1,182 @@
+'''
+Find samples reported more than once in a submission.
+
+Rows with the same ``sample_id``, ``lab_id`` and ``pcr_target`` are
+duplicates. ``DuplicateFinder`` takes rows as they are validated and keeps
+the first row of each key in memory. Once it holds ``max_keys`` keys, it
+spills them to partition files on disk, split by a hash of the key, and
+starts again; at the end each partition is grouped on its own, so memory
+stays bounded by the size of one partition:
+
+    with DuplicateFinder() as finder:
+        for index, data, errors in schema.load_iter(rows):
+            finder.add(index, data)
+
+        for key, rows in finder.duplicates():
+            ...
+'''
+import os
+import pickle
+import tempfile
+import zlib
+
+from marshmallow.error_store import SCHEMA
+
+
+KEY_FIELDS = ('sample_id', 'lab_id', 'pcr_target')
+
+MESSAGE = 'Another row has the same sample_id, lab_id and pcr_target.'
+
+
+class DuplicateFinder():
+    '''
+    Collect the key of each row with ``add`` or ``add_columns``, then list
+    the keys seen more than once with ``duplicates``. Rows missing any part
+    of the key are ignored.
+    '''
+
+    def __init__(self, fields=KEY_FIELDS, max_keys=1000000, partitions=64,
+                 directory=None):
+        self.fields = fields
+        self.max_keys = max_keys
+        self.partitions = partitions
+        self.directory = directory
+
+        # Key -> first row, and key -> later rows for keys seen again
+        self._first = {}
+        self._repeats = {}
+
+        self._spill_dir = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._spill_dir is not None:
+            self._spill_dir.cleanup()
+            self._spill_dir = None
+
+    def add(self, row, data):
+        '''
+        Add the key of ``row`` from its deserialized ``data``.
+        '''
+        try:
+            key = tuple(data[field] for field in self.fields)
+        except KeyError:
+            return
+
+        self._add(row, key)
+
+    def add_columns(self, columns, start=0):
+        '''
+        Add the keys of a batch of rows from deserialized ``columns``, such as
+        the data returned by ``ColumnarValidator.validate``, numbering rows
+        from ``start``.
+        '''
+        try:
+            keys = zip(*(columns[field] for field in self.fields))
+        except KeyError:
+            return
+
+        for row, key in enumerate(keys, start=start):
+            self._add(row, key)
+
+    def _add(self, row, key):
+        if None in key:
+            return
+
+        first = self._first.setdefault(key, row)
+
+        if first != row:
+            self._repeats.setdefault(key, []).append(row)
+        elif len(self._first) > self.max_keys:
+            self._spill()
+
+    def _partition_path(self, partition):
+        return os.path.join(self._spill_dir.name, f'{partition}.pickle')
+
+    def _spill(self):
+        '''
+        Append the keys in memory to their partition files and clear them.
+        '''
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.TemporaryDirectory(
+                prefix='nwss-duplicates-', dir=self.directory
+            )
+
+        partitions = [[] for _ in range(self.partitions)]
+
+        for key, first in self._first.items():
+            rows = partitions[self._partition(key)]
+            rows.append((key, first))
+            rows.extend((key, row) for row in self._repeats.get(key, ()))
+
+        for partition, rows in enumerate(partitions):
+            if rows:
+                with open(self._partition_path(partition), 'ab') as f:
+                    pickle.dump(rows, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        self._first.clear()
+        self._repeats.clear()
+
+    def _partition(self, key):
+        return zlib.crc32(repr(key).encode('utf-8')) % self.partitions
+
+    def _read_partition(self, partition):
+        rows = {}
+        path = self._partition_path(partition)
+
+        if not os.path.exists(path):
+            return rows
+
+        with open(path, 'rb') as f:
+            while True:
+                try:
+                    chunk = pickle.load(f)
+                except EOFError:
+                    break
+
+                for key, row in chunk:
+                    rows.setdefault(key, []).append(row)
+
+        return rows
+
+    def duplicates(self):
+        '''
+        Return ``(key, rows)`` for each key added more than once, with all of
+        its rows in ascending order, ordered by first row.
+        '''
+        if self._spill_dir is None:
+            groups = [
+                (key, [self._first[key], *rows])
+                for key, rows in self._repeats.items()
+            ]
+        else:
+            self._spill()
+
+            groups = []
+
+            for partition in range(self.partitions):
+                groups.extend(
+                    (key, rows)
+                    for key, rows in self._read_partition(partition).items()
+                    if len(rows) > 1
+                )
+
+        groups = [(key, sorted(rows)) for key, rows in groups]
+        groups.sort(key=lambda group: group[1][0])
+
+        return groups
+
+    def add_errors(self, errors):
+        '''
+        Add an error for every row of a duplicate to an error container, such
+        as ``RowErrors`` or ``GroupedErrors``.
+        '''
+        rows = sorted(row for _, group in self.duplicates() for row in group)
+
+        for row in rows:
+            errors.add(row, SCHEMA, [MESSAGE])
@@ -0,0 +1,320 @@
+'''
+Containers for validation errors.
+
+``RowErrors`` holds errors in the ``{row: {field: [messages]}}`` shape of
+``WaterSampleSchema(many=True).load``. For large files with systematic
+mistakes, ``GroupedErrors`` instead keeps one group per (field, error code)
+with a count, the first few example rows and the failing rows as runs, so
+its size grows with the number of distinct mistakes rather than the number
+of failing rows. ``ErrorRecords`` is a flat list of
+``(row, field, code, message)`` tuples, for tabular reports.
+
+All three are filled one error at a time via ``add(row, field, messages)``, and
+can be passed to ``ColumnarValidator.validate`` and
+``nwss.parallel.validate_file``.
+'''
+from bisect import bisect_right
+
+from marshmallow.decorators import VALIDATES
+from marshmallow.error_store import SCHEMA
+
+from nwss import duplicates
+
+
+class RowErrors(dict):
+    '''
+    Error messages keyed by row, then field.
+    '''
+
+    def add(self, row, field, messages):
+        row_errors = self.setdefault(row, {})
+
+        if isinstance(messages, dict):
+            row_errors.setdefault(field, {}).update(messages)
+        else:
+            row_errors.setdefault(field, []).extend(messages)
+
+    def merge(self, other, offset=0):
+        '''
+        Add the errors in ``other``, shifting its rows by ``offset``.
+        '''
+        self.update((offset + row, messages) for row, messages in other.items())
+
+
+class ErrorRecords(list):
+    '''
+    Errors as a flat list of ``(row, field, code, message)`` tuples.
+    '''
+
+    def __init__(self, schema=None):
+        super().__init__()
+        self.code = ErrorCodes(schema)
+
+    def add(self, row, field, messages):
+        if isinstance(messages, dict):
+            for key, nested in messages.items():
+                self.add(row, f'{field}.{key}', nested)
+            return
+
+        for message in messages:
+            self.append((row, field, self.code(field, message), message))
+
+    def merge(self, other, offset=0):
+        self.extend((offset + row, *error) for row, *error in other)
+
+
+class RowSet():
+    '''
+    A set of row numbers, stored as sorted [start, stop) runs. Adding rows in
+    ascending order, as validation does, only ever touches the last run.
+    '''
+
+    __slots__ = ('runs',)
+
+    def __init__(self, runs=()):
+        self.runs = [list(run) for run in runs]
+
+    def add(self, row):
+        '''
+        Add ``row``, returning False if it was already in the set.
+        '''
+        runs = self.runs
+
+        if runs and runs[-1][1] == row:
+            runs[-1][1] += 1
+        elif not runs or row > runs[-1][1]:
+            runs.append([row, row + 1])
+        else:
+            return self._insert(row)
+
+        return True
+
+    def _insert(self, row):
+        runs = self.runs
+        index = bisect_right([start for start, stop in runs], row) - 1
+
+        if index >= 0 and row < runs[index][1]:
+            return False
+
+        joins_previous = index >= 0 and runs[index][1] == row
+        joins_next = index + 1 < len(runs) and runs[index + 1][0] == row + 1
+
+        if joins_previous and joins_next:
+            runs[index][1] = runs.pop(index + 1)[1]
+        elif joins_previous:
+            runs[index][1] += 1
+        elif joins_next:
+            runs[index + 1][0] -= 1
+        else:
+            runs.insert(index + 1, [row, row + 1])
+
+        return True
+
+    def __contains__(self, row):
+        index = bisect_right([start for start, stop in self.runs], row) - 1
+        return index >= 0 and row < self.runs[index][1]
+
+    def __iter__(self):
+        for start, stop in self.runs:
+            yield from range(start, stop)
+
+    def __len__(self):
+        return sum(stop - start for start, stop in self.runs)
+
+    def __eq__(self, other):
+        return isinstance(other, RowSet) and self.runs == other.runs
+
+
+class ErrorGroup():
+    '''
+    Every row that failed ``field`` with the same error ``code``.
+    ``message`` is the first message seen for the group.
+    '''
+
+    def __init__(self, field, code, message):
+        self.field = field
+        self.code = code
+        self.message = message
+        self.count = 0
+        self.examples = []
+        self.rows = RowSet()
+
+    def add(self, row, max_examples):
+        if self.rows.add(row):
+            self.count += 1
+
+            if len(self.examples) < max_examples:
+                self.examples.append(row)
+
+    def to_dict(self):
+        return {
+            'field': self.field,
+            'code': self.code,
+            'message': self.message,
+            'count': self.count,
+            'examples': list(self.examples),
+            'rows': [list(run) for run in self.rows.runs],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        '''
+        Rebuild a group from ``to_dict`` output.
+        '''
+        group = cls(data['field'], data['code'], data['message'])
+        group.count = data['count']
+        group.examples = list(data['examples'])
+        group.rows = RowSet(data['rows'])
+
+        return group
+
+
+class ErrorCodes():
+    '''
+    Look up a short code for an error message: the key of the field's error
+    message (e.g. ``required``), the name of the field's validator (e.g.
+    ``Regexp``) or ``validates`` hook, or the code of the failing
+    cross-field rule. Call with ``(field, message)``.
+    '''
+
+    def __init__(self, schema=None):
+        self.schema = schema
+        self.codes = {}
+
+    def __getstate__(self):
+        # Codes are looked up again from the receiving process's schema
+        return {'schema': None, 'codes': {}}
+
+    def __call__(self, field, message):
+        try:
+            return self.codes[field, message]
+        except KeyError:
+            code = self.codes[field, message] = self._find_code(field, message)
+            return code
+
+    def _find_code(self, field_name, message):
+        if self.schema is None:
+            from nwss.schemas import WaterSampleSchema
+            self.schema = WaterSampleSchema()
+
+        if field_name == SCHEMA:
+            if message == duplicates.MESSAGE:
+                return 'duplicate'
+
+            for rule in getattr(self.schema, 'cross_field_rules', []):
+                if rule.message == message:
+                    return rule.code
+            return 'schema'
+
+        fields = {
+            field.data_key or name: (name, field)
+            for name, field in self.schema.load_fields.items()
+        }
+
+        if field_name not in fields:
+            return 'unknown'
+
+        name, field = fields[field_name]
+
+        for key, error_message in field.error_messages.items():
+            if error_message == message:
+                return key
+
+        if len(field.validators) == 1:
+            # Unwrap a validator being timed by nwss.profiling
+            validator = field.validators[0]
+            return type(getattr(validator, '__wrapped__', validator)).__name__
+
+        # Avoid a circular import: nwss.batch stores its errors here
+        from nwss.batch import _hooks
+
+        for hook, hook_kwargs in _hooks(self.schema, VALIDATES):
+            if hook_kwargs['field_name'] == name:
+                return hook.__name__
+
+        return 'invalid'
+
+
+class GroupedErrors():
+    '''
+    Errors grouped by (field, error code), with codes from ``ErrorCodes``.
+    Pass ``codes`` to share one ``ErrorCodes`` and its cache between
+    containers.
+    '''
+
+    def __init__(self, schema=None, examples=5, codes=None):
+        self.code = codes or ErrorCodes(schema)
+        self.examples = examples
+        self.groups = {}
+
+    def add(self, row, field, messages):
+        if isinstance(messages, dict):
+            for key, nested in messages.items():
+                self.add(row, f'{field}.{key}', nested)
+            return
+
+        for message in messages:
+            code = self.code(field, message)
+
+            try:
+                group = self.groups[field, code]
+            except KeyError:
+                group = self.groups[field, code] = ErrorGroup(field, code, message)
+
+            group.add(row, self.examples)
+
+    def add_messages(self, row, messages):
+        '''
+        Add one row's ``{field: [messages]}``, as from ``schema.load``.
+        '''
+        for field, field_messages in messages.items():
+            self.add(row, field, field_messages)
+
+    def merge(self, other, offset=0):
+        '''
+        Add the groups in ``other``, shifting its rows by ``offset``.
+        '''
+        for key, other_group in other.groups.items():
+            try:
+                group = self.groups[key]
+            except KeyError:
+                group = self.groups[key] = ErrorGroup(*key, other_group.message)
+
+            for start, stop in other_group.rows.runs:
+                for row in range(offset + start, offset + stop):
+                    group.add(row, self.examples)
+
+    def to_dict(self):
+        '''
+        Return the groups, with every row in them, as plain data that can be
+        written as JSON.
+        '''
+        return {
+            'examples': self.examples,
+            'groups': [group.to_dict() for group in self.groups.values()],
+        }
+
+    @classmethod
+    def from_dict(cls, data, schema=None, codes=None):
+        '''
+        Rebuild grouped errors from ``to_dict`` output.
+        '''
+        errors = cls(schema, data['examples'], codes)
+
+        for group in map(ErrorGroup.from_dict, data['groups']):
+            errors.groups[group.field, group.code] = group
+
+        return errors
+
+    def __bool__(self):
+        return bool(self.groups)
+
+    def __len__(self):
+        return len(self.groups)
+
+    def report(self):
+        '''
+        Return the groups as dicts, most frequent first.
+        '''
+        groups = sorted(self.groups.values(), key=lambda group: -group.count)
+        return [group.to_dict() for group in groups]
@@ -14,6 +14,9 @@ class CategoricalString(fields.String):
         # Add allowed value validation
         kwargs['validate'] = nwss_validators.CaseInsensitiveOneOf(allowed_values)
 
+        # Share the value set index with the validator
+        self.index = kwargs['validate'].index
+
         # Get error_messages, if provided, or create a fresh dict
         error_messages = kwargs.pop('error_messages', {})
 
@@ -25,6 +28,13 @@ class CategoricalString(fields.String):
         # Initialize as normal
         super().__init__(*args, **kwargs)
 
+    def _deserialize(self, value, attr, data, **kwargs):
+        value = super()._deserialize(value, attr, data, **kwargs)
+
+        # Return allowed values in their canonical casing. Unknown values
+        # are passed through for the validator to reject.
+        return self.index.canonical(value) or value
+
 
 class ListString(fields.String):
     '''
@@ -36,5 +46,8 @@ class ListString(fields.String):
         return ','.join(value)
 
     def _deserialize(self, value, attr, obj, **kwargs):
+        # Reject values that aren't strings as String does
+        value = super()._deserialize(value, attr, obj, **kwargs)
+
         if value:
             return value.split(',')
@@ -0,0 +1,181 @@
+'''
+Remember the samples accepted in earlier submissions.
+
+Labs often resubmit overlapping date ranges. ``SampleHistory`` keeps a
+SQLite database of accepted rows, keyed by ``sample_id``, ``lab_id``,
+``pcr_target`` and ``sample_collect_date``, with a digest of the row's
+deserialized values. New rows are looked up a batch at a time, by joining a
+temporary table of their keys against the index, and each is classified as
+``NEW`` (key not seen before), ``IDENTICAL`` (same key and values) or
+``CONFLICT`` (same key, different values):
+
+    with SampleHistory('accepted.sqlite') as history:
+        for row, status in zip(rows, history.classify(rows)):
+            ...
+
+        history.add(accepted_rows, source='lab-2021-06-01.csv')
+'''
+import datetime
+import hashlib
+import json
+import sqlite3
+from itertools import islice
+
+
+KEY_FIELDS = ('sample_id', 'lab_id', 'pcr_target', 'sample_collect_date')
+
+NEW = 'new'
+IDENTICAL = 'identical'
+CONFLICT = 'conflict'
+
+
+def _default(value):
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+
+    return str(value)
+
+
+def digest(data):
+    '''
+    Return a digest of a row's deserialized values, independent of key order.
+    '''
+    text = json.dumps(data, sort_keys=True, default=_default)
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _key(data):
+    '''
+    Return the row's key as text, or None if any part of it is missing.
+    '''
+    key = tuple(data.get(field) for field in KEY_FIELDS)
+
+    if None in key:
+        return None
+
+    return tuple(_default(value) for value in key)
+
+
+class SampleHistory():
+    '''
+    An index of accepted samples, stored in the SQLite database at ``path``
+    (created if need be).
+    '''
+
+    def __init__(self, path, batch_size=10000):
+        self.batch_size = batch_size
+        self.connection = sqlite3.connect(path)
+
+        with self.connection:
+            self.connection.execute('''
+                CREATE TABLE IF NOT EXISTS samples (
+                    sample_id TEXT NOT NULL,
+                    lab_id TEXT NOT NULL,
+                    pcr_target TEXT NOT NULL,
+                    sample_collect_date TEXT NOT NULL,
+                    digest TEXT NOT NULL,
+                    source TEXT,
+                    PRIMARY KEY (sample_id, lab_id, pcr_target, sample_collect_date)
+                ) WITHOUT ROWID
+            ''')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM samples').fetchone()[0]
+
+    def classify(self, rows):
+        '''
+        Yield NEW, IDENTICAL or CONFLICT for each row of deserialized data in
+        ``rows``, or None for rows missing part of the key.
+        '''
+        rows = iter(rows)
+
+        while True:
+            batch = list(islice(rows, self.batch_size))
+
+            if not batch:
+                return
+
+            yield from self._classify_batch(batch)
+
+    def _classify_batch(self, batch):
+        keys = [_key(data) for data in batch]
+
+        stored = self._lookup(
+            (position, *key) for position, key in enumerate(keys) if key is not None
+        )
+
+        for position, (data, key) in enumerate(zip(batch, keys)):
+            if key is None:
+                yield None
+            elif position not in stored:
+                yield NEW
+            elif stored[position] == digest(data):
+                yield IDENTICAL
+            else:
+                yield CONFLICT
+
+    def _lookup(self, keys):
+        '''
+        Return {position: stored digest} for the (position, *key) tuples in
+        ``keys`` that are in the index, with a single query.
+        '''
+        cursor = self.connection.cursor()
+
+        cursor.execute('''
+            CREATE TEMPORARY TABLE IF NOT EXISTS batch (
+                position INTEGER PRIMARY KEY,
+                sample_id TEXT,
+                lab_id TEXT,
+                pcr_target TEXT,
+                sample_collect_date TEXT
+            )
+        ''')
+
+        try:
+            cursor.executemany('INSERT INTO batch VALUES (?, ?, ?, ?, ?)', keys)
+            cursor.execute('''
+                SELECT batch.position, samples.digest
+                FROM batch
+                JOIN samples USING (sample_id, lab_id, pcr_target, sample_collect_date)
+            ''')
+
+            return dict(cursor.fetchall())
+        finally:
+            cursor.execute('DELETE FROM batch')
+            cursor.close()
+
+            # Release the read lock on the index
+            self.connection.commit()
+
+    def add(self, rows, source=None):
+        '''
+        Record rows of deserialized data as accepted, replacing the stored
+        values of any key already in the index. Rows missing part of the key
+        are skipped.
+        '''
+        rows = iter(rows)
+
+        with self.connection:
+            while True:
+                batch = list(islice(rows, self.batch_size))
+
+                if not batch:
+                    return
+
+                self.connection.executemany(
+                    'INSERT OR REPLACE INTO samples VALUES (?, ?, ?, ?, ?, ?)',
+                    (
+                        (*key, digest(data), source)
+                        for key, data in zip(map(_key, batch), batch)
+                        if key is not None
+                    )
+                )
@@ -0,0 +1,275 @@
+'''
+Validate pandas DataFrames without converting them to records.
+
+Each column is factorized, so the schema field checks each distinct value
+once and the results are expanded back to the full column with NumPy
+indexing. Distinct values of string and float fields are first screened
+with vectorized type, Length, Regexp and Range checks; only the values that
+fail the screen, and the values of other fields, are deserialized by the
+schema fields, so error messages match ``WaterSampleSchema.load`` exactly.
+Missing values (NaN, None, NA and empty strings) are treated as None.
+Dates and times, such as the columns ``read_csv(parse_dates=...)`` returns,
+are checked as the ISO strings they were read from.
+
+Requires ``pandas``.
+'''
+import datetime
+from time import perf_counter
+
+from marshmallow import fields, missing, validate, EXCLUDE, INCLUDE
+import numpy as np
+import pandas as pd
+
+from nwss.batch import ColumnarValidator, LazyColumns
+from nwss.errors import ErrorRecords
+from nwss.profiling import FIELD
+from nwss.utils import ValidationContext
+
+
+ERROR_COLUMNS = ['row', 'field', 'code', 'message']
+
+# Column types whose distinct values can be found by hashing. Mixed columns
+# are not, since 1 == 1.0 == True but the schema treats them differently.
+_FACTORIZABLE = {
+    'empty',
+    'string',
+    'integer',
+    'floating',
+    'mixed-integer-float',
+    'date',
+    'datetime',
+    'time',
+}
+
+
+class FrameValidator(ColumnarValidator):
+    '''
+    Validate a ``pandas.DataFrame`` column by column.
+
+    ``validate`` returns ``(data, errors)`` as ``ColumnarValidator`` does,
+    with ``data`` a mapping of field name to an object array of
+    deserialized values, and rows numbered by position.
+    '''
+
+    def _count_rows(self, frame):
+        return len(frame)
+
+    def _validate(self, frame, n_rows, errors, context):
+        data = {}
+
+        for name, field in self.fields.items():
+            start = perf_counter()
+
+            if name in frame.columns:
+                values = self._validate_series(name, field, frame[name], errors)
+            else:
+                values = self._validate_missing(name, field, n_rows, errors)
+
+            if context.profile is not None:
+                context.profile.record(FIELD, name, perf_counter() - start, n_rows)
+
+            if values is not missing:
+                data[name] = values
+
+        unknown = [name for name in frame.columns if name not in self.fields]
+
+        if unknown and self.schema.unknown == INCLUDE:
+            data.update({name: frame[name].to_numpy(dtype=object) for name in unknown})
+        elif unknown and self.schema.unknown != EXCLUDE:
+            message = self.schema.error_messages['unknown']
+
+            for index in range(n_rows):
+                for name in unknown:
+                    errors.add(index, name, [message])
+
+        self._validate_rows(LazyColumns(data, list), n_rows, errors, context)
+
+        return data
+
+    def _validate_series(self, name, field, series, errors):
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            series = series.astype(object)
+
+        series = _prepare(field, series)
+
+        if pd.api.types.infer_dtype(series, skipna=True) not in _FACTORIZABLE:
+            values = series.astype(object).where(series.notna(), None).tolist()
+            return np.array(self._validate_column(name, field, values, errors),
+                            dtype=object)
+
+        codes, distinct = pd.factorize(series)
+
+        # Missing values get code -1, which indexes the last slot
+        distinct = np.append(np.asarray(distinct, dtype=object), None)
+
+        results = np.empty(len(distinct), dtype=object)
+        passed = self._screen(name, field, distinct, results)
+
+        invalid = {}
+
+        for position in np.flatnonzero(~passed).tolist():
+            results[position], messages = self._deserialize(
+                name, field, distinct[position]
+            )
+
+            if messages is not None:
+                invalid[position] = messages
+
+        if invalid:
+            # Shift code -1 to the last slot, as indexing does
+            slots = codes % len(distinct)
+            rows = np.flatnonzero(np.isin(slots, list(invalid)))
+
+            for row, slot in zip(rows.tolist(), slots[rows].tolist()):
+                errors.add(row, name, invalid[slot])
+
+        return results[codes]
+
+    def _screen(self, name, field, distinct, results):
+        '''
+        Check the distinct values of a column with vectorized checks,
+        storing the deserialized values of those that pass in ``results``.
+        Returns a boolean array marking the values known to be valid; the
+        missing value in the last slot is never marked.
+        '''
+        passed = np.zeros(len(distinct), dtype=bool)
+        values = distinct[:-1]
+
+        if self.field_validators.get(name) or not len(values):
+            return passed
+
+        if type(field) is fields.String and not self.trim:
+            types = np.fromiter(map(type, values), dtype=object, count=len(values))
+            valid = (types == str) & (values != '')
+            converted = values
+        elif type(field) is fields.Float and not field.allow_nan:
+            converted = _floats(values)
+            valid = np.isfinite(converted)
+        else:
+            return passed
+
+        for validator in field.validators:
+            check = _screen_validator(validator, converted[valid])
+
+            if check is None:
+                return passed
+
+            valid[valid] = check
+
+        passed[:-1] = valid
+        results[:-1][valid] = converted[valid].tolist()
+
+        return passed
+
+
+def _prepare(field, series):
+    '''
+    Convert temporal columns to the strings the schema's fields deserialize,
+    as ``nwss.arrow`` does, keeping only the date of timestamps for Date
+    fields and the time for Time fields.
+    '''
+    if isinstance(field, fields.Date):
+        format = '%Y-%m-%d'
+    elif isinstance(field, fields.Time):
+        format = '%H:%M:%S'
+    else:
+        format = '%Y-%m-%d %H:%M:%S'
+
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return series.dt.strftime(format).astype(object).where(series.notna(), None)
+
+    if pd.api.types.infer_dtype(series, skipna=True) not in ('date', 'datetime', 'time'):
+        return series
+
+    def iso(value):
+        if isinstance(value, datetime.datetime):
+            return value.strftime(format)
+        if isinstance(value, (datetime.date, datetime.time)):
+            return value.isoformat()
+        return value
+
+    return series.map(iso, na_action='ignore')
+
+
+def _floats(values):
+    '''
+    Parse ``values`` with float(), as the Float field does, with NaN for
+    values that can't be parsed.
+    '''
+    try:
+        # Casting objects to float calls float() on each value
+        return values.astype(float)
+    except (TypeError, ValueError):
+        pass
+
+    parsed = np.full(len(values), np.nan)
+
+    for index, value in enumerate(values):
+        if type(value) in (str, int, float):
+            try:
+                parsed[index] = float(value)
+            except ValueError:
+                pass
+
+    return parsed
+
+
+def _screen_validator(validator, values):
+    '''
+    Return a boolean array marking the values that ``validator`` accepts,
+    or None if it can't be checked vectorized.
+    '''
+    if type(validator) is validate.Length:
+        lengths = np.fromiter(map(len, values), dtype=np.int64, count=len(values))
+
+        if validator.equal is not None:
+            return lengths == validator.equal
+
+        return _within(lengths, validator.min, validator.max, True, True)
+
+    if type(validator) is validate.Regexp:
+        match = validator.regex.match
+        return np.fromiter((match(value) is not None for value in values),
+                           dtype=bool, count=len(values))
+
+    if type(validator) is validate.Range:
+        return _within(values, validator.min, validator.max,
+                       validator.min_inclusive, validator.max_inclusive)
+
+    return None
+
+
+def _within(values, low, high, low_inclusive, high_inclusive):
+    valid = np.ones(len(values), dtype=bool)
+
+    if low is not None:
+        valid &= values >= low if low_inclusive else values > low
+    if high is not None:
+        valid &= values <= high if high_inclusive else values < high
+
+    return valid
+
+
+def validate_frame(frame, context=None):
+    '''
+    Validate a DataFrame. Returns ``(valid, errors)``: a boolean Series,
+    indexed like ``frame``, that is True for rows without errors, and a
+    DataFrame of errors with ``row`` (the frame's index label), ``field``,
+    ``code`` and ``message`` columns.
+    '''
+    validator = FrameValidator()
+    context = context or ValidationContext()
+
+    _, records = validator.validate(frame, context, ErrorRecords(validator.schema))
+
+    errors = pd.DataFrame.from_records(records, columns=ERROR_COLUMNS)
+    errors = errors.sort_values('row', kind='stable', ignore_index=True)
+
+    positions = errors['row'].to_numpy(dtype=np.int64)
+
+    failed = np.zeros(len(frame), dtype=bool)
+    failed[positions] = True
+
+    errors['row'] = frame.index[positions]
+
+    return pd.Series(~failed, index=frame.index), errors
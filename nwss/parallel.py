@@ -0,0 +1,193 @@
+'''
+Validate a single large CSV file across several processes.
+
+The file is split into byte ranges that start and end on record boundaries,
+found as the csv module reads the file so quoted fields that contain
+newlines and stray quotes are taken into account, and each range is
+validated by a worker process holding its own ``ColumnarValidator``,
+built once when the worker starts.
+'''
+import csv
+import io
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from nwss.batch import ColumnarValidator, rows_to_columns
+from nwss.csvindex import read_lines, scan_block
+from nwss.errors import GroupedErrors, RowErrors
+from nwss.utils import ValidationContext
+
+
+BLOCK_SIZE = 1 << 20
+
+_validator = None
+
+
+def record_starts(path, targets, block_size=BLOCK_SIZE):
+    '''
+    For each byte offset in ``targets`` (in ascending order), return the
+    start of the first CSV record after it. Records are found as the csv
+    module reads them, so quoted fields may span lines and quotes inside
+    unquoted fields are taken literally. Targets past the last record map
+    to the file size.
+    '''
+    starts = []
+
+    with open(path, 'rb') as f:
+        try:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files can't be mapped
+            buffer = b''
+
+        size = len(buffer)
+        pos, line = 0, 1
+        records = iter(())
+        offset = -1
+
+        try:
+            for target in targets:
+                while offset <= target:
+                    record = next(records, None)
+
+                    if record is not None:
+                        offset = record[0]
+                    elif pos < size:
+                        block, pos, line = scan_block(buffer, pos, line, block_size)
+                        records = iter(block)
+                    else:
+                        offset = size
+                        break
+
+                starts.append(offset)
+        finally:
+            if isinstance(buffer, mmap.mmap):
+                buffer.close()
+
+    return starts
+
+
+def shard_file(path, shards):
+    '''
+    Return (header, ranges), where ranges are up to ``shards`` (start, end)
+    byte offsets covering every record after the header.
+    '''
+    header_end, = record_starts(path, [0])
+
+    with open(path, 'rb') as f:
+        header_line = f.read(header_end).decode('utf-8-sig')
+
+    header = next(csv.reader(io.StringIO(header_line, newline='')), [])
+
+    size = os.path.getsize(path)
+    targets = [
+        header_end + (size - header_end) * i // shards for i in range(1, shards)
+    ]
+
+    offsets = [header_end, *record_starts(path, targets), size]
+
+    ranges = [
+        (start, end) for start, end in zip(offsets, offsets[1:]) if end > start
+    ]
+
+    return header, ranges
+
+
+def _read_lines(path, start, end):
+    # Lines end where they do for csv reading a file opened with newline=''
+    with open(path, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        yield from read_lines(buffer, start, end)
+
+
+def _init_worker():
+    global _validator
+    _validator = ColumnarValidator()
+
+
+def _validate_range(path, header, start, end, chunk_size, context, grouped,
+                    max_errors=None):
+    '''
+    Validate the records in one byte range, returning (row count, errors)
+    with errors keyed by row number within the range. Once ``max_errors``
+    rows have failed, the rest of the range is only counted.
+    '''
+    if _validator is None:
+        _init_worker()
+
+    rows = csv.DictReader(_read_lines(path, start, end), fieldnames=header)
+
+    n_rows = 0
+    errors = GroupedErrors(_validator.schema) if grouped else RowErrors()
+
+    while True:
+        chunk = list(islice(rows, chunk_size))
+
+        if not chunk:
+            break
+
+        _validator.validate(rows_to_columns(chunk), context, errors, start=n_rows)
+
+        n_rows += len(chunk)
+
+        if max_errors is not None and len(errors) >= max_errors:
+            n_rows += sum(1 for _ in rows)
+            break
+
+    return n_rows, _first_rows(errors, max_errors)
+
+
+def _first_rows(errors, max_errors):
+    if max_errors is None or len(errors) <= max_errors:
+        return errors
+
+    first = RowErrors()
+    first.update((row, errors[row]) for row in sorted(errors)[:max_errors])
+
+    return first
+
+
+def validate_file(path, workers=None, chunk_size=10000, grouped=False,
+                  max_errors=None):
+    '''
+    Validate a CSV file with ``workers`` processes (defaults to the number
+    of CPUs). Returns (row count, errors), with errors keyed by the 0-based
+    row number across the whole file, as ``WaterSampleSchema(many=True)``
+    would key them. With ``grouped``, errors are a ``GroupedErrors``.
+
+    Otherwise, ``max_errors`` keeps only the errors of the first
+    ``max_errors`` failing rows; each range stops validating once it has
+    that many, so a file full of errors isn't held in memory.
+    '''
+    if grouped:
+        max_errors = None
+
+    workers = workers or os.cpu_count() or 1
+
+    # Use a few ranges per worker so one slow range doesn't hold up the pool
+    header, ranges = shard_file(path, workers * 4 if workers > 1 else 1)
+
+    # Check every shard against the same dates
+    context = ValidationContext()
+
+    args = [
+        (path, header, start, end, chunk_size, context, grouped, max_errors)
+        for start, end in ranges
+    ]
+
+    if workers == 1 or len(args) < 2:
+        results = [_validate_range(*arg) for arg in args]
+    else:
+        with ProcessPoolExecutor(workers, initializer=_init_worker) as pool:
+            results = list(pool.map(_validate_range, *zip(*args)))
+
+    n_rows = 0
+    errors = GroupedErrors() if grouped else RowErrors()
+
+    for shard_rows, shard_errors in results:
+        errors.merge(shard_errors, offset=n_rows)
+        n_rows += shard_rows
+
+    return n_rows, _first_rows(errors, max_errors)
@@ -0,0 +1,177 @@
+'''
+Opt-in timing for validation runs.
+
+Pass a Profile on the ValidationContext to record call counts and cumulative
+time per field, field validator, schema hook and cross-field rule:
+
+    profile = Profile()
+    WaterSampleSchema(many=True).load(
+        rows, validation_context=ValidationContext(profile=profile)
+    )
+    profile.report()
+
+Nothing is wrapped or timed unless a profile is given.
+'''
+import threading
+from functools import wraps
+from time import perf_counter
+
+from nwss.utils import ContextVar
+
+
+# Kinds of timed callable
+FIELD = 'field'
+VALIDATOR = 'validator'
+HOOK = 'hook'
+RULE = 'rule'
+
+# The profile of the instrumented load being run, if any
+_profile = ContextVar('nwss_profile', default=None)
+
+# id(schema) -> its instrumentation, while it is instrumented
+_instrumented = {}
+_lock = threading.Lock()
+
+
+class Profile():
+    '''
+    Call counts and cumulative seconds, keyed by (kind, name). Field times
+    include the field's own validators, which are also reported separately.
+    '''
+
+    def __init__(self):
+        self.stats = {}
+
+    def record(self, kind, name, seconds, calls=1):
+        try:
+            stat = self.stats[kind, name]
+        except KeyError:
+            stat = self.stats[kind, name] = [0, 0.0]
+
+        stat[0] += calls
+        stat[1] += seconds
+
+    def report(self):
+        '''
+        Return a list of {'kind', 'name', 'calls', 'seconds'} dicts, slowest
+        first.
+        '''
+        report = [
+            {'kind': kind, 'name': name, 'calls': calls, 'seconds': seconds}
+            for (kind, name), (calls, seconds) in self.stats.items()
+        ]
+
+        return sorted(report, key=lambda stat: stat['seconds'], reverse=True)
+
+
+def _timed(kind, name, function):
+    '''
+    Return a wrapper for ``function`` that records each call in the profile
+    of the current load, or just calls it if there is none.
+    '''
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        profile = _profile.get()
+
+        if profile is None:
+            return function(*args, **kwargs)
+
+        start = perf_counter()
+
+        try:
+            return function(*args, **kwargs)
+        finally:
+            profile.record(kind, name, perf_counter() - start)
+
+    return wrapper
+
+
+class _Instrumentation():
+    '''
+    The timing wrappers installed on a schema instance, shared by every
+    profiled load running on it.
+    '''
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.users = 0
+        self.keys = []
+        self.validators = {}
+        self.hooks = []
+
+    def install(self):
+        for name, field in self.schema.load_fields.items():
+            # An instance attribute shadows Field.deserialize
+            field.deserialize = _timed(FIELD, name, field.deserialize)
+            self.keys.append((FIELD, name))
+
+            self.validators[name] = field.validators
+            field.validators = []
+
+            for validator in self.validators[name]:
+                key = VALIDATOR, f'{name}.{type(validator).__name__}'
+                field.validators.append(_timed(*key, validator))
+                self.keys.append(key)
+
+        # Marshmallow looks hooks up by attribute name on every call
+        for attr in dir(type(self.schema)):
+            method = getattr(self.schema, attr, None)
+
+            if hasattr(method, '__marshmallow_hook__'):
+                setattr(self.schema, attr, _timed(HOOK, attr, method))
+                self.hooks.append(attr)
+                self.keys.append((HOOK, attr))
+
+    def remove(self):
+        for name, field in self.schema.load_fields.items():
+            del field.deserialize
+            field.validators = self.validators[name]
+
+        for attr in self.hooks:
+            delattr(self.schema, attr)
+
+
+class instrument():
+    '''
+    Context manager that times the fields, field validators and hooks of a
+    schema instance with ``profile``, restoring them on exit. Cross-field
+    rules are timed by ``nwss.rules`` itself, within the validate_rules hook.
+
+    The schema is wrapped by the first of any overlapping instruments and
+    restored by the last. Each wrapper records into the profile of the
+    thread calling it, so loads in other threads can share the schema, with
+    or without a profile of their own.
+    '''
+
+    def __init__(self, schema, profile):
+        self.schema = schema
+        self.profile = profile
+
+    def __enter__(self):
+        with _lock:
+            instrumentation = _instrumented.get(id(self.schema))
+
+            if instrumentation is None:
+                instrumentation = _Instrumentation(self.schema)
+                instrumentation.install()
+                _instrumented[id(self.schema)] = instrumentation
+
+            instrumentation.users += 1
+
+        for key in instrumentation.keys:
+            self.profile.stats.setdefault(key, [0, 0.0])
+
+        self.instrumentation = instrumentation
+        self.token = _profile.set(self.profile)
+
+        return self.profile
+
+    def __exit__(self, *exc_info):
+        _profile.reset(self.token)
+
+        with _lock:
+            self.instrumentation.users -= 1
+
+            if not self.instrumentation.users:
+                self.instrumentation.remove()
+                del _instrumented[id(self.schema)]
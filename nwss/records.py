@@ -0,0 +1,292 @@
+'''
+Store validated rows column by column.
+
+``schema.load`` returns a dict per row with a key for every field, most of
+them None. ``RecordTable`` keeps the same data as one column per field:
+Float, Integer, Date and Time fields in typed arrays, categorical fields as
+codes into their allowed values, and other fields in lists, each with
+bitmaps marking None and missing values. Rows are read back as ``Record``
+mappings that compare equal to the dicts ``load`` would have returned:
+
+    table, errors = load_table(rows)
+
+    for record in table:
+        record['sample_id']
+'''
+import datetime
+from array import array
+from collections.abc import Mapping
+
+from marshmallow import fields, missing
+
+from nwss import fields as nwss_fields
+from nwss.errors import RowErrors
+from nwss.schemas import WaterSampleSchema
+
+
+_MIDNIGHT = datetime.datetime.min
+
+
+class Column():
+    '''
+    The values of one field. Values that can't be stored in the column's
+    array switch it to a list.
+    '''
+
+    typecode = None
+    fill = 0
+
+    def __init__(self):
+        self.values = [] if self.typecode is None else array(self.typecode)
+        self.typed = self.typecode is not None
+        self.nulls = bytearray()
+        self.missing = bytearray()
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def append(self, value):
+        index = self.length
+
+        if index % 8 == 0:
+            self.nulls.append(0)
+            self.missing.append(0)
+
+        self.length += 1
+
+        if value is None or value is missing:
+            bitmap = self.nulls if value is None else self.missing
+            bitmap[index >> 3] |= 1 << (index & 7)
+            self.values.append(self.fill if self.typed else None)
+        elif self.typed:
+            try:
+                self.values.append(self.encode(value))
+            except (AttributeError, TypeError, ValueError, OverflowError):
+                self._untype()
+                self.values.append(value)
+        else:
+            self.values.append(value)
+
+    def _untype(self):
+        self.values = [
+            self[index] for index in range(len(self.values))
+        ]
+        self.typed = False
+
+    def __getitem__(self, index):
+        byte, bit = index >> 3, 1 << (index & 7)
+
+        if self.missing[byte] & bit:
+            return missing
+        if self.nulls[byte] & bit:
+            return None
+
+        value = self.values[index]
+        return self.decode(value) if self.typed else value
+
+    def encode(self, value):
+        return value
+
+    def decode(self, value):
+        return value
+
+
+class FloatColumn(Column):
+    typecode = 'd'
+
+    def encode(self, value):
+        if type(value) is not float:
+            raise TypeError(value)
+        return value
+
+
+class IntegerColumn(Column):
+    typecode = 'q'
+
+    def encode(self, value):
+        if type(value) is not int:
+            raise TypeError(value)
+        return value
+
+
+class DateColumn(Column):
+    '''
+    Dates as ordinals.
+    '''
+    typecode = 'i'
+
+    def encode(self, value):
+        if type(value) is not datetime.date:
+            raise TypeError(value)
+        return value.toordinal()
+
+    def decode(self, value):
+        return datetime.date.fromordinal(value)
+
+
+class TimeColumn(Column):
+    '''
+    Naive times as microseconds since midnight.
+    '''
+    typecode = 'q'
+
+    def encode(self, value):
+        if type(value) is not datetime.time or value.tzinfo is not None:
+            raise TypeError(value)
+        return (
+            (value.hour * 60 + value.minute) * 60 + value.second
+        ) * 1000000 + value.microsecond
+
+    def decode(self, value):
+        return (_MIDNIGHT + datetime.timedelta(microseconds=value)).time()
+
+
+class CategoricalColumn(Column):
+    '''
+    Codes into the field's allowed values, followed by any other values
+    seen in the column.
+    '''
+    typecode = 'H'
+
+    def __init__(self, field):
+        super().__init__()
+        self.categories = list(field.index.values)
+        self.codes = {value: code for code, value in enumerate(self.categories)}
+
+    def encode(self, value):
+        code = self.codes.get(value)
+
+        if code is None:
+            code = self.codes[value] = len(self.categories)
+            self.categories.append(value)
+
+        return code
+
+    def decode(self, value):
+        return self.categories[value]
+
+
+def column_for(field):
+    '''
+    Return an empty column for the values deserialized by ``field``.
+    '''
+    if isinstance(field, nwss_fields.CategoricalString):
+        return CategoricalColumn(field)
+    if isinstance(field, fields.Float):
+        return FloatColumn()
+    if isinstance(field, fields.Integer):
+        return IntegerColumn()
+    # Date and Time subclass DateTime
+    if isinstance(field, fields.Date):
+        return DateColumn()
+    if isinstance(field, fields.Time):
+        return TimeColumn()
+
+    return Column()
+
+
+class Record(Mapping):
+    '''
+    A read-only view of one row of a ``RecordTable``.
+    '''
+
+    __slots__ = ('_table', '_index')
+
+    def __init__(self, table, index):
+        self._table = table
+        self._index = index
+
+    def __getitem__(self, name):
+        value = self._table.columns[name][self._index]
+
+        if value is missing:
+            raise KeyError(name)
+
+        return value
+
+    def __iter__(self):
+        index = self._index
+
+        for name, column in self._table.columns.items():
+            if column[index] is not missing:
+                yield name
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f'Record({dict(self)!r})'
+
+
+class RecordTable():
+    '''
+    Deserialized rows, stored as columns for the fields of ``schema``.
+    Fields outside the schema, kept with ``unknown=INCLUDE``, are stored
+    in lists.
+    '''
+
+    def __init__(self, schema=None):
+        schema = schema or WaterSampleSchema()
+
+        self.columns = {
+            name: column_for(field) for name, field in schema.load_fields.items()
+        }
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def append(self, data):
+        '''
+        Add a row of deserialized data, as returned by ``schema.load``.
+        '''
+        columns = self.columns
+
+        for name, column in columns.items():
+            column.append(data.get(name, missing))
+
+        if not data.keys() <= columns.keys():
+            for name in data:
+                if name not in columns:
+                    column = columns[name] = Column()
+
+                    for _ in range(self.length):
+                        column.append(missing)
+
+                    column.append(data[name])
+
+        self.length += 1
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.length
+
+        if not 0 <= index < self.length:
+            raise IndexError('RecordTable index out of range')
+
+        return Record(self, index)
+
+    def __iter__(self):
+        for index in range(self.length):
+            yield Record(self, index)
+
+
+def load_table(rows, schema=None):
+    '''
+    Validate an iterable of rows with ``schema.load_iter``, returning a
+    ``RecordTable`` with the data of every row and ``RowErrors`` for the
+    rows that failed.
+    '''
+    schema = schema or WaterSampleSchema()
+
+    table = RecordTable(schema)
+    errors = RowErrors()
+
+    for index, data, messages in schema.load_iter(rows):
+        table.append(data)
+
+        if messages:
+            errors[index] = messages
+
+    return table, errors
@@ -0,0 +1,464 @@
+'''
+Declarative cross-field rules for water samples.
+
+Each rule says that when one condition holds for a sample, another must hold
+too. The same table is used three ways: ``check`` validates a single
+deserialized sample for ``WaterSampleSchema``, ``check_columns`` validates a
+whole batch of columns at once for ``nwss.batch``, and ``json_schema``
+renders the rules as JSON schema ``if``/``then`` blocks for
+``nwss.dump_to_jsonschema``.
+
+The Python rules see deserialized samples, but the web validator reads
+every spreadsheet cell as text, so the JSON schema of a test on a number
+also accepts the number written out, e.g. "-1" or "0.0".
+'''
+from itertools import compress, repeat
+from operator import eq, gt, not_
+from time import perf_counter
+
+from nwss.profiling import RULE
+from nwss.utils import ValidationContext
+
+
+# JSON schema for a value Python considers empty
+EMPTY = {'enum': [None, '', 0]}
+
+# Text that a number field deserializes to zero, which Python considers empty
+ZERO = '^[-+]?(0+(\\.0*)?|\\.0+)([eE][-+]?[0-9]+)?$'
+
+
+def _numeric(field):
+    '''
+    Return whether ``field`` of WaterSampleSchema holds numbers.
+    '''
+    # Only rendering JSON schema needs the schema; the rules module is
+    # imported by it
+    from marshmallow import fields
+    from nwss.schemas import WaterSampleSchema
+
+    return isinstance(WaterSampleSchema._declared_fields.get(field), fields.Number)
+
+
+def _number_text(value):
+    '''
+    Return JSON schema for strings that deserialize to the number ``value``.
+    '''
+    sign = '-' if value < 0 else '[+]?'
+    whole, _, fraction = repr(abs(float(value))).partition('.')
+
+    if fraction == '0':
+        pattern = f'^{sign}0*{whole}(\\.0*)?$'
+    else:
+        pattern = f'^{sign}0*{whole}\\.{fraction}0*$'
+
+    return {'type': 'string', 'pattern': pattern}
+
+
+class Condition():
+    '''
+    A test on one or more fields of a sample. ``test`` checks a single row
+    mapping, ``column`` returns a list of booleans for a mapping of column
+    name to values, and ``json`` returns the equivalent JSON schema, or None
+    if it can't be expressed in JSON schema. Both tests take the
+    ValidationContext for the run.
+    '''
+
+    def test(self, row, context):
+        raise NotImplementedError
+
+    def column(self, columns, n_rows, context):
+        raise NotImplementedError
+
+    def json(self):
+        raise NotImplementedError
+
+
+def _values(columns, field, n_rows):
+    try:
+        return columns[field]
+    except KeyError:
+        return repeat(None, n_rows)
+
+
+class Present(Condition):
+    '''
+    The field has a non-empty value.
+    '''
+
+    def __init__(self, field):
+        self.field = field
+
+    def test(self, row, context):
+        return bool(row.get(self.field))
+
+    def column(self, columns, n_rows, context):
+        return list(map(bool, _values(columns, self.field, n_rows)))
+
+    def json(self):
+        empty = EMPTY
+
+        if _numeric(self.field):
+            empty = {'anyOf': [EMPTY, {'type': 'string', 'pattern': ZERO}]}
+
+        return {
+            'properties': {self.field: {'not': empty}},
+            'required': [self.field],
+        }
+
+
+class OneOf(Condition):
+    '''
+    The field is one of the given values.
+    '''
+
+    def __init__(self, field, values):
+        self.field = field
+        self.values = list(values)
+
+    def test(self, row, context):
+        return row.get(self.field) in self.values
+
+    def column(self, columns, n_rows, context):
+        values = _values(columns, self.field, n_rows)
+
+        if len(self.values) == 1:
+            return list(map(eq, values, repeat(self.values[0])))
+
+        return [value in self.values for value in values]
+
+    def json(self):
+        schema = {'enum': self.values}
+        numbers = [
+            value for value in self.values
+            if isinstance(value, (int, float)) and not isinstance(value, bool)
+        ]
+
+        if numbers:
+            schema = {'anyOf': [schema, *map(_number_text, numbers)]}
+
+        return {
+            'properties': {self.field: schema},
+            'required': [self.field],
+        }
+
+
+class Equals(OneOf):
+    '''
+    The field is equal to the given value.
+    '''
+
+    def __init__(self, field, value):
+        super().__init__(field, [value])
+
+
+class Not(Condition):
+
+    def __init__(self, condition):
+        self.condition = condition
+
+    def test(self, row, context):
+        return not self.condition.test(row, context)
+
+    def column(self, columns, n_rows, context):
+        return list(map(not_, self.condition.column(columns, n_rows, context)))
+
+    def json(self):
+        return {'not': self.condition.json()}
+
+
+class AllOf(Condition):
+
+    def __init__(self, *conditions):
+        self.conditions = conditions
+
+    def test(self, row, context):
+        return all(condition.test(row, context) for condition in self.conditions)
+
+    def column(self, columns, n_rows, context):
+        return list(map(all, zip(*(
+            condition.column(columns, n_rows, context) for condition in self.conditions
+        ))))
+
+    def json(self):
+        return {'allOf': [condition.json() for condition in self.conditions]}
+
+
+class AnyOf(AllOf):
+
+    def test(self, row, context):
+        return any(condition.test(row, context) for condition in self.conditions)
+
+    def column(self, columns, n_rows, context):
+        return list(map(any, zip(*(
+            condition.column(columns, n_rows, context) for condition in self.conditions
+        ))))
+
+    def json(self):
+        return {'anyOf': [condition.json() for condition in self.conditions]}
+
+
+# Stands in for tomorrow's date, as captured by the ValidationContext
+TOMORROW = 'tomorrow'
+
+
+class NotAfter(Condition):
+    '''
+    The field's date is not after ``other``: either another field or
+    TOMORROW. Rows missing either date pass.
+    '''
+
+    def __init__(self, field, other):
+        self.field = field
+        self.other = other
+
+    def _other(self, columns, n_rows, context):
+        if self.other == TOMORROW:
+            return repeat(context.tomorrow, n_rows)
+
+        return _values(columns, self.other, n_rows)
+
+    def test(self, row, context):
+        value = row.get(self.field)
+        other = context.tomorrow if self.other == TOMORROW else row.get(self.other)
+
+        return value is None or other is None or value <= other
+
+    def column(self, columns, n_rows, context):
+        values = _values(columns, self.field, n_rows)
+        others = self._other(columns, n_rows, context)
+
+        return [
+            value is None or other is None or value <= other
+            for value, other in zip(values, others)
+        ]
+
+    def json(self):
+        return None
+
+
+class Rule():
+    '''
+    When ``when`` holds for a sample (always, if ``when`` is None), ``then``
+    must hold too, or the sample fails with ``message``. ``code`` identifies
+    the rule in grouped errors.
+    '''
+
+    def __init__(self, then, message, when=None, code='rule'):
+        self.when = when
+        self.then = then
+        self.message = message
+        self.code = code
+
+    def fails(self, row, context):
+        if self.when is not None and not self.when.test(row, context):
+            return False
+
+        return not self.then.test(row, context)
+
+    def failing_rows(self, columns, n_rows, context):
+        '''
+        Return the indices of rows that fail the rule.
+        '''
+        then = self.then.column(columns, n_rows, context)
+
+        if self.when is None:
+            return list(compress(range(n_rows), map(not_, then)))
+
+        when = self.when.column(columns, n_rows, context)
+
+        # when > then is True only for (True, False)
+        return list(compress(range(n_rows), map(gt, when, then)))
+
+    def json(self):
+        then = self.then.json()
+
+        if then is None or self.when is None:
+            return then
+
+        return {'if': self.when.json(), 'then': then}
+
+
+def _all_present(*fields):
+    return AllOf(*(Present(field) for field in fields))
+
+
+FLOWING_SOURCE = [
+    'raw wastewater',
+    'post grit removal',
+    'primary effluent',
+    'secondary effluent',
+]
+
+PER_VOLUME_RESULT = [
+    'copies/L wastewater',
+    'log10 copies/L wastewater',
+    'micrograms/L wastewater',
+    'log10 micrograms/L wastewater',
+]
+
+RULES = [
+    Rule(
+        code='jurisdiction_required',
+        then=AnyOf(Present('county_names'), Present('other_jurisdiction')),
+        message='Either county_names or other_jurisdiction must have a value.'
+    ),
+    Rule(
+        code='sample_location_specify_required',
+        when=Equals('sample_location', 'upstream'),
+        then=Present('sample_location_specify'),
+        message=('An "upstream" sample_location must have '
+                 'a value for sample_location_specify.')
+    ),
+    Rule(
+        code='pretreatment_specify_required',
+        when=Equals('pretreatment', 'yes'),
+        then=Present('pretreatment_specify'),
+        message=('If "pretreatment" is "yes", then specify '
+                 'the chemicals used.')
+    ),
+    Rule(
+        code='rec_eff_details_required',
+        when=Not(Equals('rec_eff_percent', -1)),
+        then=_all_present(
+            'rec_eff_target_name',
+            'rec_eff_spike_matrix',
+            'rec_eff_spike_conc'
+        ),
+        message=("If rec_eff_percent is not equal to -1, "
+                 "then 'rec_eff_target_name', "
+                 "'rec_eff_spike_matrix', "
+                 "and 'rec_eff_spike_conc' "
+                 "cannot be empty.")
+    ),
+    Rule(
+        code='hum_frac_mic_details_required',
+        when=Present('hum_frac_mic_conc'),
+        then=_all_present(
+            'hum_frac_mic_unit',
+            'hum_frac_target_mic',
+            'hum_frac_target_mic_ref'
+        ),
+        message=('If hum_frac_mic_conc is not empty, then '
+                 'must provide hum_frac_mic_unit, '
+                 'hum_frac_target_mic, and '
+                 'hum_frac_target_mic_ref.')
+    ),
+    Rule(
+        code='hum_frac_chem_details_required',
+        when=Present('hum_frac_chem_conc'),
+        then=_all_present(
+            'hum_frac_chem_unit',
+            'hum_frac_target_chem',
+            'hum_frac_target_chem_ref'
+        ),
+        message=('If hum_frac_chem_unit is not empty, '
+                 'then hum_frac_chem_unit, hum_frac_target_chem, '
+                 'and hum_frac_target_chem_ref cannot be null.')
+    ),
+    Rule(
+        code='other_norm_details_required',
+        when=Present('other_norm_conc'),
+        then=_all_present(
+            'other_norm_name',
+            'other_norm_unit',
+            'other_norm_ref'
+        ),
+        message=('If other_norm_conc is not empty, then '
+                 'other_norm_name cannot be null.')
+    ),
+    Rule(
+        code='inhibition_adjust_required',
+        when=Equals('inhibition_detect', 'yes'),
+        then=Present('inhibition_adjust'),
+        message=("If 'inhibition_detect' is yes, "
+                 "then 'inhibition_adjust' must have "
+                 "a non-empty value.")
+    ),
+    Rule(
+        code='inhibition_method_not_none',
+        when=Equals('inhibition_detect', 'not tested'),
+        then=Equals('inhibition_method', 'none'),
+        message=("'inhibition_method' must be 'none' "
+                 "if inhibition_detect == 'not tested'.")
+    ),
+    Rule(
+        code='flow_rate_required',
+        when=AnyOf(
+            OneOf('sample_matrix', FLOWING_SOURCE),
+            OneOf('sars_cov2_units', PER_VOLUME_RESULT)
+        ),
+        then=Present('flow_rate'),
+        message=("If 'sample_matrix' is liquid sampled from flowing source "
+                 f"({', '.join(FLOWING_SOURCE)}) or 'sars_cov2_units' is "
+                 f"on a per volume basis ({', '.join(PER_VOLUME_RESULT)}) "
+                 "then 'flow_rate' must have a non-empty value.")
+    ),
+    Rule(
+        code='test_result_date_in_future',
+        then=NotAfter('test_result_date', TOMORROW),
+        message=("'test_result_date' cannot be after "
+                 "tomorrow's date.")
+    ),
+    Rule(
+        code='test_result_date_before_collection',
+        then=NotAfter('sample_collect_date', 'test_result_date'),
+        message=("'test_result_date' cannot be "
+                 "before 'sample_collect_date'.")
+    ),
+]
+
+
+def check(row, rules=RULES, context=None):
+    '''
+    Return the messages for every rule a single sample fails.
+    '''
+    context = context or ValidationContext()
+
+    if context.profile is not None:
+        return _check_profiled(row, rules, context)
+
+    return [rule.message for rule in rules if rule.fails(row, context)]
+
+
+def _check_profiled(row, rules, context):
+    messages = []
+
+    for rule in rules:
+        start = perf_counter()
+        fails = rule.fails(row, context)
+        context.profile.record(RULE, rule.message, perf_counter() - start)
+
+        if fails:
+            messages.append(rule.message)
+
+    return messages
+
+
+def check_columns(columns, n_rows, rules=RULES, context=None):
+    '''
+    Check every rule against a batch of columns in one pass per rule.
+    Returns {row index: [messages]} for the rows that fail.
+    '''
+    context = context or ValidationContext()
+    errors = {}
+
+    for rule in rules:
+        start = perf_counter()
+
+        for index in rule.failing_rows(columns, n_rows, context):
+            errors.setdefault(index, []).append(rule.message)
+
+        if context.profile is not None:
+            context.profile.record(
+                RULE, rule.message, perf_counter() - start, calls=n_rows
+            )
+
+    return errors
+
+
+def json_schema(rules=RULES):
+    '''
+    Return the rules that can be expressed in JSON schema as a list of
+    fragments, for use in allOf.
+    '''
+    return [rule.json() for rule in rules if rule.json() is not None]
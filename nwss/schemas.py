@@ -1,10 +1,12 @@
 import re
+from itertools import islice
+
 from marshmallow import Schema, fields, \
     validate, ValidationError, validates_schema, validates
 from marshmallow.decorators import pre_load
 
-from nwss import value_sets, fields as nwss_fields, validators as nwss_validators
-from nwss.utils import get_future_date
+from nwss import value_sets, rules, profiling, fields as nwss_fields
+from nwss.utils import ValidationContext, current_context
 
 
 class CollectionSite():
@@ -16,12 +18,6 @@ class CollectionSite():
     county_names = nwss_fields.ListString(missing=None)
     other_jurisdiction = nwss_fields.ListString(missing=None)
 
-    @validates_schema
-    def validate_county_jurisdiction(self, data, **kwargs):
-        if not data['county_names'] and not data['other_jurisdiction']:
-            raise ValidationError('Either county_names or other_jurisdiction '
-                                  'must have a value.')
-
     zipcode = fields.String(
         required=True,
         validate=validate.Length(min=5, max=5)
@@ -48,13 +44,6 @@ class CollectionSite():
         allow_none=True
     )
 
-    @validates_schema
-    def validate_sample_location(self, data, **kwargs):
-        if data['sample_location'] == 'upstream' \
-          and not data.get('sample_location_specify', None):
-            raise ValidationError('An "upstream" sample_location must have '
-                                  'a value for sample_location_specify.')
-
     institution_type = nwss_fields.CategoricalString(
         required=True,
         allowed_values=value_sets.institution_type
@@ -89,14 +78,14 @@ class WWTP():
         metadata={'units': 'Percent'}
     )
 
-    stormwater_input = fields.String(
+    stormwater_input = nwss_fields.CategoricalString(
         allow_none=True,
-        validate=nwss_validators.CaseInsensitiveOneOf(value_sets.yes_no_empty)
+        allowed_values=value_sets.yes_no_empty
     )
 
-    influent_equilibrated = fields.String(
+    influent_equilibrated = nwss_fields.CategoricalString(
         allow_none=True,
-        validate=nwss_validators.CaseInsensitiveOneOf(value_sets.yes_no_empty)
+        allowed_values=value_sets.yes_no_empty
     )
 
 
@@ -131,29 +120,20 @@ class CollectionMethod():
         metadata={'units': 'Celsius'}
     )
 
-    pretreatment = fields.String(
+    pretreatment = nwss_fields.CategoricalString(
         allow_none=True,
-        validate=nwss_validators.CaseInsensitiveOneOf(value_sets.yes_no_empty)
+        allowed_values=value_sets.yes_no_empty
     )
 
     pretreatment_specify = fields.String(
         allow_none=True,
     )
 
-    @validates_schema
-    def validate_pretreatment(self, data, **kwargs):
-        if data['pretreatment'] == 'yes' \
-          and not data.get('pretreatment_specify'):
-            raise ValidationError(
-                'If "pretreatment" is "yes", then specify '
-                'the chemicals used.'
-            )
-
 
 class ProcessingMethod():
-    solids_separation = fields.String(
+    solids_separation = nwss_fields.CategoricalString(
         allow_none=True,
-        validate=nwss_validators.CaseInsensitiveOneOf(value_sets.solids_separation)
+        allowed_values=value_sets.solids_separation
     )
 
     concentration_method = nwss_fields.CategoricalString(
@@ -194,9 +174,9 @@ class ProcessingMethod():
         metadata={'units': 'mL'}
     )
 
-    ext_blank = fields.String(
+    ext_blank = nwss_fields.CategoricalString(
         allow_none=True,
-        validate=nwss_validators.CaseInsensitiveOneOf(value_sets.yes_no_empty)
+        allowed_values=value_sets.yes_no_empty
     )
 
     rec_eff_percent = fields.Float(
@@ -205,14 +185,14 @@ class ProcessingMethod():
         metadata={'units': 'percent'}
     )
 
-    rec_eff_target_name = fields.String(
+    rec_eff_target_name = nwss_fields.CategoricalString(
         allow_none=True,
-        validate=nwss_validators.CaseInsensitiveOneOf(value_sets.rec_eff_target_name)
+        allowed_values=value_sets.rec_eff_target_name
     )
 
-    rec_eff_spike_matrix = fields.String(
+    rec_eff_spike_matrix = nwss_fields.CategoricalString(
         allow_none=True,
-        validate=nwss_validators.CaseInsensitiveOneOf(value_sets.rec_eff_spike_matrix)
+        allowed_values=value_sets.rec_eff_spike_matrix
     )
 
     rec_eff_spike_conc = fields.Float(
@@ -220,27 +200,9 @@ class ProcessingMethod():
         metadata={'units': 'log10 copies/mL'}
     )
 
-    @validates_schema
-    def validate_rec_eff(self, data, **kwargs):
-        dependent = [
-            'rec_eff_target_name',
-            'rec_eff_spike_matrix',
-            'rec_eff_spike_conc'
-        ]
-
-        if data['rec_eff_percent'] != -1 \
-           and not all(data.get(k) for k in dependent):
-            raise ValidationError(
-                "If rec_eff_percent is not equal to -1, "
-                "then 'rec_eff_target_name', "
-                "'rec_eff_spike_matrix', "
-                "and 'rec_eff_spike_conc' "
-                "cannot be empty."
-            )
-
-    pasteurized = fields.String(
+    pasteurized = nwss_fields.CategoricalString(
         allow_none=True,
-        validate=nwss_validators.CaseInsensitiveOneOf(value_sets.yes_no_empty)
+        allowed_values=value_sets.yes_no_empty
     )
 
 
@@ -268,120 +230,57 @@ class QuantificationMethod():
         metadata={'units': "specified in 'hum_frac_mic_unit'"}
     )
 
-    hum_frac_mic_unit = fields.String(
+    hum_frac_mic_unit = nwss_fields.CategoricalString(
         allow_none=True,
-        validate=nwss_validators.CaseInsensitiveOneOf(value_sets.mic_units)
+        allowed_values=value_sets.mic_units
     )
 
-    hum_frac_target_mic = fields.String(
+    hum_frac_target_mic = nwss_fields.CategoricalString(
         allow_none=True,
-        validate=nwss_validators.CaseInsensitiveOneOf(value_sets.hum_frac_target_mic)
+        allowed_values=value_sets.hum_frac_target_mic
     )
 
     hum_frac_target_mic_ref = fields.String(
         allow_none=True
     )
 
-    @validates_schema
-    def validate_hum_frac_mic_conc(self, data, **kwargs):
-        """
-        If hum_frac_mic_conc is not empty, then
-         validate that the dependent fields
-         are not empty.
-        """
-        dependent = [
-            'hum_frac_mic_unit',
-            'hum_frac_target_mic',
-            'hum_frac_target_mic_ref'
-        ]
-
-        if data.get('hum_frac_mic_conc') \
-           and not all(data.get(key) for key in dependent):
-            raise ValidationError(
-                'If hum_frac_mic_conc is not empty, then '
-                'must provide hum_frac_mic_unit, '
-                'hum_frac_target_mic, and '
-                'hum_frac_target_mic_ref.'
-            )
-
     hum_frac_chem_conc = fields.Float(
         allow_none=True,
         metadata={'units': "specified in 'hum_frac_chem_unit'."}
     )
 
-    hum_frac_chem_unit = fields.String(
+    hum_frac_chem_unit = nwss_fields.CategoricalString(
         allow_none=True,
-        validate=nwss_validators.CaseInsensitiveOneOf(value_sets.chem_units)
+        allowed_values=value_sets.chem_units
     )
 
-    hum_frac_target_chem = fields.String(
+    hum_frac_target_chem = nwss_fields.CategoricalString(
         allow_none=True,
-        validate=nwss_validators.CaseInsensitiveOneOf(value_sets.hum_frac_target_chem)
+        allowed_values=value_sets.hum_frac_target_chem
     )
 
     hum_frac_target_chem_ref = fields.String(
         allow_none=True
     )
 
-    @validates_schema
-    def validate_hum_frac_chem_conc(self, data, **kwargs):
-        """
-        If hum_frac_chem_conc is not empty, then
-         validate that the dependent fields
-         are not empty.
-        """
-        dependent = [
-            'hum_frac_chem_unit',
-            'hum_frac_target_chem',
-            'hum_frac_target_chem_ref'
-        ]
-
-        if data.get('hum_frac_chem_conc') \
-           and not all(data.get(key) for key in dependent):
-            raise ValidationError(
-                'If hum_frac_chem_unit is not empty, '
-                'then hum_frac_chem_unit, hum_frac_target_chem, '
-                'and hum_frac_target_chem_ref cannot be null.'
-            )
-
     other_norm_conc = fields.Float(
         allow_none=True
     )
 
-    other_norm_name = fields.String(
+    other_norm_name = nwss_fields.CategoricalString(
         allow_none=True,
-        validate=nwss_validators.CaseInsensitiveOneOf(value_sets.other_norm_name)
+        allowed_values=value_sets.other_norm_name
     )
 
-    other_norm_unit = fields.String(
+    other_norm_unit = nwss_fields.CategoricalString(
         allow_none=True,
-        validate=nwss_validators.CaseInsensitiveOneOf(value_sets.mic_chem_units)
+        allowed_values=value_sets.mic_chem_units
     )
 
     other_norm_ref = fields.String(
         allow_none=True
     )
 
-    @validates_schema
-    def validate_other_norm_conc(self, data, **kwargs):
-        """
-        If other_norm_conc is not empty, then
-         validate that the dependent fields
-         are not empty.
-        """
-        dependent = [
-            'other_norm_name',
-            'other_norm_unit',
-            'other_norm_ref'
-        ]
-
-        if data.get('other_norm_conc') \
-           and not all(data.get(key) for key in dependent):
-            raise ValidationError(
-                    'If other_norm_conc is not empty, then '
-                    'other_norm_name cannot be null.'
-            )
-
     quant_stan_type = nwss_fields.CategoricalString(
         required=True,
         allowed_values=value_sets.quant_stan_type
@@ -405,23 +304,6 @@ class QuantificationMethod():
         required=True
     )
 
-    @validates_schema
-    def validate_inhibition_detect(self, data, **kwargs):
-        if data['inhibition_detect'] == 'yes' \
-           and not data['inhibition_adjust']:
-            raise ValidationError(
-                "If 'inhibition_detect' is yes, "
-                "then 'inhibition_adjust' must have "
-                "a non-empty value."
-            )
-
-        if data['inhibition_detect'] == 'not tested' \
-           and data['inhibition_method'] != 'none':
-            raise ValidationError(
-                "'inhibition_method' must be 'none' "
-                "if inhibition_detect == 'not tested'."
-            )
-
     num_no_target_control = nwss_fields.CategoricalString(
         required=True,
         allowed_values=value_sets.num_no_target_control
@@ -435,9 +317,7 @@ class Sample():
 
     @validates('sample_collect_date')
     def validate_sample_collect_date(self, value):
-        tomorrow = get_future_date(24)
-
-        if value > tomorrow:
+        if value > self.validation_context.tomorrow:
             raise ValidationError(
                 "'sample_collect_date' cannot be after "
                 "tomorrow's date."
@@ -458,33 +338,6 @@ class Sample():
         metadata={'units': 'Million gallons per day (MGD)'}
     )
 
-    @validates_schema
-    def validate_flow_rate(self, data, **kwargs):
-        flowing_source = set([
-            'raw wastewater',
-            'post grit removal',
-            'primary effluent',
-            'secondary effluent'
-        ])
-
-        per_volume_result = set([
-            'copies/L wastewater',
-            'log10 copies/L wastewater',
-            'micrograms/L wastewater',
-            'log10 micrograms/L wastewater',
-        ])
-
-        if (data['sample_matrix'] in flowing_source
-           or data['sars_cov2_units'] in per_volume_result) \
-           and not data['flow_rate']:
-
-            raise ValidationError(
-                "If 'sample_matrix' is liquid sampled from flowing source "
-                f"({', '.join(flowing_source)}) or 'sars_cov2_units' is "
-                f"on a per volume basis ({', '.join(per_volume_result)}) "
-                "then 'flow_rate' must have a non-empty value."
-            )
-
     ph = fields.Float(
         allow_none=True,
         metadata={'units': 'pH units'}
@@ -530,24 +383,6 @@ class QuantificationResults():
         required=True
     )
 
-    @validates_schema
-    def validate_test_result_date(self, data, **kwargs):
-        tomorrow = get_future_date(24)
-
-        result_date = data['test_result_date']
-
-        if result_date > tomorrow:
-            raise ValidationError(
-                "'test_result_date' cannot be after "
-                "tomorrow's date."
-            )
-
-        if data['sample_collect_date'] > result_date:
-            raise ValidationError(
-                "'test_result_date' cannot be "
-                "before 'sample_collect_date'."
-            )
-
     sars_cov2_units = nwss_fields.CategoricalString(
         required=True,
         allowed_values=value_sets.mic_chem_units
@@ -589,9 +424,9 @@ class QuantificationResults():
         metadata={'units': 'specified in sars_cov2_units'}
     )
 
-    quality_flag = fields.String(
+    quality_flag = nwss_fields.CategoricalString(
         allow_none=True,
-        validate=nwss_validators.CaseInsensitiveOneOf(value_sets.yes_no_empty)
+        allowed_values=value_sets.yes_no_empty
     )
 
 
@@ -608,9 +443,104 @@ class WaterSampleSchema(
     class Meta:
         additional_properties = True
 
+    # Strip leading and trailing whitespace from text values before they
+    # are validated. Off by default, as the JSON schema doesn't trim.
+    trim_whitespace = False
+
     @pre_load
     def cast_to_none(self, raw_data, **kwargs):
         """Cast empty strings to None to provide for the use of
-        the allow_none flag by optional numeric fields.
+        the allow_none flag by optional numeric fields, trimming text
+        first if ``trim_whitespace`` is set.
         """
+        if self.trim_whitespace:
+            return {
+                k: (v.strip() or None) if type(v) is str else v
+                for k, v in raw_data.items()
+            }
+
         return {k: v if v != '' else None for k, v in raw_data.items()}
+
+    # Cross-field rules, declared in nwss.rules
+    cross_field_rules = rules.RULES
+
+    @property
+    def validation_context(self):
+        """The ValidationContext dates are checked against. ``load`` captures
+        one per call, held in ``nwss.utils.current_context`` so concurrent
+        loads don't share it; outside of ``load`` a fresh one is used each
+        time.
+        """
+        return current_context.get() or ValidationContext()
+
+    def load(self, data, *, validation_context=None, **kwargs):
+        """Load data as ``Schema.load`` does, checking every row against the
+        same ValidationContext. If the context carries a profile, the run is
+        timed with it.
+        """
+        context = validation_context or ValidationContext()
+        token = current_context.set(context)
+
+        try:
+            if context.profile is None:
+                return super().load(data, **kwargs)
+
+            with profiling.instrument(self, context.profile):
+                return super().load(data, **kwargs)
+        finally:
+            current_context.reset(token)
+
+    @validates_schema
+    def validate_rules(self, data, **kwargs):
+        messages = rules.check(data, self.cross_field_rules, self.validation_context)
+
+        if messages:
+            raise ValidationError(messages)
+
+    def load_iter(self, rows, chunk_size=None):
+        """Validate an iterable of rows lazily, so memory use does not grow
+        with the number of rows.
+
+        Each row is loaded on its own, running the same hooks as ``load``.
+        Yields ``(row_index, data, errors)`` per row, where ``errors`` is None
+        for valid rows and ``data`` holds whatever could be deserialized.
+
+        With ``chunk_size``, yields ``(first_row_index, data, errors)`` per
+        chunk of rows instead, where ``data`` is a list and ``errors`` maps
+        row index to messages, like ``load`` with ``many=True``.
+        """
+        # Check every row in the stream against the same dates
+        context = ValidationContext()
+
+        if chunk_size is None:
+            for index, row in enumerate(rows):
+                yield (index, *self._load_row(row, context))
+            return
+
+        rows = iter(rows)
+        start = 0
+
+        while True:
+            chunk = list(islice(rows, chunk_size))
+
+            if not chunk:
+                return
+
+            data, errors = [], {}
+
+            for index, row in enumerate(chunk, start=start):
+                row_data, row_errors = self._load_row(row, context)
+                data.append(row_data)
+
+                if row_errors:
+                    errors[index] = row_errors
+
+            yield start, data, errors
+
+            start += len(chunk)
+
+    def _load_row(self, row, context):
+        try:
+            return self.load(row, many=False, validation_context=context), None
+        except ValidationError as e:
+            return e.valid_data, e.messages
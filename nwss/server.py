@@ -0,0 +1,253 @@
+'''
+A local HTTP service for validating submissions.
+
+    nwss serve --port 8000
+    curl --data-binary @samples.csv -H 'Content-Type: text/csv' \
+        http://localhost:8000/validate
+
+The validator is loaded once when the server starts and shared by every
+request, so a request pays only for validating its own rows. Request bodies
+are read as a stream and validated a chunk of rows at a time while the rest
+of the body is still arriving, with ``Content-Length`` or chunked transfer
+encoding. The response lists the errors grouped by field and error code,
+as ``GroupedErrors.report`` does:
+
+    {"valid": false, "rows": 120, "invalid_rows": 3, "errors": [...]}
+
+``POST /validate`` takes CSV (``text/csv``, the default), JSON lines
+(``application/x-ndjson``) or a JSON array of objects
+(``application/json``). ``GET /health`` answers once the server is up.
+'''
+import csv
+import io
+import json
+import traceback
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+from nwss.cli import InputError, _jsonl_rows, validate_rows
+from nwss.errors import ErrorCodes, GroupedErrors
+
+
+CHUNK_SIZE = 1000
+
+CONTENT_TYPES = {
+    'text/csv': 'csv',
+    'application/csv': 'csv',
+    'application/json': 'json',
+    'application/x-ndjson': 'jsonl',
+    'application/jsonl': 'jsonl',
+    'application/jsonlines': 'jsonl',
+}
+
+
+class RequestBody(io.RawIOBase):
+    '''
+    The body of a request, read from ``rfile`` up to ``length`` bytes or,
+    if ``length`` is None, decoded from chunked transfer encoding.
+    '''
+
+    def __init__(self, rfile, length=None):
+        self.rfile = rfile
+        self.remaining = length
+        self.chunked = length is None
+        self.done = length == 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self.done:
+            return 0
+
+        if self.chunked and not self.remaining:
+            self.remaining = self._next_chunk()
+
+            if not self.remaining:
+                self.done = True
+                return 0
+
+        data = self.rfile.read1(min(len(buffer), self.remaining))
+
+        if not data:
+            raise InputError('request body ended early')
+
+        buffer[:len(data)] = data
+        self.remaining -= len(data)
+
+        if not self.chunked and not self.remaining:
+            self.done = True
+        elif self.chunked and not self.remaining:
+            # Each chunk is followed by a line ending
+            self.rfile.readline()
+
+        return len(data)
+
+    def _next_chunk(self):
+        line = self.rfile.readline(1024)
+
+        try:
+            size = int(line.split(b';', 1)[0], 16)
+        except ValueError:
+            raise InputError('bad chunk in request body')
+
+        if size == 0:
+            # Skip any trailers, up to the blank line that ends the body
+            while self.rfile.readline(1024) not in (b'\r\n', b'\n', b''):
+                pass
+
+        return size
+
+
+class GroupedReport():
+    '''
+    Collects errors into ``GroupedErrors`` for the response.
+    '''
+
+    def __init__(self, codes=None):
+        self.errors = GroupedErrors(codes=codes)
+        self.counts = {}
+
+    def start(self):
+        pass
+
+    def add(self, row, line, messages):
+        self.errors.add_messages(row, messages)
+
+    def finish(self, n_rows, n_invalid, truncated):
+        self.counts = {'rows': n_rows, 'invalid_rows': n_invalid}
+
+    def to_dict(self):
+        return {
+            'valid': not self.errors,
+            **self.counts,
+            'errors': self.errors.report(),
+        }
+
+
+class ValidationHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    # Headers and body are written separately; don't let Nagle's algorithm
+    # hold the body back waiting for the client's delayed ACK
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/health':
+            self._error(HTTPStatus.NOT_FOUND, f'no such path: {self.path}')
+            return
+
+        self._send(HTTPStatus.OK, {'status': 'ok'})
+
+    def do_POST(self):
+        if self.path.split('?', 1)[0] != '/validate':
+            self.close_connection = True
+            self._error(HTTPStatus.NOT_FOUND, f'no such path: {self.path}')
+            return
+
+        content_type = self.headers.get('Content-Type', 'text/csv')
+        format = CONTENT_TYPES.get(content_type.split(';', 1)[0].strip().lower())
+
+        if format is None:
+            self.close_connection = True
+            self._error(HTTPStatus.UNSUPPORTED_MEDIA_TYPE,
+                        f'unsupported content type: {content_type}')
+            return
+
+        if 'chunked' in self.headers.get('Transfer-Encoding', '').lower():
+            length = None
+        elif self.headers.get('Content-Length', '').isdigit():
+            length = int(self.headers['Content-Length'])
+        else:
+            self.close_connection = True
+            self._error(HTTPStatus.LENGTH_REQUIRED, 'Content-Length required')
+            return
+
+        body = RequestBody(self.rfile, length)
+
+        try:
+            report = self.server.validate(body, format)
+        except (InputError, ValueError, csv.Error) as error:
+            # The rest of the body hasn't been read
+            self.close_connection = True
+            self._error(HTTPStatus.BAD_REQUEST, f'cannot read request body: {error}')
+            return
+        except Exception:
+            self.server.log(traceback.format_exc())
+            self.close_connection = True
+            self._error(HTTPStatus.INTERNAL_SERVER_ERROR, 'unexpected error')
+            return
+
+        self._send(HTTPStatus.OK, report.to_dict())
+
+    def _error(self, status, message):
+        self._send(status, {'error': message})
+
+    def _send(self, status, document):
+        content = json.dumps(document).encode('utf-8')
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        self.server.log(f'{self.address_string()} {format % args}')
+
+
+class ValidationServer(ThreadingMixIn, HTTPServer):
+    '''
+    A threaded HTTP server validating request bodies with one resident
+    validator, by default a ``ColumnarValidator``.
+    '''
+
+    daemon_threads = True
+
+    # Leave room for many clients connecting at once
+    request_queue_size = 128
+
+    def __init__(self, address, validator=None, log=None,
+                 handler=ValidationHandler):
+        if validator is None:
+            from nwss.batch import ColumnarValidator
+            validator = ColumnarValidator()
+
+        self.validator = validator
+        self.codes = ErrorCodes(validator.schema)
+        self.log = log or (lambda message: None)
+
+        super().__init__(address, handler)
+
+    def validate(self, body, format):
+        '''
+        Validate the binary stream ``body`` in ``format`` ('csv', 'jsonl' or
+        'json') and return a GroupedReport.
+        '''
+        report = GroupedReport(self.codes)
+        text = io.TextIOWrapper(io.BufferedReader(body), encoding='utf-8-sig',
+                                newline='')
+
+        if format == 'csv':
+            rows = csv.DictReader(text)
+        elif format == 'jsonl':
+            rows = _jsonl_rows(text, [])
+        else:
+            rows = json.load(text)
+
+            if not isinstance(rows, list) or \
+                    not all(isinstance(row, dict) for row in rows):
+                raise InputError('expected a JSON array of objects')
+
+        validate_rows(rows, report, chunk_size=CHUNK_SIZE, validator=self.validator)
+
+        # Reading stops at the last row; finish the body so the connection
+        # can be reused
+        text.detach().read()
+
+        return report
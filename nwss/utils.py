@@ -1,6 +1,57 @@
 import datetime
+import threading
+
+try:
+    from contextvars import ContextVar
+except ImportError:
+    # Python 3.6: a value per thread rather than per context
+    class ContextVar(threading.local):
+        def __init__(self, name, default=None):
+            self.name = name
+            self.value = default
+
+        def get(self):
+            return self.value
+
+        def set(self, value):
+            token, self.value = self.value, value
+            return token
+
+        def reset(self, token):
+            self.value = token
+
+
+def normalize_value(value, trim=False):
+    '''
+    Return None for an empty string, stripping whitespace from strings
+    first if ``trim`` is set, and any other value unchanged.
+    '''
+    if trim and type(value) is str:
+        value = value.strip()
+
+    return None if value == '' else value
 
 
 def get_future_date(hours):
     return (datetime.date.today() +
             datetime.timedelta(hours=hours))
+
+
+class ValidationContext():
+    '''
+    Values shared by every row in a validation run. Capturing the date once
+    means rows validated either side of midnight are checked against the
+    same "tomorrow". Pass an ``nwss.profiling.Profile`` as ``profile`` to
+    time the run.
+    '''
+
+    def __init__(self, today=None, profile=None):
+        self.today = today or datetime.date.today()
+        self.profile = profile
+        self.tomorrow = self.today + datetime.timedelta(hours=24)
+
+
+# The ValidationContext of the load or batch being validated, which field
+# validators read as ``schema.validation_context``. Kept per call rather than
+# on the schema so that threads can share a schema.
+current_context = ContextVar('nwss_validation_context', default=None)
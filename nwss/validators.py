@@ -1,14 +1,22 @@
 from marshmallow import validate, ValidationError
 
+from nwss import value_sets
+
 
 class CaseInsensitiveOneOf(validate.OneOf):
     _jsonschema_base_validator_class = validate.OneOf
 
+    def __init__(self, choices, *args, **kwargs):
+        super().__init__(choices, *args, **kwargs)
+        self.index = value_sets.get_index(self.choices)
+
     def __call__(self, value) -> str:
-        try:
-            if not any(value.casefold() == v.casefold() for v in self.choices):
-                raise ValidationError(self._format_error(value))
-        except TypeError as error:
-            raise ValidationError(self._format_error(value)) from error
+        '''
+        Return the canonical spelling of value from the allowed choices.
+        '''
+        canonical = self.index.canonical(value)
+
+        if canonical is None:
+            raise ValidationError(self._format_error(value))
 
-        return value
+        return canonical
@@ -1,3 +1,65 @@
+import sys
+
+
+class ValueSetIndex():
+    '''
+    Case-insensitive index over a list of allowed values, mapping each
+    casefolded value to its canonical spelling and an integer category code
+    (its position in the list).
+    '''
+
+    def __init__(self, values):
+        self.values = tuple(sys.intern(value) for value in values)
+
+        self._lookup = {}
+
+        for code, value in enumerate(self.values):
+            self._lookup.setdefault(value.casefold(), (code, value))
+
+    def __contains__(self, value):
+        return self.lookup(value) is not None
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def __len__(self):
+        return len(self.values)
+
+    def lookup(self, value):
+        '''
+        Return (code, canonical value) for value, or None if it is not in
+        the set.
+        '''
+        try:
+            return self._lookup.get(value.casefold())
+        except (AttributeError, TypeError):
+            return None
+
+    def canonical(self, value):
+        match = self.lookup(value)
+        return match[1] if match else None
+
+    def code(self, value):
+        match = self.lookup(value)
+        return match[0] if match else None
+
+
+_indexes = {}
+
+
+def get_index(values):
+    '''
+    Return the shared ValueSetIndex for a list of allowed values, building it
+    on first use.
+    '''
+    key = tuple(values)
+
+    try:
+        return _indexes[key]
+    except KeyError:
+        return _indexes.setdefault(key, ValueSetIndex(key))
+
+
 reporting_jurisdiction = [
     'AL',
     'AK',
@@ -0,0 +1,283 @@
+'''
+Validate files as they arrive in a directory.
+
+    nwss watch /srv/sftp/incoming --workers 4
+
+``Watcher`` polls a directory for CSV, JSON lines and XLSX files. A file is
+picked up once its size and modification time are unchanged between two
+polls, so files still being uploaded are left alone, and handed to a
+process pool whose workers each build a validator once, when the pool
+starts. Each report is written to a temporary file and renamed next to the
+input, e.g. ``samples.csv.nwss-report.json``, so readers never see a
+partial report. A journal of validated files (name, size and modification
+time) is appended to as each file finishes, so a restarted watcher skips
+files it has already validated unless they have changed. Files that can't
+be validated are journaled with the error, so they aren't retried until
+they change either.
+'''
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from nwss.cli import InputError, guess_format, validate_path
+
+
+JOURNAL = '.nwss-journal.jsonl'
+
+REPORT_INFIX = '.nwss-report.'
+
+REPORT_EXTENSIONS = {'json': 'json', 'csv': 'csv', 'summary': 'txt'}
+
+EXTENSIONS = {'.csv', '.json', '.jsonl', '.ndjson', '.xlsx', '.xlsm'}
+
+_validator = None
+
+
+def _init_worker():
+    global _validator
+
+    from nwss.batch import ColumnarValidator
+    _validator = ColumnarValidator()
+
+
+def _ready():
+    return os.getpid()
+
+
+def report_path(path, format):
+    return f'{path}{REPORT_INFIX}{REPORT_EXTENSIONS[format]}'
+
+
+def validate_to_report(path, format='json'):
+    '''
+    Validate ``path``, writing its report next to it atomically. Returns a
+    journal entry for the file.
+    '''
+    if _validator is None:
+        _init_worker()
+
+    stat = os.stat(path)
+    report = report_path(path, format)
+    entry = {
+        'name': os.path.basename(path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+    }
+
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(path), prefix='.' + os.path.basename(report), suffix='.tmp'
+    )
+
+    try:
+        with os.fdopen(fd, 'w', newline='', encoding='utf-8') as output:
+            n_rows, n_invalid, _ = validate_path(
+                path, output, format, input_format=guess_format(path),
+                validator=_validator,
+            )
+    except InputError as error:
+        os.unlink(tmp_path)
+        entry['error'] = str(error)
+        return entry
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+    os.replace(tmp_path, report)
+
+    entry.update(rows=n_rows, invalid_rows=n_invalid, report=os.path.basename(report))
+    return entry
+
+
+class Watcher():
+    '''
+    Watch ``directory`` and validate new or changed files with a pool of
+    ``workers`` processes, writing reports in ``format``.
+    '''
+
+    def __init__(self, directory, workers=1, format='json', interval=2.0, log=None):
+        self.directory = directory
+        self.workers = workers
+        self.format = format
+        self.interval = interval
+        self.log = log or (lambda message: None)
+
+        self.journal_path = os.path.join(directory, JOURNAL)
+        self.done = self._read_journal()
+
+        # name -> (size, mtime_ns) at the last poll, and name -> (future,
+        # (size, mtime_ns)) for the files being validated
+        self.seen = {}
+        self.pending = {}
+
+        self.pool = None
+
+    def _read_journal(self):
+        '''
+        Return {name: (size, mtime_ns)} for the files in the journal.
+        '''
+        done = {}
+
+        try:
+            with open(self.journal_path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        done[entry['name']] = (entry['size'], entry['mtime_ns'])
+                    except (ValueError, KeyError, TypeError):
+                        # A line cut short by a crash
+                        continue
+        except FileNotFoundError:
+            pass
+
+        return done
+
+    def _write_journal(self, entry):
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.done[entry['name']] = (entry['size'], entry['mtime_ns'])
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def start(self):
+        '''
+        Start the pool, waiting until every worker has loaded the validator.
+        '''
+        self.pool = ProcessPoolExecutor(self.workers, initializer=_init_worker)
+
+        for future in [self.pool.submit(_ready) for _ in range(self.workers)]:
+            future.result()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+            self.pool = None
+
+    def candidates(self):
+        '''
+        Return {name: (size, mtime_ns)} for the input files in the directory.
+        '''
+        files = {}
+
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                name = entry.name
+
+                if name.startswith('.') or REPORT_INFIX in name or \
+                        os.path.splitext(name)[1].lower() not in EXTENSIONS:
+                    continue
+
+                try:
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+
+                files[name] = (stat.st_size, stat.st_mtime_ns)
+
+        return files
+
+    def poll(self, settle=True):
+        '''
+        Submit the files that are new or changed since they were validated
+        and, with ``settle``, unchanged since the last poll. Returns the
+        names submitted.
+        '''
+        files = self.candidates()
+        submitted = []
+
+        for name, signature in sorted(files.items()):
+            if name in self.pending or self.done.get(name) == signature:
+                continue
+
+            if settle and self.seen.get(name) != signature:
+                continue
+
+            path = os.path.join(self.directory, name)
+            future = self.pool.submit(validate_to_report, path, self.format)
+            self.pending[name] = future, signature
+            submitted.append(name)
+
+        self.seen = files
+
+        return submitted
+
+    def collect(self, timeout=0):
+        '''
+        Journal the files that have finished, waiting up to ``timeout``
+        seconds for one to. Returns their journal entries.
+        '''
+        if not self.pending:
+            return []
+
+        finished, _ = wait([future for future, _ in self.pending.values()],
+                           timeout=timeout, return_when=FIRST_COMPLETED)
+        entries = []
+
+        for name, (future, (size, mtime_ns)) in list(self.pending.items()):
+            if future not in finished:
+                continue
+
+            del self.pending[name]
+
+            try:
+                entry = future.result()
+            except Exception as error:
+                # Journal the failure against the file as it was submitted,
+                # so it is only retried once the file changes
+                entry = {'name': name, 'size': size, 'mtime_ns': mtime_ns,
+                         'error': repr(error), 'failed': True}
+
+            self._write_journal(entry)
+            entries.append(entry)
+
+            if entry.get('failed'):
+                self.log(f'{name}: failed: {entry["error"]}')
+            elif 'error' in entry:
+                self.log(f'{name}: cannot read: {entry["error"]}')
+            else:
+                self.log(
+                    f'{name}: {entry["rows"]} rows, {entry["invalid_rows"]} with errors'
+                )
+
+        return entries
+
+    def run_once(self):
+        '''
+        Validate every new or changed file now, without waiting for files
+        to settle, and return their journal entries.
+        '''
+        self.poll(settle=False)
+
+        entries = []
+
+        while self.pending:
+            entries.extend(self.collect(timeout=None))
+
+        return entries
+
+    def run(self):
+        '''
+        Poll until interrupted.
+        '''
+        while True:
+            started = time.monotonic()
+
+            self.poll()
+            self.collect(timeout=max(0, self.interval - (time.monotonic() - started)))
+
+            # Sleep out the rest of the interval if nothing was pending
+            remaining = self.interval - (time.monotonic() - started)
+
+            if remaining > 0:
+                time.sleep(remaining)
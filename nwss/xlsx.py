@@ -0,0 +1,308 @@
+'''
+Stream rows from .xlsx workbooks using only the standard library.
+
+Worksheets are parsed incrementally with ``iterparse``, so only the current
+row and the workbook's shared strings are held in memory. Rows are yielded
+as dicts keyed by the header row, like ``csv.DictReader``, ready for
+``WaterSampleSchema.load_iter`` or ``nwss.batch``:
+
+    with XLSXReader('samples.xlsx') as workbook:
+        for index, data, errors in schema.load_iter(workbook.rows()):
+            ...
+
+Cell values follow the browser validator, which reads workbooks with
+SheetJS: values are returned as text, dates are formatted as
+``YYYY-MM-DD``, and blank cells and blank rows are left out.
+'''
+import datetime
+import posixpath
+import re
+import zipfile
+from xml.etree.ElementTree import iterparse
+
+
+MAIN = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+RELATIONSHIPS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+PACKAGE_RELATIONSHIPS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+# Built-in number formats that display dates or times
+DATE_FORMATS = set(range(14, 18)) | {22} | set(range(27, 37)) | set(range(50, 59))
+TIME_FORMATS = set(range(18, 22)) | set(range(45, 48))
+
+DATE = 'date'
+TIME = 'time'
+
+# Quoted text, escaped characters and [colour] or [condition] sections
+_FORMAT_LITERALS = re.compile(r'"[^"]*"|\\.|\[[^\]]*\]')
+
+_COLUMN = re.compile(r'[A-Z]+')
+
+
+def format_kind(format_code):
+    '''
+    Return DATE or TIME if a custom number format displays a date or a time
+    of day, or None.
+    '''
+    code = _FORMAT_LITERALS.sub('', format_code).lower()
+
+    if 'y' in code or 'd' in code:
+        return DATE
+    if 'h' in code or 's' in code:
+        return TIME
+
+    return None
+
+
+def column_index(reference):
+    '''
+    Return the 0-based column of a cell reference such as ``AB12``.
+    '''
+    index = 0
+
+    for letter in _COLUMN.match(reference).group():
+        index = index * 26 + ord(letter) - ord('A') + 1
+
+    return index - 1
+
+
+class XLSXReader():
+    '''
+    Read rows from the sheets of an .xlsx workbook, given as a path or a
+    binary file object.
+    '''
+
+    def __init__(self, file):
+        self.zipfile = zipfile.ZipFile(file)
+
+        self.date1904 = False
+        self.sheets = self._read_workbook()
+        self.shared_strings = self._read_shared_strings()
+        self.styles = self._read_styles()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.zipfile.close()
+
+    @property
+    def sheet_names(self):
+        return list(self.sheets)
+
+    def _iterparse(self, name, tag):
+        '''
+        Yield each ``tag`` element of a part of the workbook once it has been
+        parsed, then drop it from the tree.
+        '''
+        with self.zipfile.open(name) as f:
+            parents = []
+
+            for event, element in iterparse(f, events=('start', 'end')):
+                if event == 'start':
+                    parents.append(element)
+                    continue
+
+                parents.pop()
+
+                if element.tag == tag:
+                    yield element
+
+                    if parents:
+                        parents[-1].remove(element)
+
+    def _read_workbook(self):
+        relationships = {}
+
+        for relationship in self._iterparse('xl/_rels/workbook.xml.rels',
+                                            PACKAGE_RELATIONSHIPS + 'Relationship'):
+            target = relationship.get('Target')
+
+            if target.startswith('/'):
+                target = target[1:]
+            else:
+                target = posixpath.normpath(posixpath.join('xl', target))
+
+            relationships[relationship.get('Id')] = target
+
+        sheets = {}
+
+        with self.zipfile.open('xl/workbook.xml') as f:
+            for _, element in iterparse(f):
+                if element.tag == MAIN + 'workbookPr':
+                    self.date1904 = element.get('date1904') in ('1', 'true')
+                elif element.tag == MAIN + 'sheet':
+                    sheets[element.get('name')] = \
+                        relationships[element.get(RELATIONSHIPS + 'id')]
+
+        return sheets
+
+    def _read_shared_strings(self):
+        if 'xl/sharedStrings.xml' not in self.zipfile.namelist():
+            return []
+
+        return [
+            _text(item)
+            for item in self._iterparse('xl/sharedStrings.xml', MAIN + 'si')
+        ]
+
+    def _read_styles(self):
+        '''
+        Return DATE, TIME or None for each cell style.
+        '''
+        if 'xl/styles.xml' not in self.zipfile.namelist():
+            return []
+
+        custom = {}
+        styles = []
+
+        with self.zipfile.open('xl/styles.xml') as f:
+            in_cell_formats = False
+
+            for event, element in iterparse(f, events=('start', 'end')):
+                if element.tag == MAIN + 'cellXfs':
+                    in_cell_formats = event == 'start'
+
+                if event != 'end':
+                    continue
+
+                if element.tag == MAIN + 'numFmt':
+                    custom[int(element.get('numFmtId'))] = \
+                        format_kind(element.get('formatCode', ''))
+                elif element.tag == MAIN + 'xf' and in_cell_formats:
+                    format_id = int(element.get('numFmtId', 0))
+
+                    if format_id in custom:
+                        styles.append(custom[format_id])
+                    elif format_id in DATE_FORMATS:
+                        styles.append(DATE)
+                    elif format_id in TIME_FORMATS:
+                        styles.append(TIME)
+                    else:
+                        styles.append(None)
+
+        return styles
+
+    def rows(self, sheet=None):
+        '''
+        Yield a dict per row of ``sheet`` (the first sheet by default), keyed
+        by the sheet's first non-blank row.
+        '''
+        if sheet is None:
+            sheet = self.sheet_names[0]
+
+        header = None
+
+        for values in self.values(sheet):
+            if header is None:
+                header = values
+                continue
+
+            row = {
+                header[column]: value
+                for column, value in values.items()
+                if header.get(column)
+            }
+
+            if row:
+                yield row
+
+    def values(self, sheet):
+        '''
+        Yield ``{column index: text}`` for each non-blank row of ``sheet``.
+        '''
+        try:
+            part = self.sheets[sheet]
+        except KeyError:
+            raise KeyError(f'Workbook has no sheet named {sheet!r}')
+
+        for row in self._iterparse(part, MAIN + 'row'):
+            values = {}
+
+            for column, cell in enumerate(row.iter(MAIN + 'c')):
+                reference = cell.get('r')
+
+                if reference is not None:
+                    column = column_index(reference)
+
+                value = self._cell_value(cell)
+
+                if value is not None and value != '':
+                    values[column] = value
+
+            if values:
+                yield values
+
+    def _cell_value(self, cell):
+        cell_type = cell.get('t', 'n')
+
+        if cell_type == 'inlineStr':
+            inline = cell.find(MAIN + 'is')
+            return None if inline is None else _text(inline)
+
+        value = cell.findtext(MAIN + 'v')
+
+        if value is None:
+            return None
+
+        if cell_type == 's':
+            return self.shared_strings[int(value)]
+        if cell_type == 'b':
+            return 'TRUE' if value == '1' else 'FALSE'
+        if cell_type == 'n':
+            return self._number(value, int(cell.get('s', 0)))
+
+        # Formula strings, errors and ISO 8601 dates are stored as text
+        return value
+
+    def _number(self, value, style):
+        number = float(value)
+        kind = self.styles[style] if style < len(self.styles) else None
+
+        if kind == DATE:
+            return self._datetime(number).date().isoformat()
+        if kind == TIME:
+            return self._datetime(number).time().isoformat()
+
+        if number.is_integer() and abs(number) < 1e15:
+            return str(int(number))
+
+        return repr(number)
+
+    def _datetime(self, serial):
+        if self.date1904:
+            epoch = datetime.datetime(1904, 1, 1)
+        elif serial < 60:
+            # Serial 60 is 29 February 1900, which Excel has but didn't happen
+            epoch = datetime.datetime(1899, 12, 31)
+        else:
+            epoch = datetime.datetime(1899, 12, 30)
+
+        # Round to the second, as Excel displays times
+        return epoch + datetime.timedelta(seconds=round(serial * 86400))
+
+
+def _text(element):
+    '''
+    Return the text of a string item, joining its rich text runs and
+    leaving out phonetic hints.
+    '''
+    parts = []
+
+    for child in element:
+        if child.tag == MAIN + 't':
+            parts.append(child.text or '')
+        elif child.tag == MAIN + 'r':
+            parts.append(child.findtext(MAIN + 't') or '')
+
+    return ''.join(parts)
+
+
+def read_xlsx(file, sheet=None):
+    '''
+    Yield a dict per row of a sheet of an .xlsx workbook. See ``XLSXReader``.
+    '''
+    with XLSXReader(file) as workbook:
+        yield from workbook.rows(sheet)
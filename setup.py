@@ -1,5 +1,11 @@
 #!/usr/bin/env python
+import os
+import re
+import subprocess
+import sys
+
 from setuptools import setup, find_packages
+from setuptools.command.build_py import build_py
 
 install_requires = [
     "marshmallow>=3.11.1",
@@ -7,14 +13,43 @@ install_requires = [
     "jsonschema>=3.2.0"
 ]
 
+with open(os.path.join(os.path.dirname(__file__), "nwss", "__init__.py")) as f:
+    version = re.search(r"^__version__ = '(.+)'$", f.read(), re.M).group(1)
+
 extras_require = {
-    "dev": ["pytest>=3.6", "flake8"]
+    "dev": ["pytest>=3.6", "flake8"],
+    "arrow": ["pyarrow>=8.0.0"],
+    "pandas": ["pandas>=1.1.0", "numpy"],
 }
 
 
+class BuildPyWithSchema(build_py):
+    """Prebuild the JSON schema into the package. If the schema's
+    dependencies aren't available at build time, it is generated on first
+    use instead.
+    """
+
+    def run(self):
+        super().run()
+
+        if self.dry_run:
+            return
+
+        module = os.path.join(self.build_lib, 'nwss', 'dump_to_jsonschema.py')
+
+        try:
+            subprocess.run(
+                [sys.executable, module, '--write-artifact'],
+                check=True,
+                env={**os.environ, 'PYTHONPATH': self.build_lib},
+            )
+        except subprocess.CalledProcessError:
+            self.warn('Could not prebuild the JSON schema')
+
+
 setup(
     name="nwss",
-    version="1.0.1",
+    version=version,
     author="DataMade",
     author_email="info@datamade.us",
     license="MIT",
@@ -23,8 +58,11 @@ setup(
     url="https://github.com/datamade/nwss-data-standard",
     packages=find_packages(),
     include_package_data=True,
+    package_data={"nwss": ["jsonschema.json"]},
+    cmdclass={"build_py": BuildPyWithSchema},
     install_requires=install_requires,
     extras_require=extras_require,
+    entry_points={"console_scripts": ["nwss = nwss.cli:main"]},
     platforms=["any"],
     keywords=[
         "National Wastewater Surveillance System",
@@ -0,0 +1,81 @@
+import datetime
+
+import pytest
+
+from nwss.batch import ColumnarValidator, rows_to_columns
+
+pa = pytest.importorskip('pyarrow')
+arrow = pytest.importorskip('nwss.arrow')
+
+
+@pytest.fixture
+def rows(valid_data):
+    rows = [dict(row) for row in valid_data * 3]
+
+    rows[1]['zipcode'] = '123'
+    rows[2]['reporting_jurisdiction'] = 'ca'
+    rows[3].update(sample_location='upstream', sample_location_specify='')
+    rows[4]['sample_collect_date'] = '2999-01-01'
+    rows[5]['population_served'] = 'many'
+
+    return rows
+
+
+def test_matches_columnar(rows):
+    expected_data, expected_errors = ColumnarValidator().validate(rows_to_columns(rows))
+
+    data, errors = arrow.validate_table(pa.Table.from_pylist(rows))
+
+    assert errors == expected_errors
+    assert data.to_pydict() == expected_data
+
+
+def test_categorical_dictionary(rows):
+    data, errors = arrow.validate_table(pa.Table.from_pylist(rows))
+
+    column = data.column('reporting_jurisdiction')
+
+    assert pa.types.is_dictionary(column.type)
+    assert column.chunk(0).dictionary.to_pylist() == ['CA']
+
+
+def test_record_batch(rows):
+    batch = pa.RecordBatch.from_pylist(rows)
+
+    data, errors = arrow.validate_table(batch)
+
+    assert isinstance(data, pa.RecordBatch)
+    assert data.num_rows == len(rows)
+    assert set(errors) == {1, 3, 4, 5}
+
+
+def test_typed_columns(valid_data):
+    table = pa.Table.from_pylist(valid_data)
+    dates = [
+        datetime.date.fromisoformat(value)
+        for value in table.column('sample_collect_date').to_pylist()
+    ]
+    table = table.set_column(
+        table.schema.get_field_index('sample_collect_date'),
+        'sample_collect_date',
+        pa.array(dates, pa.date32()),
+    )
+
+    data, errors = arrow.validate_table(table)
+
+    assert errors == {}
+    assert data.column('sample_collect_date').to_pylist() == dates
+
+
+def test_validate_parquet(tmp_path, rows):
+    pq = pytest.importorskip('pyarrow.parquet')
+
+    path = tmp_path / 'samples.parquet'
+    pq.write_table(pa.Table.from_pylist(rows), path)
+
+    expected_data, expected_errors = arrow.validate_table(pa.Table.from_pylist(rows))
+
+    data, errors = arrow.validate_parquet(path, batch_size=4)
+
+    assert errors == expected_errors
+    assert data.to_pydict() == expected_data.to_pydict()
@@ -0,0 +1,176 @@
+import datetime
+import threading
+
+from marshmallow import ValidationError
+import pytest
+
+from nwss.batch import ColumnarValidator, rows_to_columns
+from nwss.schemas import WaterSampleSchema
+from nwss.utils import ValidationContext
+
+
+def load_rows(rows, context=None):
+    '''
+    Validate rows one at a time with marshmallow, returning (data, errors)
+    in the shape produced by ColumnarValidator.
+    '''
+    schema = WaterSampleSchema()
+    data, errors = [], {}
+
+    for index, row in enumerate(rows):
+        try:
+            data.append(schema.load(row, validation_context=context))
+        except ValidationError as e:
+            data.append(None)
+            errors[index] = e.messages
+
+    return data, errors
+
+
+def assert_matches_schema(rows):
+    expected_data, expected_errors = load_rows(rows)
+
+    data, errors = ColumnarValidator().validate(rows_to_columns(rows))
+
+    assert errors == expected_errors
+
+    for index, expected in enumerate(expected_data):
+        if expected is not None:
+            assert {k: v[index] for k, v in data.items()} == expected
+
+
+def test_valid_data(valid_data):
+    data, errors = ColumnarValidator().validate(rows_to_columns(valid_data))
+
+    assert errors == {}
+    assert len(data['sample_id']) == len(valid_data)
+
+
+def test_invalid_data(invalid_data):
+    assert_matches_schema(invalid_data)
+
+
+@pytest.mark.parametrize(
+    'input',
+    [
+        {'reporting_jurisdiction': 'ca'},
+        {'reporting_jurisdiction': 'CAA'},
+        {'zipcode': '1234'},
+        {'population_served': '-1'},
+        {'population_served': '1.5'},
+        {'capacity_mgd': ''},
+        {'epaid': 'CA1123'},
+        {'sample_location': 'upstream', 'sample_location_specify': ''},
+        {'county_names': '', 'other_jurisdiction': ''},
+        {'pretreatment': 'yes', 'pretreatment_specify': ''},
+        {'inhibition_detect': 'not tested', 'inhibition_method': 'pcr'},
+        {'sample_collect_date': '2999-01-01'},
+        {'test_result_date': '2021-01-01'},
+        {'sample_collect_time': '25:58:00'},
+        {'sars_cov2_avg_conc': 'nan'},
+        {'sample_id': 'not a valid sample id'},
+        {'unexpected_column': 'value'},
+    ]
+)
+def test_matches_schema(valid_data, input):
+    rows = [dict(row) for row in valid_data]
+    rows[1].update(input)
+
+    assert_matches_schema(rows)
+
+
+def test_validation_context(valid_data):
+    context = ValidationContext(today=datetime.date(2021, 4, 28))
+
+    data, errors = ColumnarValidator().validate(rows_to_columns(valid_data), context)
+
+    assert errors
+    assert errors == load_rows(valid_data, context)[1]
+
+
+def test_concurrent_contexts(valid_data):
+    barrier = threading.Barrier(2, timeout=10)
+
+    class Validator(ColumnarValidator):
+        def _validate(self, *args):
+            # Both threads have started validating before either goes on
+            barrier.wait()
+            return super()._validate(*args)
+
+    validator = Validator()
+    columns = rows_to_columns(valid_data)
+    results = {}
+
+    def validate(today):
+        context = ValidationContext(today=today)
+        results[today] = validator.validate(columns, context)[1]
+
+    threads = [
+        threading.Thread(target=validate, args=(today,))
+        for today in (datetime.date(2021, 4, 28), None)
+    ]
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results[None] == {}
+    assert results[datetime.date(2021, 4, 28)] == \
+        load_rows(valid_data, ValidationContext(today=datetime.date(2021, 4, 28)))[1]
+
+
+def test_missing_column(valid_data):
+    rows = [dict(row) for row in valid_data]
+    for row in rows:
+        del row['lab_id']
+
+    data, errors = ColumnarValidator().validate(rows_to_columns(rows))
+
+    assert set(errors) == set(range(len(rows)))
+    assert errors[0] == {'lab_id': ['Missing data for required field.']}
+
+
+def test_unequal_columns():
+    with pytest.raises(ValueError):
+        ColumnarValidator().validate({'zipcode': ['60601'], 'lab_id': []})
+
+
+def test_numpy_columns(valid_data):
+    np = pytest.importorskip('numpy')
+
+    columns = {
+        key: np.array(values, dtype=object)
+        for key, values in rows_to_columns(valid_data).items()
+    }
+
+    data, errors = ColumnarValidator().validate(columns)
+
+    assert errors == {}
+
+
+@pytest.mark.parametrize('trim', [False, True])
+def test_trim_whitespace(valid_data, trim):
+    rows = [dict(row) for row in valid_data]
+    rows[0].update({
+        'zipcode': ' 12345 ',
+        'lab_id': 'lab1 ',
+        'sewage_travel_time': ' ',
+    })
+
+    schema = WaterSampleSchema()
+    schema.trim_whitespace = trim
+
+    expected = {}
+
+    for index, row in enumerate(rows):
+        try:
+            schema.load(row)
+        except ValidationError as e:
+            expected[index] = e.messages
+
+    _, errors = ColumnarValidator(schema).validate(rows_to_columns(rows))
+
+    assert errors == expected
+    assert set(errors.get(0, {})) == (set() if trim else
+                                      {'zipcode', 'lab_id', 'sewage_travel_time'})
@@ -0,0 +1,136 @@
+import csv
+import json
+import os
+import pickle
+
+import pytest
+
+from nwss.batch import ColumnarValidator
+from nwss.checkpoint import Checkpoint, validate_resumable
+from nwss.cli import EXIT_INVALID, EXIT_USAGE, main
+
+
+class Interrupted(Exception):
+    pass
+
+
+class InterruptingValidator():
+    '''
+    Validates ``chunks`` chunks, then stops the run as a kill would.
+    '''
+
+    def __init__(self, chunks):
+        self.validator = ColumnarValidator()
+        self.chunks = chunks
+
+    def validate(self, *args, **kwargs):
+        if not self.chunks:
+            raise Interrupted
+        self.chunks -= 1
+        return self.validator.validate(*args, **kwargs)
+
+
+@pytest.fixture
+def samples(tmp_path, valid_data):
+    rows = []
+
+    for i in range(40):
+        row = dict(valid_data[i % len(valid_data)])
+        row['sample_id'] = f'sample-{i}'
+
+        if i % 3 == 0:
+            row['zipcode'] = '1234'
+        if i % 7 == 0:
+            row['pcr_target_ref'] = 'line one\nline two'
+        if i % 11 == 0:
+            row['sample_type'] = 'pond water'
+
+        rows.append(row)
+
+    path = tmp_path / 'samples.csv'
+
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+    return str(path)
+
+
+@pytest.mark.parametrize('format', ['summary', 'json', 'csv'])
+def test_resume_gives_the_same_report(tmp_path, samples, format):
+    expected_path = str(tmp_path / 'expected')
+    output_path = str(tmp_path / 'report')
+    checkpoint_path = str(tmp_path / 'checkpoint')
+
+    expected = validate_resumable(samples, str(tmp_path / 'unused'), expected_path,
+                                  format, chunk_size=6)
+
+    with pytest.raises(Interrupted):
+        validate_resumable(samples, checkpoint_path, output_path, format,
+                           validator=InterruptingValidator(3), interval=0, chunk_size=6)
+
+    state = Checkpoint(checkpoint_path, samples, format=format, max_errors=None).load()
+    assert state['counts'][0] == 18
+
+    assert validate_resumable(samples, checkpoint_path, output_path, format,
+                              interval=0, chunk_size=6) == expected
+
+    with open(expected_path) as f, open(output_path) as g:
+        assert g.read() == f.read()
+
+    assert not os.path.exists(checkpoint_path)
+    assert not os.path.exists(str(tmp_path / 'unused'))
+
+
+def test_changed_input_starts_over(tmp_path, samples):
+    checkpoint_path = str(tmp_path / 'checkpoint')
+    output_path = str(tmp_path / 'report.json')
+
+    with pytest.raises(Interrupted):
+        validate_resumable(samples, checkpoint_path, output_path, 'json',
+                           validator=InterruptingValidator(2), interval=0, chunk_size=6)
+
+    # The file is replaced
+    os.utime(samples, ns=(0, 0))
+
+    assert Checkpoint(checkpoint_path, samples, format='json', max_errors=None) \
+        .load() is None
+
+    n_rows, _, _ = validate_resumable(samples, checkpoint_path, output_path, 'json',
+                                      chunk_size=6)
+    assert n_rows == 40
+
+
+def test_cli_checkpoint(tmp_path, samples, capsys):
+    checkpoint_path = str(tmp_path / 'checkpoint')
+
+    assert main(['validate', samples, '--checkpoint', checkpoint_path]) == EXIT_INVALID
+    assert '40 rows, 16 with errors' in capsys.readouterr().out
+
+    assert main(['validate', samples, '--checkpoint', checkpoint_path,
+                 '--format', 'json']) == EXIT_USAGE
+    assert main(['validate', samples, '--checkpoint', checkpoint_path,
+                 '--workers', '2']) == EXIT_USAGE
+
+
+def test_checkpoint_is_json(tmp_path, samples):
+    checkpoint_path = str(tmp_path / 'checkpoint')
+    checkpoint = Checkpoint(checkpoint_path, samples, format='summary', max_errors=None)
+
+    with pytest.raises(Interrupted):
+        validate_resumable(samples, checkpoint_path, validator=InterruptingValidator(2),
+                           interval=0, chunk_size=6)
+
+    with open(checkpoint_path) as f:
+        saved = json.load(f)
+
+    assert saved['state'] == checkpoint.load()
+    assert saved['state']['counts'] == [12, 5]
+    assert saved['state']['report']['errors']['groups']
+
+    # Pickled checkpoints, from older versions, are never loaded
+    with open(checkpoint_path, 'wb') as f:
+        pickle.dump((checkpoint._signature(), saved['state']), f)
+
+    assert checkpoint.load() is None
@@ -0,0 +1,262 @@
+import csv
+import io
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import nwss.cli
+from nwss.cli import (EXIT_ERROR, EXIT_INPUT, EXIT_INVALID, EXIT_OUTPUT, EXIT_USAGE,
+                      EXIT_VALID, main)
+from test_xlsx import write_workbook
+
+
+@pytest.fixture
+def rows(valid_data):
+    rows = [dict(valid_data[i % len(valid_data)], sample_id=f's{i}') for i in range(30)]
+
+    rows[3]['pcr_target_ref'] = 'line one\nline two'
+    rows[4]['zipcode'] = '1234'
+    rows[20]['zipcode'] = '123'
+    rows[21]['reporting_jurisdiction'] = 'XX'
+
+    return rows
+
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+    return path
+
+
+def run(capsys, *argv):
+    code = main(['validate', *map(str, argv)])
+    return code, capsys.readouterr().out
+
+
+def test_valid(tmp_path, valid_data, capsys):
+    path = write_csv(tmp_path / 'valid.csv', valid_data)
+
+    code, output = run(capsys, path)
+
+    assert code == EXIT_VALID
+    assert output == f'{path}: {len(valid_data)} rows, 0 with errors\n'
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_json(tmp_path, rows, capsys, workers):
+    path = write_csv(tmp_path / 'samples.csv', rows)
+
+    code, output = run(capsys, path, '--format', 'json', '--workers', workers)
+    report = json.loads(output)
+
+    assert code == EXIT_INVALID
+    assert (report['rows'], report['invalid_rows'], report['truncated']) == (30, 3, False)
+    assert [(error['row'], error['line']) for error in report['errors']] == \
+        [(4, 7), (20, 23), (21, 24)]
+    assert list(report['errors'][0]['errors']) == ['zipcode']
+
+
+def test_csv(tmp_path, rows, capsys):
+    path = write_csv(tmp_path / 'samples.csv', rows)
+
+    code, output = run(capsys, path, '--format', 'csv')
+
+    assert code == EXIT_INVALID
+    assert list(csv.reader(io.StringIO(output)))[:2] == [
+        ['row', 'line', 'field', 'code', 'message'],
+        ['4', '7', 'zipcode', 'Length', 'Length must be between 5 and 5.'],
+    ]
+
+
+def test_summary(tmp_path, rows, capsys):
+    path = write_csv(tmp_path / 'samples.csv', rows)
+
+    code, output = run(capsys, path)
+    lines = output.splitlines()
+
+    assert lines[0] == f'{path}: 30 rows, 3 with errors'
+    assert lines[1].split()[:3] == ['2', 'zipcode', 'Length']
+    assert lines[1].endswith('(rows 4, 20)')
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+@pytest.mark.parametrize('max_errors, n_rows', [(1, 5), (3, 22)])
+def test_max_errors(tmp_path, rows, capsys, max_errors, n_rows, workers):
+    path = write_csv(tmp_path / 'samples.csv', rows)
+
+    code, output = run(capsys, path, '--format', 'json', '--max-errors', max_errors,
+                       '--workers', workers)
+    report = json.loads(output)
+
+    assert code == EXIT_INVALID
+    assert len(report['errors']) == max_errors
+    assert report['errors'][0]['line'] == 7
+    assert report['rows'] == n_rows
+    assert report['truncated'] == (n_rows < 30)
+
+
+def test_jsonl(tmp_path, rows, capsys):
+    path = tmp_path / 'samples.jsonl'
+    path.write_text('\n'.join(json.dumps(row) for row in rows[:6]) + '\n\n')
+
+    code, output = run(capsys, path, '--format', 'json')
+
+    assert code == EXIT_INVALID
+    assert [(error['row'], error['line']) for error in json.loads(output)['errors']] == \
+        [(4, 5)]
+
+
+def test_csv_lines(tmp_path, rows, capsys):
+    rows[4]['pcr_target_ref'] = 'line one\nline two\r\nline three'
+    path = write_csv(tmp_path / 'samples.csv', rows[:8])
+
+    with open(path, 'a') as f:
+        f.write('\n\n')
+
+    write_csv(tmp_path / 'tail.csv', rows[20:22])
+
+    with open(path, 'a') as f, open(tmp_path / 'tail.csv') as tail:
+        f.write(''.join(tail.readlines()[1:]))
+
+    code, output = run(capsys, path, '--format', 'json', '--max-errors', 5)
+
+    # Row 3 spans two lines and row 4 three; two blank lines follow row 7
+    assert [(error['row'], error['line']) for error in json.loads(output)['errors']] == \
+        [(4, 7), (8, 15), (9, 16)]
+
+
+def test_cr_line_endings(tmp_path, rows, capsys):
+    rows[3]['pcr_target_ref'] = 'line one\rline two'
+    path = tmp_path / 'samples.csv'
+
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]), lineterminator='\r')
+        writer.writeheader()
+        writer.writerows(rows)
+
+    reports = []
+
+    for options in [[], ['--workers', 2], ['--checkpoint', tmp_path / 'checkpoint']]:
+        output = tmp_path / f'report{len(reports)}.json'
+        code, _ = run(capsys, path, '--format', 'json', '-o', output, *options)
+
+        assert code == EXIT_INVALID
+        reports.append(json.loads(output.read_text()))
+
+    assert reports[0] == reports[1] == reports[2]
+    assert reports[0]['rows'] == 30
+    assert [(error['row'], error['line']) for error in reports[0]['errors']] == \
+        [(4, 7), (20, 23), (21, 24)]
+
+
+def test_json_array(capsys):
+    path = os.path.join(os.path.dirname(__file__), 'fixtures', 'valid.json')
+
+    code, output = run(capsys, path)
+
+    assert code == EXIT_VALID
+    assert output == f'{path}: 3 rows, 0 with errors\n'
+
+
+def test_xlsx(tmp_path, rows, capsys):
+    header = list(rows[0])
+    path = write_workbook(tmp_path / 'samples.xlsx', {
+        'samples': [header] + [[row[name] or None for name in header] for row in rows]
+    })
+
+    code, output = run(capsys, path, '--format', 'json', '--sheet', 'samples')
+
+    assert code == EXIT_INVALID
+    assert [error['row'] for error in json.loads(output)['errors']] == [4, 20, 21]
+
+
+def test_output_file(tmp_path, rows, capsys):
+    path = write_csv(tmp_path / 'samples.csv', rows)
+    report = tmp_path / 'report.csv'
+
+    code, output = run(capsys, path, '--format', 'csv', '--output', report)
+
+    assert (code, output) == (EXIT_INVALID, '')
+    assert report.read_text().startswith('row,line,field,code,message')
+
+
+@pytest.mark.parametrize('name, content', [
+    ('missing.csv', None),
+    ('bad.jsonl', '{"sample_id": \n'),
+    ('bad.xlsx', 'not a zip file'),
+])
+def test_unreadable(tmp_path, capsys, name, content):
+    path = tmp_path / name
+
+    if content is not None:
+        path.write_text(content)
+
+    assert main(['validate', str(path)]) == EXIT_INPUT
+    assert 'cannot read' in capsys.readouterr().err
+
+
+@pytest.mark.parametrize('output', ['directory', '/dev/full'])
+def test_unwritable(tmp_path, rows, capsys, output):
+    path = write_csv(tmp_path / 'samples.csv', rows)
+
+    if output == 'directory':
+        output = tmp_path
+    elif not os.path.exists(output):
+        pytest.skip(f'No {output}')
+
+    assert main(['validate', str(path), '--output', str(output)]) == EXIT_OUTPUT
+    assert 'cannot write the report' in capsys.readouterr().err
+
+
+def test_broken_pipe(tmp_path, rows):
+    path = write_csv(tmp_path / 'samples.csv', rows * 200)
+
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'nwss', 'validate', str(path), '--format', 'csv'],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    process.stdout.read(10)
+    process.stdout.close()
+
+    assert process.wait() == EXIT_OUTPUT
+    assert process.stderr.read() == b''
+
+
+def test_unexpected_error(tmp_path, rows, capsys, monkeypatch):
+    path = write_csv(tmp_path / 'samples.csv', rows)
+
+    def validate_path(*args, **kwargs):
+        raise RuntimeError('boom')
+
+    monkeypatch.setattr(nwss.cli, 'validate_path', validate_path)
+
+    assert main(['validate', str(path)]) == EXIT_ERROR
+    assert 'RuntimeError: boom' in capsys.readouterr().err
+
+
+def test_usage(capsys):
+    with pytest.raises(SystemExit) as error:
+        main(['validate', 'samples.csv', '--format', 'xml'])
+
+    assert error.value.code == EXIT_USAGE
+
+
+def test_stdin(tmp_path, rows):
+    path = write_csv(tmp_path / 'samples.csv', rows)
+
+    with open(path, 'rb') as f:
+        result = subprocess.run(
+            [sys.executable, '-m', 'nwss', 'validate', '-', '--format', 'json'],
+            stdin=f,
+            stdout=subprocess.PIPE,
+        )
+
+    assert result.returncode == EXIT_INVALID
+    assert json.loads(result.stdout)['invalid_rows'] == 3
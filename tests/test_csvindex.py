@@ -0,0 +1,189 @@
+import csv
+
+import pytest
+
+from nwss.csvindex import IndexedCSV, scan_block
+from nwss.schemas import WaterSampleSchema
+
+
+@pytest.fixture
+def quoted_file(tmp_path):
+    path = tmp_path / 'quoted.csv'
+    path.write_bytes(
+        b'\xef\xbb\xbfa,b\r\n1,"x\ny"\r\n\r\n2,z\n3,"q""\n"\n4'
+    )
+    return path
+
+
+def test_rows_match_dict_reader(quoted_file):
+    with open(quoted_file, newline='', encoding='utf-8-sig') as f:
+        expected = list(csv.DictReader(f))
+
+    with IndexedCSV(quoted_file) as f:
+        assert list(f.rows()) == expected
+        assert len(f) == len(expected)
+
+
+def test_raw_and_line(quoted_file):
+    with IndexedCSV(quoted_file) as f:
+        assert [(f.line(row), f.raw(row)) for row in range(len(f))] == [
+            (2, '1,"x\ny"'),
+            (5, '2,z'),
+            (6, '3,"q""\n"'),
+            (8, '4'),
+        ]
+
+        # Random access back to earlier rows
+        assert f.raw(0) == '1,"x\ny"'
+
+        with pytest.raises(IndexError):
+            f.raw(4)
+
+
+def test_rows_are_indexed_as_read(quoted_file):
+    with IndexedCSV(quoted_file) as f:
+        def scan_block():
+            raise AssertionError('rows were scanned a second time')
+
+        f._scan_block = scan_block
+        rows = list(f.rows())
+
+        assert len(f) == len(rows) == 4
+        assert [f.line(row) for row in range(4)] == [2, 5, 6, 8]
+        assert f.raw(2) == '3,"q""\n"'
+
+
+def test_look_ahead_while_reading(quoted_file):
+    with open(quoted_file, newline='', encoding='utf-8-sig') as f:
+        expected = list(csv.DictReader(f))
+
+    with IndexedCSV(quoted_file) as f:
+        rows = f.rows()
+        first = next(rows)
+
+        # Scans ahead of the rows read so far
+        assert f.line(2) == 6
+
+        assert [first, *rows] == expected
+        assert [f.line(row) for row in range(len(f))] == [2, 5, 6, 8]
+
+
+def test_short_and_long_rows(tmp_path):
+    path = tmp_path / 'ragged.csv'
+    path.write_bytes(b'a,b,c\n1\n1,2,3,4,5\n\n1,2\n')
+
+    with open(path, newline='') as f:
+        expected = list(csv.DictReader(f))
+
+    with IndexedCSV(path) as f:
+        assert list(f.rows()) == expected
+        assert [f.line(row) for row in range(len(f))] == [2, 3, 5]
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / 'empty.csv'
+    path.write_bytes(b'')
+
+    with IndexedCSV(path) as f:
+        assert list(f.rows()) == []
+        assert len(f) == 0
+
+
+def test_report(tmp_path, valid_data):
+    rows = [dict(row) for row in valid_data]
+    rows[0]['pcr_target_ref'] = 'line one\nline two'
+    rows[1]['zipcode'] = '1234'
+
+    path = tmp_path / 'samples.csv'
+
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+    schema = WaterSampleSchema()
+
+    with IndexedCSV(path) as f:
+        errors = {
+            index: messages
+            for index, _, messages in schema.load_iter(f.rows())
+            if messages
+        }
+
+        (row, line, raw, messages), = f.report(errors)
+
+    assert (row, line) == (1, 4)
+    assert next(csv.reader([raw])) == list(rows[1].values())
+    assert list(messages) == ['zipcode']
+
+
+def test_stray_quote(tmp_path):
+    # An odd number of quotes that doesn't open a quoted field
+    path = tmp_path / 'stray.csv'
+    path.write_bytes(b'a,b\n1,"x"y"\n2,z\n3,"p\n""q"\n')
+
+    with open(path, newline='') as f:
+        expected = list(csv.DictReader(f))
+
+    with IndexedCSV(path) as f:
+        assert list(f.rows()) == expected
+        assert [f.line(row) for row in range(len(f))] == [2, 3, 4]
+        assert f.raw(0) == '1,"x"y"'
+
+
+def test_start_from_position(quoted_file):
+    with IndexedCSV(quoted_file) as f:
+        position = f.position(1)
+        expected = list(f.rows())[1:]
+        lines = [f.line(row) for row in range(1, len(f))]
+
+    assert position == (19, 1, 5)
+
+    with IndexedCSV(quoted_file, start=position) as f:
+        assert list(f.rows()) == expected
+        assert len(f) == 4
+        assert [f.line(row) for row in range(1, len(f))] == lines
+        assert f.raw(2) == '3,"q""\n"'
+
+        with pytest.raises(IndexError):
+            f.raw(0)
+
+
+def test_quotes_inside_unquoted_fields(tmp_path):
+    # A quote inside an unquoted field is a literal, even with an even
+    # number of quotes on the line
+    path = tmp_path / 'pipes.csv'
+    path.write_bytes(b'h1,h2\n12" pipe,"two\nlines"\nnext,row\n3" "x",y\n')
+
+    with open(path, newline='') as f:
+        expected = list(csv.DictReader(f))
+
+    with IndexedCSV(path) as f:
+        assert list(f.rows()) == expected
+        assert len(f) == 3
+        assert [f.line(row) for row in range(3)] == [2, 4, 5]
+        assert f.raw(0) == '12" pipe,"two\nlines"'
+
+
+@pytest.mark.parametrize('newline', [b'\n', b'\r\n', b'\r'])
+@pytest.mark.parametrize('block_size', [1, 2, 5, 1024])
+def test_line_endings(tmp_path, newline, block_size):
+    lines = [b'a,b', b'1,"x', b'y"', b'', b'2,z', b'3,w']
+    buffer = newline.join(lines) + newline
+    starts = [sum(len(text + newline) for text in lines[:i]) for i in range(len(lines))]
+
+    pos, line, records = 0, 1, []
+
+    while pos < len(buffer):
+        found, pos, line = scan_block(buffer, pos, line, block_size)
+        records.extend(found)
+
+    assert records == [(starts[i], i + 1) for i in (0, 1, 4, 5)]
+
+    path = tmp_path / 'samples.csv'
+    path.write_bytes(buffer)
+
+    with IndexedCSV(path) as f:
+        assert list(f.rows()) == [{'a': '1', 'b': 'x' + newline.decode() + 'y'},
+                                  {'a': '2', 'b': 'z'}, {'a': '3', 'b': 'w'}]
+        assert [f.line(row) for row in range(len(f))] == [2, 5, 6]
@@ -0,0 +1,69 @@
+import pytest
+
+from nwss.batch import ColumnarValidator, rows_to_columns
+from nwss.duplicates import DuplicateFinder
+from nwss.errors import ErrorRecords, GroupedErrors
+from nwss.schemas import WaterSampleSchema
+
+
+KEYS = ['a', 'b', 'a', 'c', 'b', 'a', None, None, 'd']
+
+
+@pytest.mark.parametrize('max_keys', [1, 2, 1000000])
+def test_duplicates(tmp_path, max_keys):
+    with DuplicateFinder(max_keys=max_keys, partitions=3, directory=tmp_path) as finder:
+        for row, sample_id in enumerate(KEYS):
+            finder.add(row, {'sample_id': sample_id, 'lab_id': 'lab', 'pcr_target': 'n1'})
+
+        assert finder.duplicates() == [
+            (('a', 'lab', 'n1'), [0, 2, 5]),
+            (('b', 'lab', 'n1'), [1, 4]),
+        ]
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_add_columns(valid_data):
+    rows = [dict(row) for row in valid_data] * 2
+    data, _ = ColumnarValidator().validate(rows_to_columns(rows))
+
+    finder = DuplicateFinder()
+    finder.add_columns(data, start=10)
+
+    n_rows = len(valid_data)
+
+    assert [rows for _, rows in finder.duplicates()] == \
+        [[10 + row, 10 + n_rows + row] for row in range(n_rows)]
+
+
+def test_key_is_deserialized(valid_data):
+    schema = WaterSampleSchema()
+    finder = DuplicateFinder()
+
+    rows = [dict(valid_data[0]), dict(valid_data[0])]
+    rows[1]['pcr_target'] = rows[1]['pcr_target'].upper()
+
+    for index, data, errors in schema.load_iter(rows):
+        finder.add(index, data)
+
+    assert [rows for _, rows in finder.duplicates()] == [[0, 1]]
+
+
+def test_add_errors():
+    finder = DuplicateFinder()
+
+    for row, sample_id in enumerate(KEYS):
+        finder.add(row, {'sample_id': sample_id, 'lab_id': 'lab', 'pcr_target': 'n1'})
+
+    records = ErrorRecords()
+    finder.add_errors(records)
+
+    assert [(row, code) for row, _, code, _ in records] == \
+        [(0, 'duplicate'), (1, 'duplicate'), (2, 'duplicate'),
+         (4, 'duplicate'), (5, 'duplicate')]
+
+    grouped = GroupedErrors()
+    finder.add_errors(grouped)
+
+    group, = grouped.report()
+    assert (group['code'], group['count']) == ('duplicate', 5)
@@ -0,0 +1,98 @@
+import json
+
+import pytest
+
+from nwss.batch import ColumnarValidator, rows_to_columns
+from nwss.errors import GroupedErrors, RowSet
+
+
+@pytest.mark.parametrize('rows', [
+    [0, 1, 2, 5, 6, 9],
+    [9, 5, 0, 6, 2, 1],
+    [3, 1, 2, 2, 0, 3],
+])
+def test_row_set(rows):
+    row_set = RowSet()
+
+    for row in rows:
+        row_set.add(row)
+
+    assert list(row_set) == sorted(set(rows))
+    assert len(row_set) == len(set(rows))
+    assert all(row in row_set for row in rows)
+    assert 4 not in row_set
+
+
+def test_grouped_errors(valid_data):
+    rows = []
+
+    for i in range(100):
+        row = dict(valid_data[i % len(valid_data)])
+
+        if i >= 10:
+            row['zipcode'] = '123'
+        if i % 2:
+            row['sample_location'] = 'upstream'
+            row['sample_location_specify'] = ''
+
+        rows.append(row)
+
+    errors = GroupedErrors(examples=3)
+    ColumnarValidator().validate(rows_to_columns(rows), errors=errors)
+
+    report = {(group['field'], group['code']): group for group in errors.report()}
+
+    assert set(report) == {
+        ('zipcode', 'Length'),
+        ('_schema', 'sample_location_specify_required'),
+    }
+
+    zipcode = report['zipcode', 'Length']
+    assert zipcode['count'] == 90
+    assert zipcode['examples'] == [10, 11, 12]
+    assert zipcode['rows'] == [[10, 100]]
+
+    # Cross-field rules only run for rows without field errors
+    rule = report['_schema', 'sample_location_specify_required']
+    assert rule['rows'] == [[1, 2], [3, 4], [5, 6], [7, 8], [9, 10]]
+
+    restored = GroupedErrors.from_dict(json.loads(json.dumps(errors.to_dict())))
+
+    assert restored.report() == errors.report()
+
+    # Rows carry on from where they were
+    restored.add(100, 'zipcode', ['Length must be between 5 and 5.'])
+    assert restored.report()[0]['rows'] == [[10, 101]]
+    assert restored.report()[0]['examples'] == [10, 11, 12]
+
+
+@pytest.mark.parametrize('input, code', [
+    ({'reporting_jurisdiction': 'XX'}, 'CaseInsensitiveOneOf'),
+    ({'lab_id': ''}, 'null'),
+    ({'population_served': 'many'}, 'invalid'),
+    ({'sample_collect_date': '2999-01-01'}, 'validate_sample_collect_date'),
+    ({'unexpected_column': 'value'}, 'unknown'),
+])
+def test_error_codes(valid_data, input, code):
+    row = dict(valid_data[0])
+    row.update(input)
+
+    errors = GroupedErrors()
+    ColumnarValidator().validate(rows_to_columns([row]), errors=errors)
+
+    assert [(group.field, group.code) for group in errors.groups.values()] == \
+        [(list(input)[0], code)]
+
+
+def test_merge():
+    first, second = GroupedErrors(examples=2), GroupedErrors(examples=2)
+    first.add(0, '_schema', ['Invalid.'])
+    second.add(0, '_schema', ['Invalid.'])
+    second.add(1, '_schema', ['Invalid.'])
+
+    first.merge(second, offset=1)
+
+    group, = first.groups.values()
+    assert group.count == 3
+    assert group.examples == [0, 1]
+    assert group.rows.runs == [[0, 3]]
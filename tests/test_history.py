@@ -0,0 +1,36 @@
+import pytest
+
+from nwss.history import CONFLICT, IDENTICAL, NEW, SampleHistory
+from nwss.schemas import WaterSampleSchema
+
+
+@pytest.fixture
+def loaded_data(valid_data):
+    schema = WaterSampleSchema()
+    return [data for _, data, _ in schema.load_iter(valid_data)]
+
+
+@pytest.mark.parametrize('batch_size', [1, 2, 10000])
+def test_classify(tmp_path, loaded_data, batch_size):
+    path = tmp_path / 'history.sqlite'
+
+    with SampleHistory(path, batch_size=batch_size) as history:
+        assert list(history.classify(loaded_data)) == [NEW] * len(loaded_data)
+
+        history.add(loaded_data[:2], source='first.csv')
+
+    changed = dict(loaded_data[1], capacity_mgd=loaded_data[1]['capacity_mgd'] + 1)
+    missing_key = dict(loaded_data[2], sample_id=None)
+
+    rows = [dict(loaded_data[0]), changed, missing_key] + loaded_data[2:]
+
+    # Reopen to check the index persists
+    with SampleHistory(path, batch_size=batch_size) as history:
+        assert len(history) == 2
+        assert list(history.classify(rows)) == \
+            [IDENTICAL, CONFLICT, None] + [NEW] * (len(loaded_data) - 2)
+
+        history.add([changed])
+
+        assert len(history) == 2
+        assert list(history.classify(loaded_data[:2])) == [IDENTICAL, CONFLICT]
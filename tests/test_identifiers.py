@@ -0,0 +1,80 @@
+import pickle
+
+from marshmallow import fields, validate
+import pytest
+
+from nwss.batch import ColumnarValidator, rows_to_columns
+from nwss.identifiers import IDENTIFIER_FIELDS, IdentifierCheck, identifier_checks
+from nwss.schemas import WaterSampleSchema
+
+
+VALUES = [
+    'sample-1', 'lab_1', 'CA1234567', 'ca12345678', 'UTC-05:00', 'utc-5',
+    '12345', '1234', '123456', '', ' 12345', 'x' * 21, 'not valid!', None, 12345,
+]
+
+
+def test_identifier_checks():
+    checks = identifier_checks(WaterSampleSchema())
+
+    assert set(checks) == set(IDENTIFIER_FIELDS)
+
+
+@pytest.mark.parametrize('name', IDENTIFIER_FIELDS)
+@pytest.mark.parametrize('value', VALUES)
+def test_check_agrees_with_field(name, value):
+    schema = WaterSampleSchema()
+    field = schema.load_fields[name]
+    check = IdentifierCheck.for_field(field)
+
+    try:
+        accepted = field.deserialize(value) == value and value is not None
+    except Exception:
+        accepted = False
+
+    # The check may turn down valid values, which the field then checks,
+    # but must never accept a value the field rejects
+    if check(value):
+        assert accepted
+    if value != '':
+        assert check(value) == accepted
+
+
+def test_unsupported_validators():
+    field = fields.String(validate=validate.OneOf(['a']))
+
+    assert IdentifierCheck.for_field(field) is None
+    assert IdentifierCheck.for_field(fields.Int()) is None
+
+
+def test_pickle():
+    check = IdentifierCheck.for_field(WaterSampleSchema().load_fields['zipcode'])
+    check = pickle.loads(pickle.dumps(check))
+
+    assert check('12345')
+    assert not check('1234')
+
+
+@pytest.mark.parametrize('trim', [False, True])
+def test_matches_schema(valid_data, trim):
+    rows = [dict(row) for row in valid_data]
+
+    for index, value in enumerate(VALUES):
+        row = dict(valid_data[index % len(valid_data)])
+        row.update(dict.fromkeys(IDENTIFIER_FIELDS, value))
+        rows.append(row)
+
+    schema = WaterSampleSchema()
+    schema.trim_whitespace = trim
+
+    expected = {}
+
+    for index, row in enumerate(rows):
+        try:
+            schema.load(row)
+        except Exception as e:
+            expected[index] = e.messages
+
+    data, errors = ColumnarValidator(schema).validate(rows_to_columns(rows))
+
+    assert errors == expected
@@ -0,0 +1,27 @@
+import subprocess
+import sys
+
+import nwss
+
+
+def test_import_is_lazy():
+    code = (
+        'import sys, nwss, nwss.dump_to_jsonschema; '
+        'nwss.CDC_VERSION; '
+        'print("marshmallow" in sys.modules)'
+    )
+
+    output = subprocess.run(
+        [sys.executable, '-c', code],
+        check=True,
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+    ).stdout
+
+    assert output.strip() == 'False'
+
+
+def test_lazy_schema():
+    from nwss.schemas import WaterSampleSchema
+
+    assert nwss.WaterSampleSchema is WaterSampleSchema
@@ -0,0 +1,36 @@
+import json
+import sys
+
+from nwss.dump_to_jsonschema import (build_schema, read_artifact, source_hash,
+                                     write_artifact)
+
+
+def test_artifact_round_trip(tmp_path):
+    path = tmp_path / 'jsonschema.json'
+    write_artifact(path)
+
+    assert read_artifact(path) == json.loads(json.dumps(build_schema()))
+
+
+def test_stale_artifact(tmp_path):
+    path = tmp_path / 'jsonschema.json'
+    write_artifact(path)
+
+    artifact = json.loads(path.read_text())
+    artifact['source_hash'] = 'stale'
+    path.write_text(json.dumps(artifact))
+
+    assert read_artifact(path) is None
+
+
+def test_missing_artifact(tmp_path):
+    assert read_artifact(tmp_path / 'jsonschema.json') is None
+
+
+def test_source_hash_without_importlib_resources(monkeypatch):
+    expected = source_hash()
+
+    # As on Python 3.6, which has no importlib.resources
+    monkeypatch.setitem(sys.modules, 'importlib.resources', None)
+
+    assert source_hash() == expected
@@ -0,0 +1,123 @@
+import io
+
+import pytest
+
+from nwss.batch import ColumnarValidator, rows_to_columns
+
+pd = pytest.importorskip('pandas')
+nwss_pandas = pytest.importorskip('nwss.pandas')
+
+
+def error_messages(errors):
+    '''
+    Convert the long-form errors back to {row: {field: [messages]}}.
+    '''
+    messages = {}
+
+    for row, field, code, message in errors.itertuples(index=False):
+        messages.setdefault(row, {}).setdefault(field, []).append(message)
+
+    return messages
+
+
+@pytest.mark.parametrize(
+    'input',
+    [
+        {'reporting_jurisdiction': 'ca'},
+        {'reporting_jurisdiction': 'CAA'},
+        {'zipcode': '1234'},
+        {'population_served': '-1'},
+        {'population_served': '1.5'},
+        {'capacity_mgd': ''},
+        {'capacity_mgd': '-1'},
+        {'capacity_mgd': 'nan'},
+        {'epaid': 'CA1123'},
+        {'sample_location': 'upstream', 'sample_location_specify': ''},
+        {'inhibition_detect': 'not tested', 'inhibition_method': 'pcr'},
+        {'sample_collect_date': '2999-01-01'},
+        {'sample_collect_time': '25:58:00'},
+        {'sample_id': 'not a valid sample id'},
+        {'lab_id': ''},
+        {'unexpected_column': 'value'},
+    ]
+)
+def test_matches_columnar(valid_data, input):
+    rows = [dict(row) for row in valid_data]
+    rows[1].update(input)
+
+    for row in rows:
+        row.setdefault('unexpected_column', '')
+
+    expected_data, expected_errors = ColumnarValidator().validate(rows_to_columns(rows))
+
+    valid, errors = nwss_pandas.validate_frame(pd.DataFrame(rows))
+
+    assert error_messages(errors) == expected_errors
+    assert valid.tolist() == [index not in expected_errors for index in range(len(rows))]
+
+
+def test_data(valid_data):
+    expected_data, _ = ColumnarValidator().validate(rows_to_columns(valid_data))
+
+    data, errors = nwss_pandas.FrameValidator().validate(pd.DataFrame(valid_data))
+
+    assert errors == {}
+    assert {name: list(values) for name, values in data.items()} == expected_data
+
+
+def test_read_csv(valid_data):
+    frame = pd.DataFrame(valid_data)
+    frame.loc[0, 'zipcode'] = '123'
+
+    # read_csv reads empty cells as NaN and numbers as numbers
+    frame = pd.read_csv(io.StringIO(frame.to_csv(index=False)), dtype={'zipcode': str})
+    frame.index = ['a', 'b', 'c'][:len(frame)]
+
+    valid, errors = nwss_pandas.validate_frame(frame)
+
+    assert valid.index.equals(frame.index)
+    assert not valid['a']
+    assert errors[['row', 'field', 'code']].values.tolist() == \
+        [['a', 'zipcode', 'Length']]
+
+
+def test_parse_dates(valid_data):
+    frame = pd.DataFrame(valid_data)
+    frame.loc[1, 'sample_collect_date'] = '2999-01-01'
+    frame.loc[2, 'test_result_date'] = ''
+
+    frame = pd.read_csv(io.StringIO(frame.to_csv(index=False)), dtype={'zipcode': str},
+                        parse_dates=['sample_collect_date', 'test_result_date'])
+    assert frame['sample_collect_date'].dtype.kind == 'M'
+
+    valid, errors = nwss_pandas.validate_frame(frame)
+
+    assert valid.tolist() == [True, False, False]
+    assert errors[['row', 'field', 'code']].values.tolist() == [
+        [1, 'sample_collect_date', 'validate_sample_collect_date'],
+        [2, 'test_result_date', 'null'],
+    ]
+
+    # Dates as objects, as .dt.date gives them
+    frame['sample_collect_date'] = frame['sample_collect_date'].dt.date
+    frame['test_result_date'] = frame['test_result_date'].dt.date
+
+    assert nwss_pandas.validate_frame(frame)[0].tolist() == valid.tolist()
+
+
+def test_trim_whitespace(valid_data):
+    rows = [dict(row) for row in valid_data]
+    rows[0]['zipcode'] = ' 12345 '
+    rows[1]['zipcode'] = ' 1234 '
+
+    schema = nwss_pandas.FrameValidator().schema
+    schema.trim_whitespace = True
+
+    expected_data, expected_errors = ColumnarValidator(schema).validate(
+        rows_to_columns(rows)
+    )
+    data, errors = nwss_pandas.FrameValidator(schema).validate(pd.DataFrame(rows))
+
+    assert list(expected_errors) == [1]
+    assert errors == expected_errors
+    assert list(data['zipcode']) == expected_data['zipcode']
@@ -0,0 +1,111 @@
+import csv
+
+from marshmallow import ValidationError
+import pytest
+
+from nwss.parallel import record_starts, shard_file, validate_file
+from nwss.schemas import WaterSampleSchema
+
+
+@pytest.fixture
+def sample_file(tmp_path, valid_data, invalid_data):
+    rows = []
+
+    for i in range(60):
+        row = dict(valid_data[i % len(valid_data)])
+        row['sample_id'] = f'sample-{i}'
+
+        if i % 7 == 0:
+            # Quoted newlines must not be mistaken for record boundaries
+            row['pcr_target_ref'] = 'line one\nline "two"\n'
+        if i % 11 == 0:
+            row['zipcode'] = '1234'
+
+        rows.append(row)
+
+    rows.extend(dict(row) for row in invalid_data)
+
+    path = tmp_path / 'samples.csv'
+
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(valid_data[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+    return path
+
+
+def expected_errors(path):
+    schema = WaterSampleSchema()
+    errors = {}
+
+    with open(path, newline='') as f:
+        for index, row in enumerate(csv.DictReader(f)):
+            try:
+                schema.load(row)
+            except ValidationError as e:
+                errors[index] = e.messages
+
+    return index + 1, errors
+
+
+@pytest.mark.parametrize('block_size', [2, 5, 1024])
+def test_record_starts(tmp_path, block_size):
+    path = tmp_path / 'quoted.csv'
+    path.write_bytes(b'a,b\n1,"x\ny"\n2,z\n')
+
+    assert record_starts(path, [0, 4, 7, 13, 20], block_size=block_size) == \
+        [4, 12, 12, 16, 16]
+
+
+def test_stray_quote(tmp_path, valid_data):
+    rows = []
+
+    for i in range(400):
+        row = dict(valid_data[i % len(valid_data)])
+        row['sample_id'] = '5"x' if i == 3 else f'sample-{i}'
+
+        if i > 100 and i % 9 == 0:
+            row['pcr_target_ref'] = 'line one\nline two'
+
+        rows.append(row)
+
+    path = tmp_path / 'stray.csv'
+
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(valid_data[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+    # The stray quote doesn't put the file out of step
+    assert len(shard_file(path, 16)[1]) == 16
+    assert validate_file(path, workers=4, chunk_size=50) == \
+        validate_file(path, workers=1) == expected_errors(path)
+
+
+def test_shards_cover_file(sample_file):
+    header, ranges = shard_file(sample_file, 8)
+
+    assert header[0] == 'reporting_jurisdiction'
+    assert all(end == start for (_, end), (start, _) in zip(ranges, ranges[1:]))
+    assert ranges[-1][1] == sample_file.stat().st_size
+
+
+@pytest.mark.parametrize('workers', [1, 3])
+def test_validate_file(sample_file, workers):
+    assert validate_file(sample_file, workers=workers, chunk_size=5) == \
+        expected_errors(sample_file)
+
+
+def test_validate_file_grouped(sample_file):
+    n_rows, errors = validate_file(sample_file, workers=3, chunk_size=5)
+    grouped_rows, grouped = validate_file(
+        sample_file, workers=3, chunk_size=5, grouped=True
+    )
+
+    assert grouped_rows == n_rows
+
+    zipcode = grouped.groups['zipcode', 'Length']
+    assert list(zipcode.rows) == [i for i in range(60) if i % 11 == 0]
+    assert sum(group.count for group in grouped.groups.values()) == \
+        sum(len(messages) for row in errors.values() for messages in row.values())
@@ -0,0 +1,83 @@
+import threading
+
+from nwss.batch import ColumnarValidator, rows_to_columns
+from nwss.errors import ErrorCodes
+from nwss.profiling import Profile, instrument
+from nwss.schemas import WaterSampleSchema
+from nwss.utils import ValidationContext
+
+
+def stats(profile):
+    return {(stat['kind'], stat['name']): stat for stat in profile.report()}
+
+
+def test_profile_load(valid_data):
+    schema = WaterSampleSchema(many=True)
+    profile = Profile()
+
+    schema.load(valid_data, validation_context=ValidationContext(profile=profile))
+
+    report = stats(profile)
+    n_rows = len(valid_data)
+
+    assert report['field', 'sample_id']['calls'] == n_rows
+    assert report['validator', 'sample_id.Regexp']['calls'] == n_rows
+    assert report['validator', 'reporting_jurisdiction.CaseInsensitiveOneOf']
+    assert report['hook', 'cast_to_none']['calls'] == n_rows
+    assert report['hook', 'validate_rules']['calls'] == n_rows
+    assert report['hook', 'validate_sample_collect_date']['calls'] == n_rows
+
+    rule = schema.cross_field_rules[0]
+    assert report['rule', rule.message]['calls'] == n_rows
+
+    assert all(stat['seconds'] >= 0 for stat in report.values())
+
+
+def test_profile_restores_schema(valid_data):
+    schema = WaterSampleSchema(many=True)
+    expected = schema.load(valid_data)
+
+    schema.load(valid_data, validation_context=ValidationContext(profile=Profile()))
+
+    field = schema.fields['sample_id']
+    assert 'deserialize' not in vars(field)
+    assert 'cast_to_none' not in vars(schema)
+    assert schema.load(valid_data) == expected
+
+
+def test_profile_columns(valid_data):
+    profile = Profile()
+    context = ValidationContext(profile=profile)
+
+    ColumnarValidator().validate(rows_to_columns(valid_data), context)
+
+    report = stats(profile)
+
+    assert report['field', 'sample_id']['calls'] == len(valid_data)
+    assert any(kind == 'rule' for kind, name in report)
+
+
+def test_overlapping_profiles(valid_data):
+    schema = WaterSampleSchema(many=True)
+    expected = schema.load(valid_data)
+    first, second = Profile(), Profile()
+
+    with instrument(schema, first):
+        # A profiled load in another thread while this one is instrumented
+        thread = threading.Thread(target=schema.load, args=(valid_data,), kwargs={
+            'validation_context': ValidationContext(profile=second)
+        })
+        thread.start()
+        thread.join()
+
+        # The schema is still instrumented, timing into this thread's profile
+        assert 'deserialize' in vars(schema.fields['sample_id'])
+        assert stats(first)['field', 'sample_id']['calls'] == 0
+        assert ErrorCodes(schema)('zipcode', 'Length must be between 5 and 5.') == \
+            'Length'
+
+        assert schema.load(valid_data) == expected
+
+    assert stats(first)['field', 'sample_id']['calls'] == len(valid_data)
+    assert stats(second)['field', 'sample_id']['calls'] == len(valid_data)
+    assert 'deserialize' not in vars(schema.fields['sample_id'])
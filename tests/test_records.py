@@ -0,0 +1,72 @@
+import datetime
+
+from marshmallow import INCLUDE
+import pytest
+
+from nwss.records import RecordTable, load_table
+from nwss.schemas import WaterSampleSchema
+
+
+def test_load_table(valid_data, invalid_data):
+    schema = WaterSampleSchema()
+    rows = valid_data + invalid_data
+
+    expected = list(schema.load_iter(rows))
+
+    table, errors = load_table(rows)
+
+    assert len(table) == len(rows)
+    assert [dict(record) for record in table] == [data for _, data, _ in expected]
+    assert list(table) == [data for _, data, _ in expected]
+    assert errors == {index: messages for index, _, messages in expected if messages}
+
+
+def test_columns(valid_data):
+    table, _ = load_table(valid_data)
+
+    assert table.columns['capacity_mgd'].values.typecode == 'd'
+    assert table.columns['population_served'].values.typecode == 'q'
+    assert table.columns['pcr_target'].values.typecode == 'H'
+    assert table.columns['sample_collect_date'].values.typecode == 'i'
+    assert isinstance(table[0]['sample_collect_date'], datetime.date)
+    assert table[-1] == table[len(valid_data) - 1]
+
+    with pytest.raises(IndexError):
+        table[len(valid_data)]
+
+
+def test_missing_and_none():
+    table = RecordTable()
+    table.append({'capacity_mgd': 1.5, 'sample_collect_time': datetime.time(12, 30, 1)})
+    table.append({'capacity_mgd': None, 'pcr_target': 'sars-cov-2'})
+
+    first, second = table
+
+    assert dict(first) == {
+        'capacity_mgd': 1.5,
+        'sample_collect_time': datetime.time(12, 30, 1),
+    }
+    assert dict(second) == {'capacity_mgd': None, 'pcr_target': 'sars-cov-2'}
+
+    with pytest.raises(KeyError):
+        first['pcr_target']
+
+
+def test_untyped_values():
+    table = RecordTable()
+    table.append({'population_served': 1})
+    table.append({'population_served': 2 ** 70, 'pcr_target': 'not allowed'})
+
+    assert [record['population_served'] for record in table] == [1, 2 ** 70]
+    assert table[1]['pcr_target'] == 'not allowed'
+
+
+def test_unknown_fields(valid_data):
+    schema = WaterSampleSchema(unknown=INCLUDE)
+    rows = [dict(row) for row in valid_data]
+    rows[1]['extra'] = 'value'
+
+    table, _ = load_table(rows, schema)
+
+    assert [record.get('extra', 'absent') for record in table][:3] == \
+        ['absent', 'value', 'absent']
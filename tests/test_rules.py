@@ -0,0 +1,121 @@
+import datetime
+
+import jsonschema
+import pytest
+
+from nwss import rules
+from nwss.utils import ValidationContext
+
+
+SAMPLES = [
+    {'county_names': None, 'other_jurisdiction': ['Calabasas']},
+    {'county_names': None, 'other_jurisdiction': None},
+    {'sample_location': 'upstream', 'sample_location_specify': None},
+    {'sample_location': 'upstream', 'sample_location_specify': 'details'},
+    {'rec_eff_percent': -1},
+    {'rec_eff_percent': -1.0},
+    {'rec_eff_percent': 50, 'rec_eff_target_name': 'oc43'},
+    {'hum_frac_mic_conc': 1.5, 'hum_frac_mic_unit': 'copies/L wastewater'},
+    {'hum_frac_mic_conc': 0.0, 'hum_frac_mic_unit': 'copies/L wastewater'},
+    {'sample_location': 'upstream', 'sample_location_specify': '0'},
+    {'inhibition_detect': 'not tested', 'inhibition_method': 'none'},
+    {'inhibition_detect': 'not tested', 'inhibition_method': 'pcr'},
+    {'sars_cov2_units': 'copies/L wastewater', 'flow_rate': None},
+    {'sample_matrix': 'raw wastewater', 'flow_rate': 0},
+    {'sample_matrix': 'raw wastewater', 'flow_rate': 12},
+    {
+        'sample_collect_date': datetime.date(2021, 5, 2),
+        'test_result_date': datetime.date(2021, 5, 1),
+    },
+    {'test_result_date': datetime.date(2999, 1, 1)},
+]
+
+
+@pytest.mark.parametrize('rule', rules.RULES, ids=lambda rule: rule.message[:30])
+def test_columns_match_rows(rule):
+    columns = {
+        key: [sample.get(key) for sample in SAMPLES]
+        for key in {key for sample in SAMPLES for key in sample}
+    }
+
+    context = ValidationContext()
+
+    assert rule.failing_rows(columns, len(SAMPLES), context) == [
+        index for index, sample in enumerate(SAMPLES) if rule.fails(sample, context)
+    ]
+
+
+# Rules that can be expressed in JSON schema
+JSON_RULES = [rule for rule in rules.RULES if rule.json() is not None]
+
+
+def as_text(sample):
+    '''
+    Return ``sample`` as the web validator reads it from a spreadsheet: every
+    value as text, and empty cells left out.
+    '''
+    text = {}
+
+    for key, value in sample.items():
+        if value is None or value == '':
+            continue
+        if isinstance(value, list):
+            value = ','.join(value)
+        elif isinstance(value, datetime.date):
+            value = value.isoformat()
+
+        text[key] = str(value)
+
+    return text
+
+
+@pytest.mark.parametrize('rule', JSON_RULES, ids=lambda rule: rule.message[:30])
+@pytest.mark.parametrize('sample', SAMPLES)
+@pytest.mark.parametrize('text', [False, True], ids=['json', 'text'])
+def test_json_matches_python(rule, sample, text):
+    fails = rule.fails(sample, ValidationContext())
+
+    if text:
+        sample = as_text(sample)
+    else:
+        # JSON documents have strings where the Python rules see lists
+        sample = {
+            key: ','.join(value) if isinstance(value, list) else value
+            for key, value in sample.items()
+        }
+
+    assert jsonschema.Draft7Validator(rule.json()).is_valid(sample) != fails
+
+
+def test_json_accepts_valid_spreadsheet(valid_data):
+    validator = jsonschema.Draft7Validator({'allOf': rules.json_schema()})
+
+    for row in valid_data:
+        assert list(validator.iter_errors(as_text(row))) == []
+
+
+def test_check():
+    sample = {'county_names': None, 'other_jurisdiction': None}
+
+    assert rules.check(sample) == [
+        'Either county_names or other_jurisdiction must have a value.',
+        "If rec_eff_percent is not equal to -1, "
+        "then 'rec_eff_target_name', "
+        "'rec_eff_spike_matrix', "
+        "and 'rec_eff_spike_conc' "
+        "cannot be empty.",
+    ]
+
+
+def test_check_dates():
+    context = ValidationContext(today=datetime.date(2021, 4, 28))
+    sample = {
+        'county_names': ['Cook'],
+        'rec_eff_percent': -1,
+        'sample_collect_date': datetime.date(2021, 4, 28),
+        'test_result_date': datetime.date(2021, 4, 30),
+    }
+
+    assert rules.check(sample, context=context) == [
+        "'test_result_date' cannot be after tomorrow's date."
+    ]
@@ -1,9 +1,11 @@
 from contextlib import contextmanager
+import datetime
+
 from marshmallow import ValidationError
 import pytest
 import jsonschema
 
-from nwss.utils import get_future_date
+from nwss.utils import get_future_date, ValidationContext
 
 
 def test_valid_data(schema, valid_data):
@@ -190,6 +192,14 @@ def test_reporting_jurisdictions(schema, valid_data, input, expect, error):
             },
             pytest.raises(ValidationError),
             'Either county_names or other_jurisdiction must have a value.'
+        ),
+        (
+            {
+                'county_names': 5,
+                'other_jurisdiction': ''
+            },
+            pytest.raises(ValidationError),
+            'Not a valid string.'
         )
     ]
 )
@@ -2265,3 +2275,39 @@ def test_quality_flag(schema, valid_data, input, expect, error):
 
     if e:
         assert error in str(e.value)
+
+
+def test_load_iter(schema, valid_data, invalid_data):
+    rows = valid_data + invalid_data
+
+    results = list(schema.load_iter(iter(rows)))
+
+    assert [index for index, _, _ in results] == list(range(len(rows)))
+    assert all(errors is None for _, _, errors in results[:len(valid_data)])
+    assert all(errors for _, _, errors in results[len(valid_data):])
+    assert [data for _, data, _ in results[:len(valid_data)]] == \
+        schema.load(valid_data)
+
+
+def test_load_iter_chunks(schema, valid_data, invalid_data):
+    rows = valid_data + invalid_data
+
+    chunks = list(schema.load_iter(iter(rows), chunk_size=2))
+
+    assert [start for start, _, _ in chunks] == list(range(0, len(rows), 2))
+    assert sum(len(data) for _, data, _ in chunks) == len(rows)
+
+    errors = {}
+    for _, _, chunk_errors in chunks:
+        errors.update(chunk_errors)
+
+    assert set(errors) == set(range(len(valid_data), len(rows)))
+
+
+def test_validation_context(schema, valid_data):
+    context = ValidationContext(today=datetime.date(2021, 4, 28))
+
+    with pytest.raises(ValidationError) as e:
+        schema.load(valid_data, validation_context=context)
+
+    assert "'test_result_date' cannot be after tomorrow's date." in str(e.value)
@@ -0,0 +1,159 @@
+import csv
+import http.client
+import io
+import json
+import threading
+
+import pytest
+
+from nwss.server import RequestBody, ValidationServer
+
+
+def to_csv(rows):
+    f = io.StringIO()
+    writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+    writer.writeheader()
+    writer.writerows(rows)
+    return f.getvalue().encode('utf-8')
+
+
+@pytest.fixture
+def server():
+    server = ValidationServer(('127.0.0.1', 0))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def connection(server):
+    connection = http.client.HTTPConnection(*server.server_address[:2], timeout=10)
+    yield connection
+    connection.close()
+
+
+def post(connection, body, content_type='text/csv', **kwargs):
+    connection.request('POST', '/validate', body,
+                       headers={'Content-Type': content_type}, **kwargs)
+    response = connection.getresponse()
+    return response.status, json.loads(response.read())
+
+
+@pytest.fixture
+def invalid_rows(valid_data):
+    rows = [dict(row) for row in valid_data]
+    rows[1]['zipcode'] = '1234'
+    rows[2]['zipcode'] = '5678'
+    return rows
+
+
+def test_valid_csv(connection, valid_data):
+    status, report = post(connection, to_csv(valid_data))
+
+    assert status == 200
+    assert report == {
+        'valid': True, 'rows': len(valid_data), 'invalid_rows': 0, 'errors': []
+    }
+
+
+def test_grouped_errors(connection, invalid_rows):
+    status, report = post(connection, to_csv(invalid_rows))
+
+    assert status == 200
+    assert (report['valid'], report['invalid_rows']) == (False, 2)
+
+    group, = report['errors']
+    assert (group['field'], group['count'], group['examples']) == ('zipcode', 2, [1, 2])
+
+
+def test_chunked_body(connection, invalid_rows):
+    body = to_csv(invalid_rows)
+    pieces = [body[i:i + 100] for i in range(0, len(body), 100)]
+
+    status, report = post(connection, iter(pieces), encode_chunked=True)
+
+    assert status == 200
+    assert report['invalid_rows'] == 2
+
+    # The connection can be reused
+    assert post(connection, to_csv(invalid_rows))[1] == report
+
+
+def test_json_bodies(connection, invalid_rows):
+    lines = ''.join(json.dumps(row) + '\n' for row in invalid_rows).encode('utf-8')
+    array = json.dumps(invalid_rows).encode('utf-8')
+
+    _, expected = post(connection, to_csv(invalid_rows))
+
+    assert post(connection, lines, 'application/x-ndjson') == (200, expected)
+    assert post(connection, array, 'application/json; charset=utf-8') == (200, expected)
+
+
+@pytest.mark.parametrize('body, content_type, status', [
+    (b'{"sample_id": ', 'application/x-ndjson', 400),
+    (b'{"sample_id": "a"}', 'application/json', 400),
+    (b'a,b\n1,2\n', 'text/plain', 415),
+])
+def test_bad_requests(server, body, content_type, status):
+    connection = http.client.HTTPConnection(*server.server_address[:2], timeout=10)
+
+    try:
+        response_status, report = post(connection, body, content_type)
+    finally:
+        connection.close()
+
+    assert response_status == status
+    assert 'error' in report
+
+
+def test_non_string_list(connection, valid_data):
+    rows = [dict(row) for row in valid_data]
+    rows[0]['county_names'] = 5
+
+    status, report = post(connection, json.dumps(rows).encode('utf-8'),
+                          'application/json')
+
+    assert status == 200
+    assert [(group['field'], group['code']) for group in report['errors']] == \
+        [('county_names', 'invalid')]
+
+
+def test_unexpected_error(server, connection, valid_data, monkeypatch):
+    def validate(body, format):
+        raise RuntimeError('boom')
+
+    monkeypatch.setattr(server, 'validate', validate)
+
+    assert post(connection, to_csv(valid_data)) == (500, {'error': 'unexpected error'})
+
+
+def test_paths(connection):
+    connection.request('GET', '/health')
+    response = connection.getresponse()
+    assert (response.status, json.loads(response.read())) == (200, {'status': 'ok'})
+
+    connection.request('GET', '/nowhere')
+    response = connection.getresponse()
+    response.read()
+    assert response.status == 404
+
+
+def test_request_body_chunked():
+    rfile = io.BufferedReader(
+        io.BytesIO(b'3\r\nabc\r\n2;ext=1\r\nde\r\n0\r\nX: y\r\n\r\nrest')
+    )
+    body = RequestBody(rfile)
+
+    assert io.BufferedReader(body).read() == b'abcde'
+    assert rfile.read() == b'rest'
+
+
+def test_request_body_length():
+    rfile = io.BufferedReader(io.BytesIO(b'abcdef'))
+
+    assert io.BufferedReader(RequestBody(rfile, 4)).read() == b'abcd'
+    assert rfile.read() == b'ef'
@@ -0,0 +1,36 @@
+from nwss import value_sets
+from nwss.validators import CaseInsensitiveOneOf
+
+
+def test_index_lookup():
+    index = value_sets.get_index(value_sets.mic_units)
+
+    assert index.canonical('COPIES/L WASTEWATER') == 'copies/L wastewater'
+    assert index.code('copies/l wastewater') == \
+        value_sets.mic_units.index('copies/L wastewater')
+    assert 'copies/l wastewater' in index
+    assert index.canonical('gallons') is None
+    assert index.code(None) is None
+
+
+def test_index_is_shared():
+    assert value_sets.get_index(value_sets.reporting_jurisdiction) is \
+        CaseInsensitiveOneOf(value_sets.reporting_jurisdiction).index
+
+
+def test_canonical_output(schema, valid_data):
+    valid_data[0].update({
+        'reporting_jurisdiction': 'ca',
+        'sample_location': 'WWTP',
+        'pretreatment': 'Yes',
+        'sars_cov2_units': 'COPIES/L WASTEWATER',
+    })
+
+    data = schema.load(valid_data)[0]
+
+    assert data['reporting_jurisdiction'] == 'CA'
+    assert data['sample_location'] == 'wwtp'
+    assert data['pretreatment'] == 'yes'
+    assert data['sars_cov2_units'] == 'copies/L wastewater'
+    assert data['reporting_jurisdiction'] is \
+        value_sets.get_index(value_sets.reporting_jurisdiction).canonical('CA')
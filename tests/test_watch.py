@@ -0,0 +1,122 @@
+import csv
+import json
+
+import pytest
+
+from nwss.cli import EXIT_ERROR, EXIT_INPUT, EXIT_INVALID, EXIT_VALID, main
+from nwss.watch import JOURNAL, Watcher, validate_to_report
+
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+@pytest.fixture
+def incoming(tmp_path, valid_data):
+    directory = tmp_path / 'incoming'
+    directory.mkdir()
+
+    invalid = [dict(row) for row in valid_data]
+    invalid[1]['zipcode'] = '1234'
+
+    write_csv(directory / 'valid.csv', valid_data)
+    write_csv(directory / 'invalid.csv', invalid)
+    (directory / 'notes.txt').write_text('not a sample file')
+
+    return directory
+
+
+def read_journal(directory):
+    with open(directory / JOURNAL) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_validate_to_report(incoming):
+    entry = validate_to_report(str(incoming / 'invalid.csv'))
+
+    assert (entry['name'], entry['invalid_rows']) == ('invalid.csv', 1)
+
+    report = json.loads((incoming / 'invalid.csv.nwss-report.json').read_text())
+    assert [error['row'] for error in report['errors']] == [1]
+
+    # No temporary files are left behind
+    assert sorted(path.name for path in incoming.iterdir()) == [
+        'invalid.csv', 'invalid.csv.nwss-report.json', 'notes.txt', 'valid.csv'
+    ]
+
+
+def test_watcher(incoming, valid_data):
+    with Watcher(str(incoming), workers=1) as watcher:
+        # Files are only picked up once they've stopped changing
+        assert watcher.poll() == []
+        assert watcher.poll() == ['invalid.csv', 'valid.csv']
+
+        while watcher.pending:
+            watcher.collect(timeout=None)
+
+        assert watcher.poll() == []
+
+    assert {entry['name']: entry['invalid_rows'] for entry in read_journal(incoming)} \
+        == {'invalid.csv': 1, 'valid.csv': 0}
+    assert (incoming / 'valid.csv.nwss-report.json').exists()
+
+    # A restarted watcher skips files in the journal, unless they change
+    write_csv(incoming / 'valid.csv', valid_data[:1])
+
+    with Watcher(str(incoming), workers=1) as watcher:
+        assert [entry['name'] for entry in watcher.run_once()] == ['valid.csv']
+
+    assert len(read_journal(incoming)) == 3
+
+
+def test_failures_are_journaled(incoming, valid_data):
+    # The report can't be put in place, which isn't a problem with the input
+    (incoming / 'valid.csv.nwss-report.json').mkdir()
+
+    with Watcher(str(incoming), workers=1) as watcher:
+        entries = {entry['name']: entry for entry in watcher.run_once()}
+
+        assert entries['valid.csv']['failed']
+        assert 'valid.csv' in watcher.done
+
+        # It isn't retried until it changes
+        assert watcher.poll(settle=False) == []
+
+        write_csv(incoming / 'valid.csv', valid_data[:1])
+        assert [entry['name'] for entry in watcher.run_once()] == ['valid.csv']
+
+    # Nor by a restarted watcher
+    with Watcher(str(incoming), workers=1) as watcher:
+        assert watcher.run_once() == []
+
+    write_csv(incoming / 'valid.csv', valid_data)
+    assert main(['watch', str(incoming), '--once', '--workers', '1']) == EXIT_ERROR
+
+
+@pytest.mark.parametrize('files, expected', [
+    ({}, EXIT_VALID),
+    ({'valid.csv': None}, EXIT_VALID),
+    ({'invalid.csv': None}, EXIT_INVALID),
+    ({'broken.xlsx': 'not a workbook'}, EXIT_INPUT),
+])
+def test_cli_once(tmp_path, incoming, files, expected):
+    directory = tmp_path / 'other'
+    directory.mkdir()
+
+    for name, content in files.items():
+        target = directory / name
+
+        if content is None:
+            target.write_bytes((incoming / name).read_bytes())
+        else:
+            target.write_text(content)
+
+    assert main(['watch', str(directory), '--once', '--workers', '1',
+                 '--format', 'summary']) == expected
+
+
+def test_cli_not_a_directory(tmp_path):
+    assert main(['watch', str(tmp_path / 'missing'), '--once']) == EXIT_INPUT
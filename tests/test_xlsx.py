@@ -0,0 +1,186 @@
+import zipfile
+from xml.sax.saxutils import escape
+
+import pytest
+
+from nwss.schemas import WaterSampleSchema
+from nwss.xlsx import XLSXReader, column_index, format_kind, read_xlsx
+
+
+WORKBOOK = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+    xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+<workbookPr date1904="{date1904}"/>
+<sheets>{sheets}</sheets>
+</workbook>'''
+
+RELATIONSHIPS = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+{relationships}
+</Relationships>'''
+
+STYLES = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">
+<numFmts count="1"><numFmt numFmtId="164" formatCode="yyyy\\-mm\\-dd"/></numFmts>
+<cellStyleXfs count="1"><xf numFmtId="14"/></cellStyleXfs>
+<cellXfs count="4">
+<xf numFmtId="0"/><xf numFmtId="14"/><xf numFmtId="164"/><xf numFmtId="20"/>
+</cellXfs>
+</styleSheet>'''
+
+SHEET = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">
+<sheetData>{rows}</sheetData>
+</worksheet>'''
+
+SHARED_STRINGS = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">
+{items}
+</sst>'''
+
+
+def column_name(index):
+    name = ''
+    index += 1
+
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        name = chr(ord('A') + remainder) + name
+
+    return name
+
+
+def write_workbook(path, sheets, date1904=False):
+    '''
+    Write an .xlsx workbook. ``sheets`` maps sheet names to lists of rows,
+    each a list of cell values: strings are stored as shared strings, and
+    (number, style) tuples as numbers with the given cell style.
+    '''
+    shared = []
+    parts = {}
+
+    for number, (name, rows) in enumerate(sheets.items(), start=1):
+        xml_rows = []
+
+        for row_number, row in enumerate(rows, start=1):
+            cells = []
+
+            for column, value in enumerate(row):
+                reference = f'{column_name(column)}{row_number}'
+
+                if value is None:
+                    continue
+                elif isinstance(value, tuple):
+                    number_value, style = value
+                    cells.append(
+                        f'<c r="{reference}" s="{style}"><v>{number_value}</v></c>'
+                    )
+                else:
+                    shared.append(value)
+                    cells.append(f'<c r="{reference}" t="s"><v>{len(shared) - 1}</v></c>')
+
+            xml_rows.append(f'<row r="{row_number}">{"".join(cells)}</row>')
+
+        parts[f'xl/worksheets/sheet{number}.xml'] = SHEET.format(rows=''.join(xml_rows))
+
+    items = ''.join(f'<si><t>{escape(value)}</t></si>' for value in shared)
+
+    with zipfile.ZipFile(path, 'w') as f:
+        f.writestr('xl/workbook.xml', WORKBOOK.format(
+            date1904=int(date1904),
+            sheets=''.join(
+                f'<sheet name="{name}" sheetId="{number}" r:id="rId{number}"/>'
+                for number, name in enumerate(sheets, start=1)
+            ),
+        ))
+        f.writestr('xl/_rels/workbook.xml.rels', RELATIONSHIPS.format(
+            relationships=''.join(
+                f'<Relationship Id="rId{number}" Target="worksheets/sheet{number}.xml" '
+                'Type="http://schemas.openxmlformats.org/officeDocument/2006/'
+                'relationships/worksheet"/>'
+                for number in range(1, len(sheets) + 1)
+            ),
+        ))
+        f.writestr('xl/styles.xml', STYLES)
+        f.writestr('xl/sharedStrings.xml', SHARED_STRINGS.format(items=items))
+
+        for name, xml in parts.items():
+            f.writestr(name, xml)
+
+    return path
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    return write_workbook(tmp_path / 'samples.xlsx', {
+        'notes': [['note'], ['not samples']],
+        'samples': [
+            ['name', 'count', 'collected', 'custom date', 'time'],
+            ['a', (5, 0), (44197, 1), (44198, 2), (0.5, 3)],
+            [],
+            ['b', (1.5, 0), None, None, None],
+        ],
+    })
+
+
+def test_sheets(workbook):
+    with XLSXReader(workbook) as reader:
+        assert reader.sheet_names == ['notes', 'samples']
+        assert list(reader.rows()) == [{'note': 'not samples'}]
+
+
+def test_rows(workbook):
+    assert list(read_xlsx(workbook, sheet='samples')) == [
+        {
+            'name': 'a',
+            'count': '5',
+            'collected': '2021-01-01',
+            'custom date': '2021-01-02',
+            'time': '12:00:00',
+        },
+        {'name': 'b', 'count': '1.5'},
+    ]
+
+
+def test_date1904(tmp_path):
+    path = write_workbook(
+        tmp_path / 'mac.xlsx', {'sheet': [['date'], [(0, 1)]]}, date1904=True
+    )
+
+    assert list(read_xlsx(path)) == [{'date': '1904-01-01'}]
+
+
+def test_missing_sheet(workbook):
+    with pytest.raises(KeyError):
+        list(read_xlsx(workbook, sheet='missing'))
+
+
+@pytest.mark.parametrize('reference, index', [('A1', 0), ('Z9', 25), ('AB12', 27)])
+def test_column_index(reference, index):
+    assert column_index(reference) == index
+
+
+@pytest.mark.parametrize('format_code, kind', [
+    ('yyyy-mm-dd', 'date'),
+    ('[$-409]d-mmm-yy;@', 'date'),
+    ('h:mm AM/PM', 'time'),
+    ('[h]:mm:ss', 'time'),
+    ('0.00', None),
+    ('"days"0', None),
+])
+def test_format_kind(format_code, kind):
+    assert format_kind(format_code) == kind
+
+
+def test_validate(tmp_path, valid_data):
+    header = list(valid_data[0])
+    rows = [header] + [[row[name] or None for name in header] for row in valid_data]
+
+    path = write_workbook(tmp_path / 'valid.xlsx', {'samples': rows})
+
+    schema = WaterSampleSchema()
+
+    assert all(
+        errors is None
+        for _, _, errors in schema.load_iter(read_xlsx(path))
+    )